@@ -0,0 +1,186 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import ApplicationStatsCounter, Job, JobApplication
+
+# Вести таблицу счетчиков откликов и читать статистику из нее. Если выключено,
+# статистика считается одним GROUP BY по откликам; после повторного включения
+# счетчики нужно пересчитать: python manage.py rebuild_application_stats
+APPLICATION_STATS_COUNTERS = getattr(settings, 'JOB_APPLICATION_STATS_COUNTERS', True)
+
+GROUP_FIELDS = ('job__employment_type', 'job__experience', 'status')
+
+
+def _upsert_sql(source):
+    table = ApplicationStatsCounter._meta.db_table
+    return f"""
+        INSERT INTO {table} (applicant_id, employment_type, experience, status, count)
+        {source}
+        ON CONFLICT (applicant_id, employment_type, experience, status)
+        DO UPDATE SET count = {table}.count + EXCLUDED.count
+    """
+
+
+def adjust_application_stats(deltas):
+    """
+    Применяет изменения {(applicant_id, job_id, status): приращение}: увеличения -
+    одним upsert-запросом, уменьшения - одним UPDATE. Тип занятости и опыт
+    берутся из текущей строки вакансии.
+    """
+    increments = [(key[0], key[1], key[2], delta) for key, delta in deltas.items() if key and delta > 0]
+    decrements = [(key[0], key[1], key[2], -delta) for key, delta in deltas.items() if key and delta < 0]
+    table = ApplicationStatsCounter._meta.db_table
+    with connection.cursor() as cursor:
+        if increments:
+            placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(increments))
+            cursor.execute(_upsert_sql(f"""
+                SELECT changes.applicant_id, job.employment_type, job.experience, changes.status, SUM(changes.delta)
+                FROM (VALUES {placeholders}) AS changes (applicant_id, job_id, status, delta)
+                JOIN {Job._meta.db_table} AS job ON job.id = changes.job_id
+                GROUP BY 1, 2, 3, 4
+            """), [value for row in increments for value in row])
+        if decrements:
+            # Уменьшение не вставляет строк: при каскадном удалении пользователя его
+            # счетчики могут быть уже удалены, и новая строка нарушила бы внешний ключ
+            placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(decrements))
+            cursor.execute(f"""
+                UPDATE {table} AS counter SET count = counter.count - changes.delta
+                FROM (
+                    SELECT changes.applicant_id, job.employment_type, job.experience,
+                           changes.status, SUM(changes.delta) AS delta
+                    FROM (VALUES {placeholders}) AS changes (applicant_id, job_id, status, delta)
+                    JOIN {Job._meta.db_table} AS job ON job.id = changes.job_id
+                    GROUP BY 1, 2, 3, 4
+                ) AS changes
+                WHERE counter.applicant_id = changes.applicant_id
+                  AND counter.employment_type = changes.employment_type
+                  AND counter.experience = changes.experience
+                  AND counter.status = changes.status
+            """, [value for row in decrements for value in row])
+
+
+def _application_key(applicant_id, job_id, status):
+    if applicant_id is None or job_id is None:
+        return None
+    return applicant_id, job_id, status
+
+
+def record_application_saved(application, created):
+    if not APPLICATION_STATS_COUNTERS:
+        return
+    loaded = getattr(application, '_loaded_values', None) or {}
+    new_key = _application_key(application.applicant_id, application.job_id, application.status)
+    old_key = None
+    if not created and loaded:
+        old_key = _application_key(loaded.get('applicant_id'), loaded.get('job_id'), loaded.get('status'))
+    if old_key != new_key:
+        adjust_application_stats({old_key: -1, new_key: 1})
+    application._loaded_values = {
+        **loaded,
+        'applicant_id': application.applicant_id,
+        'job_id': application.job_id,
+        'status': application.status,
+    }
+
+
+def record_application_deleted(application):
+    if not APPLICATION_STATS_COUNTERS:
+        return
+    loaded = getattr(application, '_loaded_values', None) or {}
+    key = _application_key(
+        loaded.get('applicant_id', application.applicant_id),
+        loaded.get('job_id', application.job_id),
+        loaded.get('status', application.status),
+    )
+    # При каскадном удалении вакансии ее строка еще на месте: отклики удаляются раньше
+    adjust_application_stats({key: -1})
+
+
+def record_job_grouping_changed(job, created):
+    """
+    Переносит отклики вакансии в другую группу, если у нее сменились тип занятости
+    или опыт. Вызывается из post_save Job до того, как обновятся _loaded_values.
+    """
+    if not APPLICATION_STATS_COUNTERS or created:
+        return
+    loaded = getattr(job, '_loaded_values', None) or {}
+    old = (loaded.get('employment_type'), loaded.get('experience'))
+    if not loaded or old == (job.employment_type, job.experience):
+        return
+    applications = JobApplication._meta.db_table
+    source = f"""
+        SELECT applicant_id, %s, %s, status, -COUNT(*) FROM {applications}
+        WHERE job_id = %s GROUP BY applicant_id, status
+        UNION ALL
+        SELECT applicant_id, %s, %s, status, COUNT(*) FROM {applications}
+        WHERE job_id = %s GROUP BY applicant_id, status
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _upsert_sql(source),
+            [old[0], old[1], job.pk, job.employment_type, job.experience, job.pk],
+        )
+
+
+def compute_application_stats(applicant):
+    """
+    Число откликов соискателя по группам одним GROUP BY.
+    Возвращает [(employment_type, experience, status, count)].
+    """
+    return list(
+        JobApplication.objects.filter(applicant=applicant).order_by()
+        .values_list(*GROUP_FIELDS).annotate(total=Count('pk'))
+    )
+
+
+def get_application_stats(applicant):
+    """
+    Статистика откликов соискателя: всего, по типу занятости, опыту и статусу.
+    С включенными счетчиками - одно чтение строк пользователя по уникальному индексу.
+    """
+    if APPLICATION_STATS_COUNTERS:
+        rows = ApplicationStatsCounter.objects.filter(applicant=applicant, count__gt=0)\
+            .values_list('employment_type', 'experience', 'status', 'count')
+    else:
+        rows = compute_application_stats(applicant)
+
+    total = 0
+    by_employment_type, by_experience, by_status = {}, {}, {}
+    for employment_type, experience, status, count in rows:
+        total += count
+        by_employment_type[employment_type] = by_employment_type.get(employment_type, 0) + count
+        by_experience[experience] = by_experience.get(experience, 0) + count
+        by_status[status] = by_status.get(status, 0) + count
+
+    # Порядок ключей как в вариантах выбора модели, незнакомые значения - в конце
+    def ordered(counts, choices):
+        keys = [value for value, label in choices if value in counts]
+        keys += sorted(key for key in counts if key not in keys)
+        return {key: counts[key] for key in keys}
+
+    return {
+        'total_applications': total,
+        'by_employment_type': ordered(by_employment_type, Job.EMPLOYMENT_TYPE_CHOICES),
+        'by_experience': ordered(by_experience, Job.EXPERIENCE_CHOICES),
+        'by_status': ordered(by_status, JobApplication.STATUS_CHOICES),
+    }
+
+
+def rebuild_application_stats():
+    """
+    Полностью пересчитывает таблицу счетчиков одним INSERT ... SELECT.
+    """
+    applications = JobApplication._meta.db_table
+    with transaction.atomic():
+        ApplicationStatsCounter.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(_upsert_sql(
+                f"""
+                SELECT application.applicant_id, job.employment_type, job.experience,
+                       application.status, COUNT(*)
+                FROM {applications} AS application
+                JOIN {Job._meta.db_table} AS job ON job.id = application.job_id
+                GROUP BY 1, 2, 3, 4
+                """
+            ))
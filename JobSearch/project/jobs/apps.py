@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+
+    def ready(self):
+        # Регистрируем обработчики сигналов моделей
+        from . import signals  # noqa: F401
+
+        # Индексы навыков строятся в фоне с первым запросом процесса
+        from django.core.signals import request_started
+        from .skill_index import start_skill_indexes
+        request_started.connect(start_skill_indexes, dispatch_uid='start_skill_indexes')
@@ -0,0 +1,142 @@
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .cache import JOB_LIST_TAG, invalidate_tags
+from .histogram import record_jobs_added
+from .locations import match_location_id
+from .models import Job, LocationAlias
+from .serializers import JobSerializer
+from .skill_index import job_skill_index
+
+# Размер пачки bulk_create (и одной транзакции)
+JOB_IMPORT_BATCH_SIZE = getattr(settings, 'JOB_IMPORT_BATCH_SIZE', 500)
+# Сколько ошибок по строкам возвращать в отчете (остальные только считаются)
+JOB_IMPORT_MAX_ERRORS = getattr(settings, 'JOB_IMPORT_MAX_ERRORS', 1000)
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(filename, requested=None):
+    """
+    Формат файла: явно указанный или по расширению (.csv, .jsonl, .ndjson).
+    """
+    if requested:
+        requested = requested.lower()
+        return 'jsonl' if requested in ('jsonl', 'ndjson', 'json') else requested
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+def _parse_skills(value):
+    # В CSV навыки приходят строкой: JSON-массив или перечисление через запятую/точку с запятой
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    if value.startswith('['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    separator = ';' if ';' in value else ','
+    return [skill.strip() for skill in value.split(separator) if skill.strip()]
+
+
+def iter_csv(stream):
+    reader = csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+    for row in reader:
+        data = {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+        if 'skills' in data:
+            data['skills'] = _parse_skills(data['skills'])
+        yield reader.line_num, data, None
+
+
+def iter_jsonl(stream):
+    for line_number, line in enumerate(codecs.iterdecode(stream, 'utf-8-sig'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, {'non_field_errors': [f'Некорректный JSON: {e}']}
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, {'non_field_errors': ['Ожидается JSON-объект']}
+            continue
+        if 'skills' in data:
+            data['skills'] = _parse_skills(data['skills'])
+        yield line_number, data, None
+
+
+def iter_rows(stream, file_format):
+    """
+    Построчно разбирает файл, не загружая его в память целиком.
+    Выдает (номер строки, данные, ошибки разбора).
+    """
+    if file_format == 'jsonl':
+        return iter_jsonl(stream)
+    return iter_csv(stream)
+
+
+def _save_batch(jobs, alias_map):
+    """
+    Сохраняет пачку вакансий в отдельной транзакции и выполняет то, что для
+    обычного save() делают Job.save и сигналы: город из справочника,
+    счетчики гистограммы, индекс навыков и сброс кэша списков.
+    """
+    for job in jobs:
+        job.location_ref_id = match_location_id(job.location, alias_map)
+    with transaction.atomic():
+        created = Job.objects.bulk_create(jobs)
+        record_jobs_added(created)
+
+        def index():
+            for job in created:
+                job_skill_index.update(job.pk, job.skills)
+        transaction.on_commit(index)
+        invalidate_tags(JOB_LIST_TAG)
+    return len(created)
+
+
+def import_jobs(stream, company, file_format='csv', batch_size=None):
+    """
+    Импортирует вакансии работодателя из потока CSV или JSON Lines.
+    Каждая строка проверяется правилами JobSerializer, корректные строки
+    вставляются пачками bulk_create, каждая пачка - в своей транзакции.
+    Память ограничена размером пачки и числом сохраняемых ошибок.
+    Возвращает отчет {'created', 'failed', 'errors', 'errors_truncated'}.
+    """
+    batch_size = batch_size or JOB_IMPORT_BATCH_SIZE
+    alias_map = dict(LocationAlias.objects.values_list('alias', 'location_id'))
+    report = {'created': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+    batch = []
+    # Один экземпляр сериализатора на весь файл: поля ModelSerializer строятся
+    # один раз, а не на каждую строку (run_validation - то же, что is_valid)
+    serializer = JobSerializer()
+
+    for line_number, data, errors in iter_rows(stream, file_format):
+        if errors is None:
+            try:
+                batch.append(Job(company=company, **serializer.run_validation(data)))
+            except ValidationError as e:
+                errors = e.detail
+        if errors is not None:
+            report['failed'] += 1
+            if len(report['errors']) < JOB_IMPORT_MAX_ERRORS:
+                report['errors'].append({'row': line_number, 'errors': errors})
+            else:
+                report['errors_truncated'] = True
+        if len(batch) >= batch_size:
+            report['created'] += _save_batch(batch, alias_map)
+            batch = []
+
+    if batch:
+        report['created'] += _save_batch(batch, alias_map)
+    return report
@@ -0,0 +1,95 @@
+from collections import Counter
+
+from django.db import connection, transaction
+
+from .application_stats import APPLICATION_STATS_COUNTERS, adjust_application_stats
+from .funnel import adjust_job_funnel
+from .models import Job, JobApplication
+from .outbox import enqueue_notifications
+
+# Статусы, которые работодатель может выставить отклику
+APPLICATION_STATUSES = ('pending', 'reviewed', 'interviewing', 'accepted', 'rejected')
+
+# Сколько откликов можно изменить одним запросом
+BULK_STATUS_MAX_IDS = 1000
+
+
+def bulk_update_status(employer, application_ids, new_status):
+    """
+    Выставляет статус откликам одним UPDATE. Владение проверяется в том же
+    запросе (вакансия должна принадлежать работодателю), отклики, уже имеющие
+    этот статус, не трогаются. Счетчики воронки и статистики обновляются в той
+    же транзакции, там же в outbox пишется одно уведомление на соискателя.
+    Возвращает список измененных откликов
+    [{'id', 'job_id', 'job_title', 'applicant_id', 'old_status'}].
+    """
+    applications = JobApplication._meta.db_table
+    jobs = Job._meta.db_table
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {applications} AS application
+                SET status = %s, updated_at = NOW()
+                FROM (
+                    SELECT application.id, application.status, job.title
+                    FROM {applications} AS application
+                    JOIN {jobs} AS job ON job.id = application.job_id
+                    WHERE application.id = ANY(%s) AND job.company_id = %s AND application.status <> %s
+                    FOR UPDATE OF application
+                ) AS old
+                WHERE application.id = old.id
+                RETURNING application.id, application.job_id, old.title, application.applicant_id, old.status
+                """,
+                [new_status, list(application_ids), employer.pk, new_status],
+            )
+            changed = [
+                dict(zip(('id', 'job_id', 'job_title', 'applicant_id', 'old_status'), row))
+                for row in cursor.fetchall()
+            ]
+        if not changed:
+            return changed
+
+        # UPDATE идет в обход сигналов post_save, поэтому счетчики переносим сами
+        funnel = Counter()
+        stats = Counter()
+        for application in changed:
+            funnel[(application['job_id'], application['old_status'])] -= 1
+            funnel[(application['job_id'], new_status)] += 1
+            stats[(application['applicant_id'], application['job_id'], application['old_status'])] -= 1
+            stats[(application['applicant_id'], application['job_id'], new_status)] += 1
+        adjust_job_funnel(funnel)
+        if APPLICATION_STATS_COUNTERS:
+            adjust_application_stats(stats)
+
+        notify_applicants(employer, changed, new_status)
+    return changed
+
+
+def notify_applicants(employer, changed, new_status):
+    """
+    Одно уведомление на соискателя со всеми его измененными откликами
+    (через outbox, в транзакции изменения статусов).
+    """
+    by_applicant = {}
+    for application in changed:
+        by_applicant.setdefault(application['applicant_id'], []).append({
+            'id': application['id'],
+            'job': {'id': application['job_id'], 'title': application['job_title']},
+            'old_status': application['old_status'],
+        })
+    enqueue_notifications([
+        (
+            f"notifications_{applicant_id}",
+            {
+                "type": "application_status",
+                "status": new_status,
+                "employer": {
+                    "id": employer.id,
+                    "company_name": getattr(employer, 'company_name', None),
+                },
+                "applications": applications,
+            }
+        )
+        for applicant_id, applications in by_applicant.items()
+    ])
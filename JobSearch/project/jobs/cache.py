@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .facets import filters_signature
+
+# Время жизни закэшированных страниц списка и карточек вакансий, в секундах
+JOB_LIST_CACHE_TTL = getattr(settings, 'JOB_LIST_CACHE_TTL', 60)
+# Размер локального LRU-кэша процесса (число записей)
+JOB_LIST_CACHE_LOCAL_SIZE = getattr(settings, 'JOB_LIST_CACHE_LOCAL_SIZE', 512)
+
+# Тег всех списков вакансий и шаблон тега отдельной карточки
+JOB_LIST_TAG = 'jobs'
+JOB_CARD_TAG = 'job:{}'
+
+# Фильтры с произвольным текстом дают слишком много вариантов, такие запросы не кэшируем
+UNCACHEABLE_FILTERS = ('q', 'title', 'fuzzy', 'skills')
+
+
+def shared_cache():
+    """
+    Кэш по умолчанию, если он общий для всех процессов (Redis), иначе None.
+    В кэше в памяти процесса (LocMem, когда REDIS_CACHE_URL не задан) сброс
+    в одном воркере не виден остальным, поэтому без общего кэша кэширование
+    отключается и данные читаются из БД.
+    """
+    cache = caches['default']
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return None
+    return cache
+
+
+class LocalLRUCache:
+    """
+    Небольшой потокобезопасный LRU-кэш в памяти процесса с временем жизни записей.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + timeout)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class TwoLevelCache:
+    """
+    Двухуровневый кэш: локальный LRU процесса перед общим бэкендом Django
+    (Redis в продакшене, см. CACHES в settings). Записи неизменяемы: при
+    изменении данных меняется версия тега и, соответственно, ключ, поэтому
+    локальные копии других процессов не нужно явно сбрасывать.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.local = LocalLRUCache(maxsize)
+        self.timeout = timeout
+
+    def get(self, key):
+        cache = shared_cache()
+        if cache is None:
+            return None
+        value = self.local.get(key)
+        if value is None:
+            value = cache.get(key)
+            if value is not None:
+                self.local.set(key, value, self.timeout)
+        return value
+
+    def get_many(self, keys):
+        cache = shared_cache()
+        if cache is None:
+            return {}
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = cache.get_many(missing)
+            for key, value in shared.items():
+                self.local.set(key, value, self.timeout)
+            found.update(shared)
+        return found
+
+    def set(self, key, value):
+        cache = shared_cache()
+        if cache is None:
+            return
+        self.local.set(key, value, self.timeout)
+        cache.set(key, value, self.timeout)
+
+    def set_many(self, values):
+        cache = shared_cache()
+        if cache is None:
+            return
+        for key, value in values.items():
+            self.local.set(key, value, self.timeout)
+        cache.set_many(values, self.timeout)
+
+
+result_cache = TwoLevelCache(JOB_LIST_CACHE_LOCAL_SIZE, JOB_LIST_CACHE_TTL)
+
+
+def _tag_key(tag):
+    return f"cache_tag:{tag}"
+
+
+def get_tag_versions(tags):
+    """
+    Текущие версии тегов. Версии хранятся только в общем кэше и не истекают;
+    если версия потерялась (вытеснение), создается новая, и старые записи
+    становятся недостижимыми. Без общего кэша версии не ведутся.
+    """
+    cache = shared_cache()
+    if cache is None:
+        return {tag: None for tag in tags}
+    keys = {_tag_key(tag): tag for tag in tags}
+    versions = cache.get_many(list(keys))
+    for key, tag in keys.items():
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return {tag: versions[key] for key, tag in keys.items()}
+
+
+def invalidate_tags(*tags):
+    """
+    Сбрасывает все записи с указанными тегами. Вызывается после коммита
+    транзакции, чтобы параллельный запрос не закэшировал старые данные.
+    """
+    cache = shared_cache()
+    if cache is None:
+        return
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many({_tag_key(tag): version for tag in tags}, None)
+    transaction.on_commit(bump)
+
+
+def invalidate_job(job_id, lists=True):
+    """
+    Сбрасывает карточку вакансии и (по умолчанию) все закэшированные списки.
+    """
+    tags = [JOB_CARD_TAG.format(job_id)]
+    if lists:
+        tags.append(JOB_LIST_TAG)
+    invalidate_tags(*tags)
+
+
+def card_versions(job_ids):
+    """
+    Версии карточек {id: версия}. Читаются до запроса карточек к БД: если
+    вакансия изменится после чтения, карточка будет сохранена под старой
+    версией и просто не будет найдена, а не наоборот.
+    """
+    versions = get_tag_versions([JOB_CARD_TAG.format(job_id) for job_id in job_ids])
+    return {job_id: versions[JOB_CARD_TAG.format(job_id)] for job_id in job_ids}
+
+
+def job_cards_fingerprint(job_ids):
+    """
+    Версии карточек страницы (только из кэша, без запросов к БД). Входит в ETag
+    закэшированной страницы: счетчики вакансий меняют карточки, но не списки.
+    """
+    versions = card_versions(job_ids)
+    return ','.join(str(versions[job_id]) for job_id in job_ids)
+
+
+def is_list_cacheable(filters):
+    if shared_cache() is None:
+        return False
+    return not any(filters[name] for name in UNCACHEABLE_FILTERS)
+
+
+def job_list_key(filters, **extra):
+    version = get_tag_versions([JOB_LIST_TAG])[JOB_LIST_TAG]
+    return f"job_list:{version}:{filters_signature(filters, **extra)}"
+
+
+def _card_key(job_id, version):
+    return f"job_card:{job_id}:{version}"
+
+
+def get_job_cards(versions):
+    """
+    Карточки вакансий из кэша по версиям из card_versions:
+    {id: сериализованная карточка} для найденных.
+    """
+    keys = {job_id: _card_key(job_id, version) for job_id, version in versions.items()}
+    found = result_cache.get_many(list(keys.values()))
+    return {job_id: found[key] for job_id, key in keys.items() if key in found}
+
+
+def store_job_cards(cards, versions):
+    """
+    Сохраняет сериализованные карточки под версиями, прочитанными до запроса
+    к БД. Поле is_saved зависит от пользователя, поэтому в общий кэш оно
+    попадает сброшенным и подставляется при чтении.
+    """
+    result_cache.set_many({
+        _card_key(card['id'], versions[card['id']]): {**card, 'is_saved': False}
+        for card in cards if card['id'] in versions
+    })
@@ -0,0 +1,72 @@
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """
+    Слабо зависимый от формата ETag: хэш от значений, определяющих представление.
+    """
+    payload = '|'.join('' if part is None else str(part) for part in parts)
+    return '"%s"' % hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value is not None else None
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Проверяет If-None-Match / If-Modified-Since до сериализации.
+    Возвращает готовый ответ 304 или None, если нужно отдавать тело.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    """
+    Проставляет валидаторы ответа. Представление зависит от пользователя (is_saved),
+    поэтому кэши и прокси должны различать ответы по заголовку Authorization
+    и перепроверять их перед использованием.
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+    patch_vary_headers(response, ('Authorization',))
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def queryset_validator(queryset, field='updated_at', counters=()):
+    """
+    Дешевый валидатор списка: максимальное время изменения, число строк и суммы
+    счетчиков counters отфильтрованного queryset (одним агрегирующим запросом,
+    без сортировки). Счетчики меняются без updated_at, поэтому входят отдельно.
+    Возвращает часть ETag. Last-Modified для списков не отдается: максимум
+    updated_at не меняется при удалении строк и изменении счетчиков, и клиент
+    с одним If-Modified-Since получил бы неверный 304.
+    """
+    sums = {f'sum_{name}': Sum(name) for name in counters}
+    stats = queryset.order_by().aggregate(last_modified=Max(field), total=Count('pk'), **sums)
+    last_modified = stats['last_modified']
+    parts = [stats['total'], last_modified.isoformat() if last_modified else '']
+    parts += [stats[key] or 0 for key in sums]
+    return ':'.join(map(str, parts))
+
+
+def saved_jobs_fingerprint(user):
+    """
+    Отпечаток избранного пользователя: меняется при сохранении и удалении
+    вакансии из избранного, чтобы is_saved в карточках не устаревал.
+    """
+    if user is None or not user.is_authenticated:
+        return ''
+    from .saved_jobs import saved_job_ids
+    # Считается по закэшированному множеству id, без запроса к БД
+    ids = ','.join(str(job_id) for job_id in sorted(saved_job_ids(user)))
+    return f"{user.pk}:{hashlib.md5(ids.encode('utf-8')).hexdigest()}"
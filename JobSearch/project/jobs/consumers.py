@@ -5,6 +5,8 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from .models import ChatMessage, Job, Conversation
+from .conversations import find_conversation
+from .inbox import mark_conversation_read
 from django.utils import timezone
 from asgiref.sync import sync_to_async
 
@@ -298,6 +300,23 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 "message": f"Не удалось обработать уведомление о новом отклике: {str(e)}"
             }))
 
+    # Обработчик уведомлений о смене статуса откликов
+    async def application_status(self, event):
+        """
+        Отправляет соискателю одно уведомление обо всех его откликах,
+        которым работодатель выставил новый статус.
+        """
+        try:
+            await self.send(text_data=json.dumps({
+                "type": "application_status",
+                "status": event.get("status"),
+                "employer": event.get("employer"),
+                "applications": event.get("applications", []),
+                "timestamp": timezone.now().isoformat()
+            }))
+        except Exception as e:
+            print(f"Ошибка при отправке уведомления о смене статуса откликов: {str(e)}")
+
     @database_sync_to_async
     def get_conversation_info(self, conversation_id):
         """
@@ -305,35 +324,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
         Проверяет, имеет ли пользователь доступ к диалогу.
         """
         try:
-            # Пытаемся найти диалог по ID
-            if conversation_id.isdigit():
-                # Если это числовой ID, ищем по первичному ключу
-                conversation = Conversation.objects.filter(id=int(conversation_id)).first()
-            else:
-                # Иначе пытаемся найти по conversation_id
-                parts = conversation_id.split('_')
-                if len(parts) >= 3:
-                    user_ids = [int(parts[0]), int(parts[1])]
-                    job_id = None if parts[2] == 'none' else int(parts[2])
-                    
-                    # Ищем диалог с указанными участниками и вакансией
-                    conversations = Conversation.objects.filter(participants__id__in=user_ids)
-                    if job_id:
-                        conversations = conversations.filter(job_id=job_id)
-                    else:
-                        conversations = conversations.filter(job__isnull=True)
-                    
-                    # Группируем по ID и выбираем диалоги, в которых участвуют оба пользователя
-                    conversation_ids = conversations.values_list('id', flat=True)
-                    for conv_id in conversation_ids:
-                        conv = Conversation.objects.get(id=conv_id)
-                        if conv.participants.filter(id__in=user_ids).count() == 2:
-                            conversation = conv
-                            break
-                    else:
-                        conversation = None
-                else:
-                    conversation = None
+            # Числовой pk или conversation_key - один запрос по индексу
+            conversation = find_conversation(conversation_id)
             
             # Проверяем, является ли текущий пользователь участником диалога
             if not conversation or self.scope["user"] not in conversation.participants.all():
@@ -397,11 +389,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             
         try:
             # Отмечаем все непрочитанные сообщения как прочитанные
-            count = ChatMessage.objects.filter(
-                conversation_id=self.db_conversation_id,
-                recipient_id=self.user_id,
-                is_read=False
-            ).update(is_read=True)
+            count = mark_conversation_read(self.db_conversation_id, self.user_id)
             
             print(f"Отмечено {count} сообщений как прочитанные для пользователя {self.user_id} в диалоге {self.db_conversation_id}")
             return count
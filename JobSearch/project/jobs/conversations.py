@@ -0,0 +1,116 @@
+from django.db import IntegrityError, connection, transaction
+
+from .models import Conversation, sanitize_id
+
+
+def build_conversation_key(pk, participant_ids, job_id):
+    """
+    Канонический строковый id диалога: "<меньший id>_<больший id>_<вакансия|none>"
+    для диалога двух участников, иначе "conv_<pk>".
+    """
+    participant_ids = sorted(participant_ids)
+    if len(participant_ids) != 2:
+        return sanitize_id(f"conv_{pk}")
+    return sanitize_id(f"{participant_ids[0]}_{participant_ids[1]}_{job_id or 'none'}")
+
+
+def _ordered_pair(user_a_id, user_b_id):
+    return (user_a_id, user_b_id) if user_a_id <= user_b_id else (user_b_id, user_a_id)
+
+
+def refresh_conversation_key(conversation):
+    """
+    Пересчитывает и сохраняет conversation_key (и пару user_low/user_high для
+    диалога двух участников) после изменения участников. Если ключ уже занят
+    другим диалогом, диалогу достается "conv_<pk>"; если занята и пара (дубль
+    той же пары и вакансии) - еще и без пары: поиск по паре находит первый.
+    Ключ не пересчитывается при удалении вакансии (SET NULL), чтобы id
+    диалога и имя его WebSocket-группы оставались прежними.
+    """
+    participant_ids = list(conversation.participants.values_list('id', flat=True))
+    key = build_conversation_key(conversation.pk, participant_ids, conversation.job_id)
+    user_low_id, user_high_id = _ordered_pair(*participant_ids) if len(participant_ids) == 2 else (None, None)
+    if (key, user_low_id, user_high_id) == (
+        conversation.conversation_key, conversation.user_low_id, conversation.user_high_id,
+    ):
+        return key
+    fallback_key = sanitize_id(f"conv_{conversation.pk}")
+    for key, user_low_id, user_high_id in (
+        (key, user_low_id, user_high_id),
+        (fallback_key, user_low_id, user_high_id),
+        (fallback_key, None, None),
+    ):
+        try:
+            with transaction.atomic():
+                Conversation.objects.filter(pk=conversation.pk).update(
+                    conversation_key=key, user_low_id=user_low_id, user_high_id=user_high_id,
+                )
+            break
+        except IntegrityError:
+            continue
+    conversation.conversation_key = key
+    conversation.user_low_id, conversation.user_high_id = user_low_id, user_high_id
+    return key
+
+
+def get_or_create_conversation(user_a, user_b, job=None):
+    """
+    Возвращает (диалог, создан ли) двух пользователей по вакансии (или без нее).
+    Диалог вставляется INSERT ... ON CONFLICT DO NOTHING по уникальной паре
+    (user_low, user_high, job), поэтому одновременные запросы не создают дублей:
+    проигравший получает диалог победителя вторым запросом по тому же индексу.
+    """
+    user_low_id, user_high_id = _ordered_pair(user_a.pk, user_b.pk)
+    job_id = job.pk if job is not None else None
+    table = Conversation._meta.db_table
+    # Ключ пары может быть занят старым диалогом без пары (например, из которого
+    # удалили участника) - тогда ключ назначит сигнал участников ("conv_<pk>")
+    for key in (build_conversation_key(None, [user_low_id, user_high_id], job_id), None):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} (user_low_id, user_high_id, job_id, conversation_key, created_at, updated_at)
+                    VALUES (%s, %s, %s, %s, NOW(), NOW())
+                    ON CONFLICT DO NOTHING
+                    RETURNING id
+                    """,
+                    [user_low_id, user_high_id, job_id, key],
+                )
+                row = cursor.fetchone()
+            if row is not None:
+                conversation = Conversation.objects.get(pk=row[0])
+                conversation.participants.add(user_low_id, user_high_id)
+                return conversation, True
+
+        conversation = Conversation.objects.filter(
+            user_low_id=user_low_id, user_high_id=user_high_id, job_id=job_id,
+        ).first()
+        if conversation is not None:
+            return conversation, False
+    raise IntegrityError(f"Диалог пользователей {user_low_id} и {user_high_id} не удалось ни создать, ни найти")
+
+
+def release_job_conversations(job):
+    """
+    Вызывается перед удалением вакансии: ее диалоги получат job = NULL, поэтому
+    их пара снимается, иначе она столкнулась бы с прямым диалогом тех же людей.
+    """
+    Conversation.objects.filter(job=job).update(user_low=None, user_high=None)
+
+
+def find_conversation(identifier, queryset=None):
+    """
+    Находит диалог по числовому pk или строковому conversation_id одним
+    запросом по индексу. Возвращает None, если диалога нет в queryset.
+    """
+    if queryset is None:
+        queryset = Conversation.objects.all()
+    identifier = str(identifier or '').strip()
+    if not identifier:
+        return None
+    if identifier.isdigit():
+        conversation = queryset.filter(pk=int(identifier)).first()
+        if conversation is not None:
+            return conversation
+    return queryset.filter(conversation_key=identifier).first()
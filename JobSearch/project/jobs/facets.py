@@ -0,0 +1,94 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Job
+from .search import apply_job_filters, facet_conditions
+
+# Зарплатные диапазоны фасета (по salary_min), верхняя граница не включается
+SALARY_FACET_BUCKETS = (
+    (0, 50000),
+    (50000, 100000),
+    (100000, 200000),
+    (200000, 300000),
+    (300000, None),
+)
+
+
+def filters_signature(filters, **extra):
+    """
+    Стабильный ключ для нормализованного набора фильтров.
+    """
+    payload = json.dumps({**filters, **extra}, sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def _all_except(conditions, dimension):
+    combined = Q()
+    for name, condition in conditions.items():
+        if name != dimension:
+            combined &= condition
+    return combined
+
+
+def compute_job_facets(filters, active_only=True):
+    """
+    Считает все фасеты одним агрегирующим запросом.
+    Счетчики каждого фасета учитывают все фильтры, кроме фильтра этого же фасета,
+    чтобы в боковой панели были видны альтернативные значения.
+    """
+    queryset = Job.objects.all()
+    if active_only:
+        queryset = queryset.filter(is_active=True)
+    queryset = apply_job_filters(queryset, filters, ranked=False, facets=False).order_by()
+
+    conditions = facet_conditions(filters)
+    aggregates = {'total': Count('pk', filter=_all_except(conditions, None))}
+
+    employment_filter = _all_except(conditions, 'employment_type')
+    for index, (value, label) in enumerate(Job.EMPLOYMENT_TYPE_CHOICES):
+        aggregates[f'employment_type_{index}'] = Count('pk', filter=employment_filter & Q(employment_type=value))
+
+    experience_filter = _all_except(conditions, 'experience')
+    for index, (value, label) in enumerate(Job.EXPERIENCE_CHOICES):
+        aggregates[f'experience_{index}'] = Count('pk', filter=experience_filter & Q(experience=value))
+
+    salary_filter = _all_except(conditions, 'salary')
+    for index, (low, high) in enumerate(SALARY_FACET_BUCKETS):
+        bucket = Q(salary_min__gte=low)
+        if high is not None:
+            bucket &= Q(salary_min__lt=high)
+        aggregates[f'salary_{index}'] = Count('pk', filter=salary_filter & bucket)
+
+    counts = queryset.aggregate(**aggregates)
+
+    return {
+        'total': counts['total'],
+        'employment_type': [
+            {'value': value, 'label': label, 'count': counts[f'employment_type_{index}']}
+            for index, (value, label) in enumerate(Job.EMPLOYMENT_TYPE_CHOICES)
+        ],
+        'experience': [
+            {'value': value, 'label': label, 'count': counts[f'experience_{index}']}
+            for index, (value, label) in enumerate(Job.EXPERIENCE_CHOICES)
+        ],
+        'salary': [
+            {'min': low, 'max': high, 'count': counts[f'salary_{index}']}
+            for index, (low, high) in enumerate(SALARY_FACET_BUCKETS)
+        ],
+    }
+
+
+def get_job_facets(filters, active_only=True):
+    """
+    Фасеты с коротким кэшированием по сигнатуре фильтра.
+    """
+    key = f"job_facets:{filters_signature(filters, active_only=active_only)}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_job_facets(filters, active_only=active_only)
+        cache.set(key, facets, getattr(settings, 'JOB_FACETS_CACHE_TTL', 60))
+    return facets
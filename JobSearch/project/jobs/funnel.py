@@ -0,0 +1,206 @@
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .inbox import unread_by_job
+from .models import EmployerDashboardVisit, Job, JobApplication, JobFunnelCounter
+
+
+def adjust_job_funnel(deltas):
+    """
+    Применяет изменения счетчиков {(job_id, status): приращение}: увеличения -
+    одним upsert-запросом, уменьшения - одним UPDATE (без вставки строк, чтобы
+    каскадное удаление вакансии не создавало счетчики для удаляемой строки).
+    """
+    table = JobFunnelCounter._meta.db_table
+    increments = [(key[0], key[1], delta) for key, delta in deltas.items() if key and delta > 0]
+    decrements = [(key[0], key[1], -delta) for key, delta in deltas.items() if key and delta < 0]
+    with connection.cursor() as cursor:
+        if increments:
+            placeholders = ', '.join(['(%s, %s, %s)'] * len(increments))
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (job_id, status, count)
+                VALUES {placeholders}
+                ON CONFLICT (job_id, status)
+                DO UPDATE SET count = {table}.count + EXCLUDED.count
+                """,
+                [value for row in increments for value in row],
+            )
+        if decrements:
+            placeholders = ', '.join(['(%s, %s, %s)'] * len(decrements))
+            cursor.execute(
+                f"""
+                UPDATE {table} AS counter SET count = counter.count - changes.delta
+                FROM (VALUES {placeholders}) AS changes (job_id, status, delta)
+                WHERE counter.job_id = changes.job_id AND counter.status = changes.status
+                """,
+                [value for row in decrements for value in row],
+            )
+
+
+def record_application_saved(application, created):
+    """
+    Вызывается из post_save JobApplication до того, как обновятся _loaded_values.
+    """
+    loaded = getattr(application, '_loaded_values', None) or {}
+    new_key = (application.job_id, application.status)
+    old_key = None
+    if not created and loaded:
+        old_key = (loaded.get('job_id'), loaded.get('status'))
+    if old_key != new_key:
+        adjust_job_funnel({old_key: -1, new_key: 1})
+    if created:
+        Job.objects.filter(pk=application.job_id).update(
+            applications_count=F('applications_count') + 1,
+            new_applications=F('new_applications') + 1,
+        )
+
+
+def record_application_deleted(application):
+    loaded = getattr(application, '_loaded_values', None) or {}
+    adjust_job_funnel({
+        (loaded.get('job_id', application.job_id), loaded.get('status', application.status)): -1,
+    })
+    # Отозванный отклик, который работодатель еще не видел, перестает быть новым
+    table = Job._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} AS job SET
+                applications_count = GREATEST(job.applications_count - 1, 0),
+                new_applications = CASE WHEN EXISTS (
+                    SELECT 1 FROM {EmployerDashboardVisit._meta.db_table} AS visit
+                    WHERE visit.employer_id = job.company_id AND visit.visited_at >= %s
+                ) THEN job.new_applications ELSE GREATEST(job.new_applications - 1, 0) END
+            WHERE job.id = %s
+            """,
+            [application.created_at, application.job_id],
+        )
+
+
+def take_new_applications(employer):
+    """
+    Обнуляет счетчики новых откликов работодателя и возвращает их прежние
+    значения {job_id: число} одним UPDATE ... RETURNING.
+    """
+    table = Job._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} AS job SET new_applications = 0
+            FROM (
+                SELECT id, new_applications FROM {table}
+                WHERE company_id = %s AND new_applications > 0
+                FOR UPDATE
+            ) AS seen
+            WHERE job.id = seen.id
+            RETURNING job.id, seen.new_applications
+            """,
+            [employer.pk],
+        )
+        return dict(cursor.fetchall())
+
+
+def get_employer_dashboard(employer, mark_seen=True):
+    """
+    Воронка найма работодателя: по каждой вакансии число откликов по статусам,
+    новые отклики с прошлого просмотра и непрочитанные сообщения.
+    Читаются только счетчики (строки по числу вакансий), а не сами отклики.
+    """
+    with transaction.atomic():
+        visit = EmployerDashboardVisit.objects.filter(employer=employer).first()
+        last_visit_at = visit.visited_at if visit else None
+        new_counts = {}
+        if mark_seen:
+            new_counts = take_new_applications(employer)
+            if visit is None:
+                EmployerDashboardVisit.objects.create(employer=employer, visited_at=timezone.now())
+            else:
+                EmployerDashboardVisit.objects.filter(employer=employer).update(visited_at=timezone.now())
+
+    jobs = list(
+        Job.objects.filter(company=employer).order_by('-created_at')
+        .values('id', 'title', 'is_active', 'created_at', 'views_count', 'new_applications')
+    )
+    funnel = {}
+    for job_id, job_status, count in JobFunnelCounter.objects.filter(job__company=employer, count__gt=0)\
+            .values_list('job_id', 'status', 'count'):
+        funnel.setdefault(job_id, {})[job_status] = count
+    unread = unread_by_job(employer)
+
+    totals = {'applications': 0, 'new_applications': 0, 'unread_messages': sum(unread.values()), 'by_status': {}}
+    rows = []
+    for job in jobs:
+        by_status = funnel.get(job['id'], {})
+        new_applications = new_counts.get(job['id'], job['new_applications'])
+        rows.append({
+            'id': job['id'],
+            'title': job['title'],
+            'is_active': job['is_active'],
+            'created_at': job['created_at'],
+            'views_count': job['views_count'],
+            'applications_count': sum(by_status.values()),
+            'by_status': by_status,
+            'new_applications': new_applications,
+            'unread_messages': unread.get(job['id'], 0),
+        })
+        totals['applications'] += sum(by_status.values())
+        totals['new_applications'] += new_applications
+        for job_status, count in by_status.items():
+            totals['by_status'][job_status] = totals['by_status'].get(job_status, 0) + count
+
+    return {'last_visit_at': last_visit_at, 'totals': totals, 'jobs': rows}
+
+
+def rebuild_job_funnel():
+    """
+    Полностью пересчитывает счетчики воронки по текущим откликам.
+    """
+    rows = JobApplication.objects.order_by().values_list('job_id', 'status').annotate(total=Count('pk'))
+    with transaction.atomic():
+        JobFunnelCounter.objects.all().delete()
+        JobFunnelCounter.objects.bulk_create([
+            JobFunnelCounter(job_id=job_id, status=job_status, count=total)
+            for job_id, job_status, total in rows
+        ], batch_size=1000)
+
+
+def reconcile_applications_count(batch_size=1000):
+    """
+    Исправляет расхождения Job.applications_count с фактическим числом откликов.
+    Вакансии обрабатываются пачками по id, каждая пачка - в своей транзакции:
+    строки пачки блокируются, поэтому одновременные отклики не теряются.
+    Возвращает (число проверенных, число исправленных вакансий).
+    """
+    table = Job._meta.db_table
+    applications = JobApplication._meta.db_table
+    checked = fixed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Job.objects.filter(pk__gt=last_id).order_by('pk')
+                .select_for_update().values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    UPDATE {table} AS job SET applications_count = actual.total
+                    FROM (
+                        SELECT job.id, COUNT(application.id) AS total
+                        FROM {table} AS job
+                        LEFT JOIN {applications} AS application ON application.job_id = job.id
+                        WHERE job.id BETWEEN %s AND %s
+                        GROUP BY job.id
+                    ) AS actual
+                    WHERE job.id = actual.id AND job.applications_count <> actual.total
+                    """,
+                    [ids[0], ids[-1]],
+                )
+                fixed += cursor.rowcount
+        checked += len(ids)
+        last_id = ids[-1]
+    return checked, fixed
@@ -0,0 +1,181 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, Least
+
+from .facets import filters_signature
+from .models import Job, SalaryHistogramBucket
+from .search import apply_job_filters, facet_conditions
+
+# Ширина зарплатного интервала гистограммы и число интервалов
+# (последний интервал открытый: все, что выше)
+SALARY_HISTOGRAM_STEP = getattr(settings, 'JOB_SALARY_HISTOGRAM_STEP', 25000)
+SALARY_HISTOGRAM_BUCKETS = getattr(settings, 'JOB_SALARY_HISTOGRAM_BUCKETS', 20)
+
+# Фильтры, которые обслуживаются предрассчитанной таблицей
+PRECOMPUTED_FILTERS = ('employment_type', 'experience')
+
+# Параметры, не влияющие на гистограмму: собственный зарплатный фильтр слайдера
+# не применяется, иначе распределение вне выбранного диапазона пропадет
+IGNORED_FILTERS = ('skills_mode', 'min_salary', 'salary_from', 'salary_to')
+
+
+def salary_bucket(salary_min):
+    return min(max(salary_min or 0, 0) // SALARY_HISTOGRAM_STEP, SALARY_HISTOGRAM_BUCKETS - 1)
+
+
+def histogram_key(employment_type, experience, salary_min, is_active):
+    """
+    Ключ строки гистограммы для вакансии или None, если вакансия не учитывается.
+    """
+    if not is_active:
+        return None
+    return employment_type, experience, salary_bucket(salary_min)
+
+
+def job_histogram_key(job):
+    return histogram_key(job.employment_type, job.experience, job.salary_min, job.is_active)
+
+
+def loaded_histogram_key(job):
+    """
+    Ключ по значениям, с которыми вакансия была загружена из БД (Job.from_db).
+    """
+    loaded = getattr(job, '_loaded_values', None)
+    if not loaded:
+        return None
+    return histogram_key(
+        loaded.get('employment_type'), loaded.get('experience'),
+        loaded.get('salary_min'), loaded.get('is_active'),
+    )
+
+
+def adjust_salary_histogram(deltas):
+    """
+    Применяет изменения счетчиков {ключ: приращение} одним upsert-запросом.
+    """
+    rows = [(key[0], key[1], key[2], delta) for key, delta in deltas.items() if key and delta]
+    if not rows:
+        return
+    placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    params = [value for row in rows for value in row]
+    table = SalaryHistogramBucket._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (employment_type, experience, bucket, count)
+            VALUES {placeholders}
+            ON CONFLICT (employment_type, experience, bucket)
+            DO UPDATE SET count = {table}.count + EXCLUDED.count
+            """,
+            params,
+        )
+
+
+def record_job_saved(job, created):
+    old_key = None if created else loaded_histogram_key(job)
+    new_key = job_histogram_key(job)
+    if old_key != new_key:
+        adjust_salary_histogram({old_key: -1, new_key: 1})
+    # Остальные загруженные значения не теряются, а location обновляется,
+    # чтобы следующий Job.save не искал город в справочнике повторно
+    job._loaded_values = {
+        **(getattr(job, '_loaded_values', None) or {}),
+        'employment_type': job.employment_type,
+        'experience': job.experience,
+        'salary_min': job.salary_min,
+        'is_active': job.is_active,
+        'location': job.location,
+    }
+
+
+def record_jobs_added(jobs):
+    """
+    Учитывает вакансии, созданные в обход save() (например, через bulk_create).
+    """
+    adjust_salary_histogram(Counter(job_histogram_key(job) for job in jobs))
+
+
+def record_job_deleted(job):
+    key = loaded_histogram_key(job) or job_histogram_key(job)
+    adjust_salary_histogram({key: -1})
+
+
+def rebuild_salary_histogram():
+    """
+    Полностью пересчитывает таблицу гистограммы по текущим данным.
+    """
+    rows = bucketed(Job.objects.filter(is_active=True))\
+        .values('employment_type', 'experience', 'bucket')\
+        .annotate(total=Count('pk'))
+    with transaction.atomic():
+        SalaryHistogramBucket.objects.all().delete()
+        SalaryHistogramBucket.objects.bulk_create([
+            SalaryHistogramBucket(
+                employment_type=row['employment_type'],
+                experience=row['experience'],
+                bucket=row['bucket'],
+                count=row['total'],
+            )
+            for row in rows
+        ])
+
+
+def bucketed(queryset):
+    return queryset.order_by().annotate(
+        bucket=Least(
+            Greatest(F('salary_min'), Value(0)) / Value(SALARY_HISTOGRAM_STEP),
+            Value(SALARY_HISTOGRAM_BUCKETS - 1),
+        )
+    )
+
+
+def _is_precomputed(filters):
+    return not any(
+        value for name, value in filters.items()
+        if name not in PRECOMPUTED_FILTERS and name not in IGNORED_FILTERS
+    )
+
+
+def compute_salary_histogram(filters, active_only=True):
+    """
+    Гистограмма по текущим фильтрам. Если заданы только тип занятости и опыт,
+    ответ собирается из предрассчитанной таблицы (несколько сотен строк максимум),
+    иначе - одним GROUP BY по отфильтрованным вакансиям.
+    """
+    if active_only and _is_precomputed(filters):
+        # Только фильтры по типу занятости и опыту: читаем готовые счетчики
+        queryset = SalaryHistogramBucket.objects.all()
+        for name in PRECOMPUTED_FILTERS:
+            if filters[name]:
+                queryset = queryset.filter(**{name: filters[name]})
+        counts = dict(queryset.values_list('bucket').annotate(total=Sum('count')))
+    else:
+        queryset = Job.objects.all()
+        if active_only:
+            queryset = queryset.filter(is_active=True)
+        queryset = apply_job_filters(queryset, filters, ranked=False, facets=False)
+        conditions = facet_conditions(filters)
+        for name in PRECOMPUTED_FILTERS:
+            if name in conditions:
+                queryset = queryset.filter(conditions[name])
+        counts = dict(bucketed(queryset).values_list('bucket').annotate(total=Count('pk')))
+
+    buckets = []
+    for index in range(SALARY_HISTOGRAM_BUCKETS):
+        low = index * SALARY_HISTOGRAM_STEP
+        high = low + SALARY_HISTOGRAM_STEP if index < SALARY_HISTOGRAM_BUCKETS - 1 else None
+        buckets.append({'min': low, 'max': high, 'count': max(counts.get(index, 0), 0)})
+    return {'step': SALARY_HISTOGRAM_STEP, 'buckets': buckets}
+
+
+def get_salary_histogram(filters, active_only=True):
+    key = f"job_salary_histogram:{filters_signature(filters, active_only=active_only)}"
+    histogram = cache.get(key)
+    if histogram is None:
+        histogram = compute_salary_histogram(filters, active_only=active_only)
+        cache.set(key, histogram, getattr(settings, 'JOB_FACETS_CACHE_TTL', 60))
+    return histogram
@@ -0,0 +1,115 @@
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.db import connection, transaction
+from django.db.models import Exists, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, JSONObject
+
+from .models import ChatMessage, Conversation, ConversationUnread
+
+
+def record_message_created(message):
+    """
+    Вызывается из post_save нового сообщения: +1 к непрочитанным получателя
+    одним upsert-запросом.
+    """
+    if message.is_read or message.recipient_id is None:
+        return
+    table = ConversationUnread._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (conversation_id, user_id, count)
+            VALUES (%s, %s, 1)
+            ON CONFLICT (conversation_id, user_id)
+            DO UPDATE SET count = {table}.count + 1
+            """,
+            [message.conversation_id, message.recipient_id],
+        )
+
+
+def record_message_deleted(message):
+    """
+    Вызывается из post_delete сообщения. Счетчик только уменьшается (без вставки
+    строк, как и остальные счетчики), а если удалено последнее сообщение
+    диалога (ссылка уже обнулена SET NULL), последним становится предыдущее.
+    """
+    if not message.is_read:
+        ConversationUnread.objects.filter(
+            conversation_id=message.conversation_id, user_id=message.recipient_id, count__gt=0,
+        ).update(count=F('count') - 1)
+    Conversation.objects.filter(pk=message.conversation_id, last_message__isnull=True).update(
+        last_message=Subquery(
+            ChatMessage.objects.filter(conversation_id=OuterRef('pk'))
+            .order_by('-created_at', '-pk').values('pk')[:1]
+        )
+    )
+
+
+def mark_conversation_read(conversation_id, user_id):
+    """
+    Отмечает прочитанными сообщения диалога, адресованные пользователю, и
+    уменьшает его счетчик на их число: сообщение, пришедшее одновременно,
+    останется непрочитанным и в счетчике. Возвращает число отмеченных сообщений.
+    """
+    with transaction.atomic():
+        count = ChatMessage.objects.filter(
+            conversation_id=conversation_id, recipient_id=user_id, is_read=False,
+        ).update(is_read=True)
+        if count:
+            table = ConversationUnread._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET count = GREATEST(count - %s, 0) WHERE conversation_id = %s AND user_id = %s",
+                    [count, conversation_id, user_id],
+                )
+    return count
+
+
+def unread_count(conversation, user):
+    return ConversationUnread.objects.filter(conversation=conversation, user=user)\
+        .values_list('count', flat=True).first() or 0
+
+
+def unread_conversations_count(user):
+    """
+    Число диалогов пользователя с непрочитанными сообщениями.
+    """
+    return ConversationUnread.objects.filter(user=user, count__gt=0).count()
+
+
+def unread_by_job(user):
+    """
+    Непрочитанные сообщения пользователя по вакансиям диалогов {job_id: число}.
+    """
+    return dict(
+        ConversationUnread.objects.filter(user=user, count__gt=0).order_by()
+        .values_list('conversation__job').annotate(total=Sum('count'))
+    )
+
+
+def inbox_queryset(user):
+    """
+    Диалоги пользователя для списка одним запросом: вакансия и последнее
+    сообщение - через JOIN, участники - JSON-агрегатом, непрочитанные -
+    подзапросом к счетчику по уникальному индексу.
+    """
+    participants = Conversation.participants.through.objects.filter(conversation=OuterRef('pk'), user=user)
+    unread = ConversationUnread.objects.filter(conversation=OuterRef('pk'), user=user).values('count')[:1]
+    return (
+        Conversation.objects.filter(Exists(participants))
+        .select_related('job', 'last_message')
+        .annotate(
+            unread=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)),
+            participants_data=JSONBAgg(
+                JSONObject(
+                    id='participants__id',
+                    first_name='participants__first_name',
+                    last_name='participants__last_name',
+                    username='participants__username',
+                    company_name='participants__company_name',
+                    role='participants__role',
+                ),
+                ordering='participants__id',
+            ),
+        )
+        .order_by('-last_message_time', '-updated_at')
+    )
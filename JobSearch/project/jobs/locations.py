@@ -0,0 +1,143 @@
+import json
+import os
+import re
+
+from django.conf import settings
+
+# Локальный справочник городов, из которого заполняется таблица Location
+GAZETTEER_PATH = getattr(
+    settings, 'JOB_LOCATIONS_GAZETTEER',
+    os.path.join(os.path.dirname(__file__), 'data', 'locations.json'),
+)
+
+# Служебные слова, которые не относятся к названию города ("г. Алматы", "city of Almaty")
+LOCATION_NOISE_WORDS = {'г', 'город', 'гор', 'city', 'of', 'the', 'қ', 'қаласы'}
+
+
+def normalize_location(text):
+    """
+    Нормализует название города для сравнения: нижний регистр, ё -> е,
+    пунктуация (кроме дефиса) заменяется пробелами, служебные слова убираются.
+    """
+    text = (text or '').lower().replace('ё', 'е')
+    text = re.sub(r'[^\w\s-]', ' ', text)
+    words = [word.strip('-') for word in text.split()]
+    return ' '.join(word for word in words if word and word not in LOCATION_NOISE_WORDS)
+
+
+def location_keys(text):
+    """
+    Варианты ключей для поиска в справочнике: вся строка целиком и каждая
+    ее часть через запятую или слэш ("almaty, KZ" -> "almaty kz", "almaty", "kz").
+    """
+    keys = []
+    for part in [text or ''] + re.split(r'[,/;|()]', text or ''):
+        key = normalize_location(part)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def read_gazetteer(path=None):
+    """
+    Читает справочник и возвращает записи вида
+    {'name', 'name_en', 'country', 'aliases': [нормализованные варианты]}.
+    """
+    with open(path or GAZETTEER_PATH, encoding='utf-8') as f:
+        entries = json.load(f)
+    for entry in entries:
+        names = [entry['name'], entry.get('name_en', '')] + list(entry.get('aliases', []))
+        aliases = []
+        for name in names:
+            key = normalize_location(name)
+            if key and key not in aliases:
+                aliases.append(key)
+        yield {
+            'name': entry['name'],
+            'name_en': entry.get('name_en', ''),
+            'country': entry.get('country', ''),
+            'aliases': aliases,
+        }
+
+
+def load_gazetteer(path=None, location_model=None, alias_model=None):
+    """
+    Загружает (или обновляет) справочник городов и их синонимов.
+    Модели передаются явно из миграции, по умолчанию используются текущие.
+    Возвращает словарь {синоним: id города}.
+    """
+    if location_model is None or alias_model is None:
+        from .models import Location, LocationAlias
+        location_model, alias_model = Location, LocationAlias
+
+    alias_map = {}
+    for entry in read_gazetteer(path):
+        location, _ = location_model.objects.update_or_create(
+            name=entry['name'], country=entry['country'],
+            defaults={'name_en': entry['name_en']},
+        )
+        for alias in entry['aliases']:
+            alias_map.setdefault(alias, location.pk)
+
+    existing = dict(alias_model.objects.values_list('alias', 'location_id'))
+    alias_model.objects.bulk_create([
+        alias_model(alias=alias, location_id=location_id)
+        for alias, location_id in alias_map.items() if alias not in existing
+    ])
+    for alias, location_id in existing.items():
+        alias_map.setdefault(alias, location_id)
+    return alias_map
+
+
+def match_location_id(text, alias_map):
+    """
+    Ищет город по заранее загруженному словарю синонимов (для массовой обработки).
+    """
+    for key in location_keys(text):
+        if key in alias_map:
+            return alias_map[key]
+    return None
+
+
+def resolve_location(text):
+    """
+    Находит город справочника по свободному тексту одним запросом по
+    уникальному индексу синонимов. Возвращает Location или None.
+    """
+    from .models import LocationAlias
+
+    keys = location_keys(text)
+    if not keys:
+        return None
+    matches = {
+        alias.alias: alias.location
+        for alias in LocationAlias.objects.filter(alias__in=keys).select_related('location')
+    }
+    for key in keys:
+        if key in matches:
+            return matches[key]
+    return None
+
+
+def backfill_job_locations(job_model=None, alias_map=None, only_missing=True):
+    """
+    Проставляет Job.location_ref по текстовому полю location.
+    Обновление идет по уникальным значениям текста, а не по каждой вакансии.
+    Возвращает число обновленных вакансий.
+    """
+    if job_model is None:
+        from .models import Job
+        job_model = Job
+    if alias_map is None:
+        from .models import LocationAlias
+        alias_map = dict(LocationAlias.objects.values_list('alias', 'location_id'))
+
+    jobs = job_model.objects.all()
+    if only_missing:
+        jobs = jobs.filter(location_ref__isnull=True)
+    updated = 0
+    for text in jobs.order_by().values_list('location', flat=True).distinct():
+        location_id = match_location_id(text, alias_map)
+        if location_id is not None:
+            updated += jobs.filter(location=text).update(location_ref_id=location_id)
+    return updated
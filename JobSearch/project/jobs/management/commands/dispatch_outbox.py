@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from jobs.outbox import OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL, dispatch_pending, is_in_memory_layer
+
+
+class Command(BaseCommand):
+    help = 'Рассылает WebSocket-уведомления из таблицы outbox в channel layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Отправить накопившееся и завершиться')
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE, help='Размер пачки')
+        parser.add_argument('--interval', type=float, default=OUTBOX_POLL_INTERVAL, help='Пауза между проверками, сек')
+
+    def handle(self, *args, **options):
+        # Слой в памяти живет внутри процесса сервера: отдельный процесс до него не достанет
+        if is_in_memory_layer():
+            raise CommandError(
+                'InMemoryChannelLayer недоступен из отдельного процесса: настройте Redis '
+                'или оставьте рассылку в процессе приложения (NOTIFICATIONS_OUTBOX_IN_PROCESS)'
+            )
+        if options['once']:
+            sent = dispatch_pending(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Отправлено уведомлений: {sent}'))
+            return
+
+        self.stdout.write('Диспетчер уведомлений запущен')
+        while True:
+            try:
+                sent = dispatch_pending(options['batch_size'])
+                if sent:
+                    self.stdout.write(f'Отправлено уведомлений: {sent}')
+            except Exception as e:
+                self.stderr.write(f'Ошибка диспетчера уведомлений: {e}')
+                connection.close()
+            time.sleep(options['interval'])
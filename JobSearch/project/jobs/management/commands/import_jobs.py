@@ -0,0 +1,37 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.bulk_import import IMPORT_FORMATS, detect_format, import_jobs
+
+
+class Command(BaseCommand):
+    help = 'Импортирует вакансии работодателя из файла CSV или JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу')
+        parser.add_argument('--company', required=True, help='Имя пользователя или id работодателя')
+        parser.add_argument('--format', dest='file_format', choices=IMPORT_FORMATS, help='Формат файла')
+        parser.add_argument('--batch-size', type=int, help='Размер пачки bulk_create')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        company = options['company']
+        lookup = {'pk': company} if company.isdigit() else {'username': company}
+        try:
+            user = User.objects.get(role='employer', **lookup)
+        except User.DoesNotExist:
+            raise CommandError(f'Работодатель {company} не найден')
+
+        file_format = detect_format(options['path'], options['file_format'])
+        with open(options['path'], 'rb') as stream:
+            report = import_jobs(stream, user, file_format=file_format, batch_size=options['batch_size'])
+
+        for error in report['errors']:
+            self.stderr.write(f"Строка {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        if report['errors_truncated']:
+            self.stderr.write('Показаны не все ошибки')
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано вакансий: {report['created']}, строк с ошибками: {report['failed']}"
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from jobs.locations import backfill_job_locations, load_gazetteer
+
+
+class Command(BaseCommand):
+    help = 'Загружает справочник городов и проставляет город вакансиям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Путь к JSON-файлу справочника')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать город у всех вакансий, а не только у вакансий без города',
+        )
+
+    def handle(self, *args, **options):
+        alias_map = load_gazetteer(path=options['path'])
+        updated = backfill_job_locations(alias_map=alias_map, only_missing=not options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено синонимов: {len(alias_map)}, обновлено вакансий: {updated}'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from jobs.application_stats import rebuild_application_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики статистики откликов соискателей'
+
+    def handle(self, *args, **options):
+        rebuild_application_stats()
+        self.stdout.write(self.style.SUCCESS('Статистика откликов пересчитана'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from jobs.funnel import rebuild_job_funnel
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики воронки откликов по вакансиям'
+
+    def handle(self, *args, **options):
+        rebuild_job_funnel()
+        self.stdout.write(self.style.SUCCESS('Счетчики воронки откликов пересчитаны'))
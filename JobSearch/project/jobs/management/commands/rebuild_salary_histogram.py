@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from jobs.histogram import rebuild_salary_histogram
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает предрассчитанную зарплатную гистограмму вакансий'
+
+    def handle(self, *args, **options):
+        rebuild_salary_histogram()
+        self.stdout.write(self.style.SUCCESS('Гистограмма зарплат пересчитана'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from jobs.funnel import reconcile_applications_count
+
+
+class Command(BaseCommand):
+    help = 'Сверяет Job.applications_count с фактическим числом откликов и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Число вакансий в одной транзакции')
+
+    def handle(self, *args, **options):
+        checked, fixed = reconcile_applications_count(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено вакансий: {checked}, исправлено: {fixed}'
+        ))
@@ -0,0 +1,130 @@
+import hashlib
+from datetime import date
+
+import numpy as np
+import scipy.sparse as sp
+
+from .recommendations import skill_tokens
+
+# Вклад составляющих в оценку соответствия кандидата вакансии
+SKILLS_WEIGHT = 0.6
+EXPERIENCE_WEIGHT = 0.25
+SALARY_WEIGHT = 0.15
+
+# Минимальный опыт (в годах) для значений Job.experience
+REQUIRED_YEARS = {
+    'no_experience': 0,
+    '1-3': 1,
+    '3-5': 3,
+    '5+': 5,
+}
+
+
+def match_score_key(job, resume):
+    """
+    Ключ актуальности оценки: меняется при изменении вакансии или резюме
+    (включая опыт, образование и портфолио - они обновляют Resume.updated_at).
+    """
+    if resume is None:
+        payload = f"{job.pk}:{job.updated_at.isoformat()}:-"
+    else:
+        payload = f"{job.pk}:{job.updated_at.isoformat()}:{resume.pk}:{resume.updated_at.isoformat()}"
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def experience_years(resume_ids, experiences, today=None):
+    """
+    Суммарный опыт в годах для каждого резюме из resume_ids.
+    experiences: [(resume_id, start_date, end_date)]; незавершенная работа считается по сегодня.
+    """
+    today = today or date.today()
+    years = np.zeros(len(resume_ids))
+    if not experiences:
+        return years
+    position = {resume_id: index for index, resume_id in enumerate(resume_ids)}
+    rows = np.array([position[resume_id] for resume_id, start, end in experiences], dtype=np.int64)
+    days = np.array([((end or today) - start).days for resume_id, start, end in experiences], dtype=np.float64)
+    return np.bincount(rows, weights=np.maximum(days, 0), minlength=len(resume_ids)) / 365.25
+
+
+def score_applications(job, resumes, experiences):
+    """
+    Оценивает всех кандидатов одной вакансии за один проход.
+    resumes: список Resume (или None для отклика без резюме) в порядке откликов,
+    experiences: [(resume_id, start_date, end_date)] для этих резюме.
+    Возвращает массив оценок от 0 до 1.
+    """
+    count = len(resumes)
+    if not count:
+        return np.zeros(0)
+
+    # Навыки: доля требований вакансии, закрытых резюме (матрица кандидат x навык вакансии)
+    required = {token: index for index, token in enumerate(skill_tokens(job.skills))}
+    if required:
+        rows, columns = [], []
+        for row, resume in enumerate(resumes):
+            for token in skill_tokens(resume.skills if resume else []):
+                column = required.get(token)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        matrix = sp.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)), shape=(count, len(required))
+        )
+        skills = np.asarray(matrix.sum(axis=1)).ravel() / len(required)
+    else:
+        skills = np.ones(count)
+
+    # Опыт: 1, если суммарный стаж не меньше требуемого, иначе пропорционально
+    resume_ids = [resume.pk if resume else None for resume in resumes]
+    years = experience_years(resume_ids, experiences)
+    required_years = REQUIRED_YEARS.get(job.experience, 0)
+    if required_years:
+        experience = np.clip(years / required_years, 0, 1)
+    else:
+        experience = np.ones(count)
+
+    # Зарплата: 1, если ожидания укладываются в вилку, иначе по отношению к salary_max
+    expectations = np.array([
+        (resume.salary_expectation or 0) if resume else 0 for resume in resumes
+    ], dtype=np.float64)
+    salary = np.ones(count)
+    over = expectations > job.salary_max
+    if job.salary_max > 0:
+        salary[over] = job.salary_max / expectations[over]
+    else:
+        salary[over] = 0
+
+    scores = SKILLS_WEIGHT * skills + EXPERIENCE_WEIGHT * experience + SALARY_WEIGHT * salary
+    # Отклик без резюме сравнивать не с чем
+    scores[np.array([resume is None for resume in resumes])] = 0
+    return scores
+
+
+def refresh_match_scores(job, applications):
+    """
+    Пересчитывает оценки у откликов, для которых вакансия или резюме изменились
+    с прошлого расчета, и сохраняет их одним bulk_update.
+    applications должны быть загружены с select_related('resume').
+    """
+    from users.models import Experience
+    from .models import JobApplication
+
+    stale = []
+    for application in applications:
+        key = match_score_key(job, application.resume)
+        if application.match_score is None or application.match_score_key != key:
+            application.match_score_key = key
+            stale.append(application)
+    if not stale:
+        return
+
+    resumes = [application.resume for application in stale]
+    resume_ids = {resume.pk for resume in resumes if resume is not None}
+    experiences = list(
+        Experience.objects.filter(resume_id__in=resume_ids).values_list('resume_id', 'start_date', 'end_date')
+    )
+    scores = score_applications(job, resumes, experiences)
+    for application, score in zip(stale, scores):
+        application.match_score = round(float(score), 4)
+    JobApplication.objects.bulk_update(stale, ['match_score', 'match_score_key'], batch_size=500)
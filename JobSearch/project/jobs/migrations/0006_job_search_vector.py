@@ -0,0 +1,67 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:38
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Вектор собирается сразу в двух конфигурациях (русской и английской), чтобы
+# работала морфология для вакансий на обоих языках. Веса: название - A,
+# навыки - B, требования - C, описание - D.
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION jobs_job_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    skills_text text;
+BEGIN
+    IF jsonb_typeof(NEW.skills) = 'array' THEN
+        SELECT string_agg(value, ' ') INTO skills_text
+        FROM jsonb_array_elements_text(NEW.skills);
+    ELSE
+        skills_text := NEW.skills::text;
+    END IF;
+
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(skills_text, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(skills_text, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(NEW.requirements, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(NEW.requirements, '')), 'C') ||
+        setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'D') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER jobs_job_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, requirements, skills
+    ON jobs_job
+    FOR EACH ROW EXECUTE FUNCTION jobs_job_search_vector_update();
+
+UPDATE jobs_job SET title = title;
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS jobs_job_search_vector_trigger ON jobs_job;
+DROP FUNCTION IF EXISTS jobs_job_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_make_conversation_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='job_search_vector_gin'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
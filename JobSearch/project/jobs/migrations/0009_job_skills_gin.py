@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:42
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_job_keyset_ordering'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['skills'], name='job_skills_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_salary_histogram(apps, schema_editor):
+    """
+    Заполняет гистограмму по существующим активным вакансиям.
+    """
+    Job = apps.get_model('jobs', 'Job')
+    SalaryHistogramBucket = apps.get_model('jobs', 'SalaryHistogramBucket')
+    # Те же настройки, что и в jobs/histogram.py, иначе интервалы разойдутся со счетчиками
+    step = getattr(settings, 'JOB_SALARY_HISTOGRAM_STEP', 25000)
+    buckets = getattr(settings, 'JOB_SALARY_HISTOGRAM_BUCKETS', 20)
+
+    counts = {}
+    rows = Job.objects.filter(is_active=True).values_list('employment_type', 'experience', 'salary_min')
+    for employment_type, experience, salary_min in rows.iterator(chunk_size=2000):
+        bucket = min(max(salary_min or 0, 0) // step, buckets - 1)
+        key = (employment_type, experience, bucket)
+        counts[key] = counts.get(key, 0) + 1
+
+    SalaryHistogramBucket.objects.bulk_create([
+        SalaryHistogramBucket(employment_type=key[0], experience=key[1], bucket=key[2], count=count)
+        for key, count in counts.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_job_skills_gin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalaryHistogramBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employment_type', models.CharField(max_length=20)),
+                ('experience', models.CharField(max_length=20)),
+                ('bucket', models.PositiveIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['salary_min', 'salary_max'], name='job_salary_range_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='salaryhistogrambucket',
+            unique_together={('employment_type', 'experience', 'bucket')},
+        ),
+        migrations.RunPython(populate_salary_histogram, migrations.RunPython.noop),
+    ]
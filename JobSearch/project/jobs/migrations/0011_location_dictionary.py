@@ -0,0 +1,102 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:46
+
+import json
+import os
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Копия логики jobs/locations.py на момент миграции: миграция не должна
+# зависеть от текущего кода приложения
+GAZETTEER_PATH = getattr(
+    settings, 'JOB_LOCATIONS_GAZETTEER',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'locations.json'),
+)
+LOCATION_NOISE_WORDS = {'г', 'город', 'гор', 'city', 'of', 'the', 'қ', 'қаласы'}
+
+
+def normalize_location(text):
+    text = (text or '').lower().replace('ё', 'е')
+    text = re.sub(r'[^\w\s-]', ' ', text)
+    words = [word.strip('-') for word in text.split()]
+    return ' '.join(word for word in words if word and word not in LOCATION_NOISE_WORDS)
+
+
+def location_keys(text):
+    keys = []
+    for part in [text or ''] + re.split(r'[,/;|()]', text or ''):
+        key = normalize_location(part)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def load_locations(apps, schema_editor):
+    """
+    Заполняет справочник городов и проставляет город существующим вакансиям.
+    """
+    Location = apps.get_model('jobs', 'Location')
+    LocationAlias = apps.get_model('jobs', 'LocationAlias')
+    Job = apps.get_model('jobs', 'Job')
+
+    with open(GAZETTEER_PATH, encoding='utf-8') as f:
+        entries = json.load(f)
+    alias_map = {}
+    for entry in entries:
+        location, _ = Location.objects.update_or_create(
+            name=entry['name'], country=entry.get('country', ''),
+            defaults={'name_en': entry.get('name_en', '')},
+        )
+        for name in [entry['name'], entry.get('name_en', '')] + list(entry.get('aliases', [])):
+            key = normalize_location(name)
+            if key:
+                alias_map.setdefault(key, location.pk)
+    LocationAlias.objects.bulk_create([
+        LocationAlias(alias=alias, location_id=location_id) for alias, location_id in alias_map.items()
+    ])
+
+    jobs = Job.objects.filter(location_ref__isnull=True)
+    for text in jobs.order_by().values_list('location', flat=True).distinct():
+        for key in location_keys(text):
+            if key in alias_map:
+                jobs.filter(location=text).update(location_ref_id=alias_map[key])
+                break
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0010_salary_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('name_en', models.CharField(blank=True, max_length=100)),
+                ('country', models.CharField(blank=True, max_length=2)),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('name', 'country')},
+            },
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='location_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='jobs.location'),
+        ),
+        migrations.CreateModel(
+            name='LocationAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='jobs.location')),
+            ],
+        ),
+        migrations.RunPython(load_locations, migrations.RunPython.noop),
+    ]
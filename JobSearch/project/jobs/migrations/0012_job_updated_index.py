@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0011_location_dictionary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['updated_at'], name='job_updated_idx'),
+        ),
+    ]
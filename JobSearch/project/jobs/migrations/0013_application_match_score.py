@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0012_job_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobapplication',
+            name='match_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobapplication',
+            name='match_score_key',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0013_application_match_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_application_stats(apps, schema_editor):
+    """
+    Заполняет счетчики по существующим откликам одним INSERT ... SELECT.
+    """
+    schema_editor.execute(
+        """
+        INSERT INTO jobs_applicationstatscounter (applicant_id, employment_type, experience, status, count)
+        SELECT application.applicant_id, job.employment_type, job.experience, application.status, COUNT(*)
+        FROM jobs_jobapplication AS application
+        JOIN jobs_job AS job ON job.id = application.job_id
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0014_job_views_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationStatsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employment_type', models.CharField(max_length=20)),
+                ('experience', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('applicant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='application_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('applicant', 'employment_type', 'experience', 'status')},
+            },
+        ),
+        migrations.RunPython(populate_application_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_job_funnel(apps, schema_editor):
+    """
+    Заполняет счетчики воронки по существующим откликам.
+    """
+    schema_editor.execute(
+        """
+        INSERT INTO jobs_jobfunnelcounter (job_id, status, count)
+        SELECT job_id, status, COUNT(*) FROM jobs_jobapplication GROUP BY job_id, status
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0015_application_stats'),
+        ('users', '0006_resume_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployerDashboardVisit',
+            fields=[
+                ('employer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_visit', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('visited_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='new_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='JobFunnelCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funnel_counters', to='jobs.job')),
+            ],
+            options={
+                'unique_together': {('job', 'status')},
+            },
+        ),
+        migrations.RunPython(populate_job_funnel, migrations.RunPython.noop),
+    ]
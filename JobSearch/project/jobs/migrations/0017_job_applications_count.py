@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+def populate_applications_count(apps, schema_editor):
+    """
+    Заполняет счетчик по существующим откликам.
+    """
+    schema_editor.execute(
+        """
+        UPDATE jobs_job AS job SET applications_count = actual.total
+        FROM (SELECT job_id, COUNT(*) AS total FROM jobs_jobapplication GROUP BY job_id) AS actual
+        WHERE job.id = actual.job_id
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0016_job_funnel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='applications_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_applications_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def populate_conversation_keys(apps, schema_editor):
+    """
+    Заполняет conversation_key существующих диалогов пачками по id. Если у одной
+    пары участников и вакансии несколько диалогов, ключ пары получает первый
+    из них, остальные - "conv_<pk>" (так же их находил прежний перебор).
+    """
+    Conversation = apps.get_model('jobs', 'Conversation')
+    ids = list(Conversation.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        schema_editor.execute(
+            """
+            WITH keys AS (
+                SELECT conversation.id,
+                       CASE WHEN COUNT(participant.user_id) = 2
+                            THEN MIN(participant.user_id) || '_' || MAX(participant.user_id) || '_'
+                                 || COALESCE(conversation.job_id::text, 'none')
+                            ELSE 'conv_' || conversation.id END AS key
+                FROM jobs_conversation AS conversation
+                LEFT JOIN jobs_conversation_participants AS participant
+                    ON participant.conversation_id = conversation.id
+                WHERE conversation.id BETWEEN %s AND %s
+                GROUP BY conversation.id
+            ), ranked AS (
+                SELECT id, key, ROW_NUMBER() OVER (PARTITION BY key ORDER BY id) AS position
+                FROM keys
+            )
+            UPDATE jobs_conversation AS conversation
+            SET conversation_key = CASE
+                WHEN ranked.position = 1 AND NOT EXISTS (
+                    SELECT 1 FROM jobs_conversation AS other WHERE other.conversation_key = ranked.key
+                ) THEN ranked.key
+                ELSE 'conv_' || ranked.id END
+            FROM ranked
+            WHERE conversation.id = ranked.id AND conversation.conversation_key IS NULL
+            """,
+            [batch[0], batch[-1]],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0018_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='conversation_key',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(populate_conversation_keys, migrations.RunPython.noop),
+    ]
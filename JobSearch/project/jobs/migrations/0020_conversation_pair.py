@@ -0,0 +1,73 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def populate_conversation_pairs(apps, schema_editor):
+    """
+    Заполняет user_low/user_high диалогов двух участников пачками по id. Из
+    дублей одной пары и вакансии пару получает только первый диалог.
+    """
+    Conversation = apps.get_model('jobs', 'Conversation')
+    ids = list(Conversation.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        schema_editor.execute(
+            """
+            WITH pairs AS (
+                SELECT conversation.id, conversation.job_id,
+                       MIN(participant.user_id) AS user_low, MAX(participant.user_id) AS user_high
+                FROM jobs_conversation AS conversation
+                JOIN jobs_conversation_participants AS participant
+                    ON participant.conversation_id = conversation.id
+                WHERE conversation.id BETWEEN %s AND %s
+                GROUP BY conversation.id
+                HAVING COUNT(participant.user_id) = 2
+            ), ranked AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY user_low, user_high, job_id ORDER BY id) AS position
+                FROM pairs
+            )
+            UPDATE jobs_conversation AS conversation
+            SET user_low_id = ranked.user_low, user_high_id = ranked.user_high
+            FROM ranked
+            WHERE conversation.id = ranked.id AND ranked.position = 1 AND NOT EXISTS (
+                SELECT 1 FROM jobs_conversation AS other
+                WHERE other.user_low_id = ranked.user_low AND other.user_high_id = ranked.user_high
+                  AND other.job_id IS NOT DISTINCT FROM ranked.job_id
+            )
+            """,
+            [batch[0], batch[-1]],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0019_conversation_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='user_high',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_low',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(populate_conversation_pairs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(condition=models.Q(('job__isnull', False)), fields=('user_low', 'user_high', 'job'), name='unique_job_conversation_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(condition=models.Q(('job__isnull', True)), fields=('user_low', 'user_high'), name='unique_direct_conversation_pair'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_inbox(apps, schema_editor):
+    """
+    Заполняет последнее сообщение диалогов и счетчики непрочитанных
+    по существующим сообщениям.
+    """
+    schema_editor.execute(
+        """
+        UPDATE jobs_conversation AS conversation SET last_message_id = latest.id
+        FROM (
+            SELECT DISTINCT ON (conversation_id) conversation_id, id
+            FROM jobs_chatmessage
+            ORDER BY conversation_id, created_at DESC, id DESC
+        ) AS latest
+        WHERE conversation.id = latest.conversation_id
+        """
+    )
+    schema_editor.execute(
+        """
+        INSERT INTO jobs_conversationunread (conversation_id, user_id, count)
+        SELECT conversation_id, recipient_id, COUNT(*)
+        FROM jobs_chatmessage
+        WHERE NOT is_read
+        GROUP BY conversation_id, recipient_id
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0020_conversation_pair'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='jobs.chatmessage'),
+        ),
+        migrations.CreateModel(
+            name='ConversationUnread',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='jobs.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('conversation', 'user')},
+            },
+        ),
+        migrations.RunPython(populate_inbox, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import DatabaseError, models, transaction
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 import re
 
 def sanitize_id(name):
@@ -15,6 +17,31 @@ def sanitize_id(name):
         
     return sanitized
 
+class Location(models.Model):
+    """
+    Город из справочника (jobs/data/locations.json).
+    """
+    name = models.CharField(max_length=100)
+    name_en = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=2, blank=True)
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ('name', 'country')
+
+    def __str__(self):
+        return self.name
+
+class LocationAlias(models.Model):
+    """
+    Нормализованный вариант написания города (см. jobs.locations.normalize_location).
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='aliases')
+    alias = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return f"{self.alias} -> {self.location}"
+
 class Job(models.Model):
     EMPLOYMENT_TYPE_CHOICES = (
         ('full_time', 'Full time'),
@@ -29,10 +56,17 @@ class Job(models.Model):
         ('3-5', '3-5 years'),
         ('5+', '5+ years'),
     )
+
+    # Поля, которые не перезаписываются обычным save()
+    COUNTER_FIELDS = ('views_count', 'applications_count', 'new_applications')
     
     title = models.CharField(max_length=200)
     company = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='posted_jobs')
     location = models.CharField(max_length=100)
+    # Город из справочника, определяется по location при сохранении
+    location_ref = models.ForeignKey(
+        Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs'
+    )
     salary_min = models.IntegerField()
     salary_max = models.IntegerField()
     description = models.TextField()
@@ -43,13 +77,90 @@ class Job(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
-    
+    # Число просмотров; копится в буфере и записывается пачками (jobs/view_counter.py)
+    views_count = models.PositiveIntegerField(default=0, editable=False)
+    # Число откликов; меняется атомарными UPDATE из сигналов JobApplication (см. jobs/funnel.py)
+    applications_count = models.PositiveIntegerField(default=0, editable=False)
+    # Новые отклики с последнего просмотра панели работодателя (см. jobs/funnel.py)
+    new_applications = models.PositiveIntegerField(default=0, editable=False)
+    # Поисковый вектор по названию, описанию, требованиям и навыкам.
+    # Заполняется триггером в БД (см. миграцию 0006), вручную не изменяется
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Индекс под сортировку списка и курсорную пагинацию
+            models.Index(fields=['-created_at', '-id'], name='job_created_id_idx'),
+            # Индекс под инкрементальную синхронизацию каталога рекомендаций
+            models.Index(fields=['updated_at'], name='job_updated_idx'),
+            # Индекс под фильтрацию по пересечению зарплатных вилок
+            models.Index(fields=['salary_min', 'salary_max'], name='job_salary_range_idx'),
+            GinIndex(fields=['search_vector'], name='job_search_vector_gin'),
+            # Триграммные индексы для нечеткого поиска по названию и городу
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='job_title_trgm'),
+            GinIndex(fields=['location'], opclasses=['gin_trgm_ops'], name='job_location_trgm'),
+            # jsonb_path_ops: компактный индекс под оператор @> для фильтра по навыкам
+            GinIndex(fields=['skills'], opclasses=['jsonb_path_ops'], name='job_skills_gin'),
+        ]
     
     def __str__(self):
         return f"{self.title} at {self.company.company_name}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        counters_skipped = update_fields is None and not self._state.adding and not kwargs.get('force_insert')
+        if counters_skipped:
+            # Счетчики меняются только отдельными UPDATE (см. jobs/view_counter.py);
+            # обычное сохранение не должно перетирать их значениями, загруженными с объектом
+            deferred = self.get_deferred_fields()
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        loaded = getattr(self, '_loaded_values', None) or {}
+        location_changed = self.location_ref_id is None or loaded.get('location') != self.location
+        if location_changed and (update_fields is None or 'location' in update_fields):
+            from .locations import resolve_location
+            self.location_ref = resolve_location(self.location)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'location_ref'}
+        try:
+            super().save(*args, **kwargs)
+        except DatabaseError as error:
+            # Строки уже нет (удалена параллельно): UPDATE по update_fields ничего
+            # не затронул. Как и обычное сохранение, вставляем ее заново целиком.
+            # Ошибки самой БД приходят подклассами DatabaseError и пробрасываются
+            if not counters_skipped or type(error) is not DatabaseError or self.get_deferred_fields():
+                raise
+            kwargs.pop('update_fields')
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженные значения, чтобы сигналы могли посчитать изменения
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+class SalaryHistogramBucket(models.Model):
+    """
+    Предрассчитанное число активных вакансий в зарплатном интервале (по salary_min)
+    для каждой комбинации типа занятости и опыта. Поддерживается инкрементально
+    сигналами Job (см. jobs/histogram.py).
+    """
+    employment_type = models.CharField(max_length=20)
+    experience = models.CharField(max_length=20)
+    bucket = models.PositiveIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('employment_type', 'experience', 'bucket')
+
+    def __str__(self):
+        return f"{self.employment_type}/{self.experience} #{self.bucket}: {self.count}"
+
 class JobApplication(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -65,6 +176,10 @@ class JobApplication(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Оценка соответствия кандидата вакансии и ключ, при котором она посчитана
+    # (см. jobs/matching.py); пересчитывается, когда меняется вакансия или резюме
+    match_score = models.FloatField(null=True, blank=True)
+    match_score_key = models.CharField(max_length=32, blank=True, editable=False)
     
     class Meta:
         unique_together = ('job', 'applicant')
@@ -73,6 +188,63 @@ class JobApplication(models.Model):
     def __str__(self):
         return f"Application for {self.job.title} by {self.applicant.username}"
 
+    def save(self, *args, **kwargs):
+        # Счетчики воронки и статистики обновляются в post_save - в той же транзакции
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Загруженные значения нужны сигналам, чтобы учесть смену статуса в счетчиках
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+class ApplicationStatsCounter(models.Model):
+    """
+    Число откликов соискателя по типу занятости и опыту вакансии и статусу отклика.
+    Поддерживается инкрементально сигналами JobApplication и Job
+    (см. jobs/application_stats.py), чтобы статистика читалась одним запросом по индексу.
+    """
+    applicant = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='application_stats')
+    employment_type = models.CharField(max_length=20)
+    experience = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('applicant', 'employment_type', 'experience', 'status')
+
+    def __str__(self):
+        return f"{self.applicant_id} {self.employment_type}/{self.experience}/{self.status}: {self.count}"
+
+class JobFunnelCounter(models.Model):
+    """
+    Число откликов на вакансию в каждом статусе. Поддерживается сигналами
+    JobApplication в транзакции сохранения отклика (см. jobs/funnel.py).
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='funnel_counters')
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('job', 'status')
+
+    def __str__(self):
+        return f"{self.job_id}/{self.status}: {self.count}"
+
+class EmployerDashboardVisit(models.Model):
+    """
+    Время последнего просмотра панели работодателя.
+    """
+    employer = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='dashboard_visit'
+    )
+    visited_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.employer_id}: {self.visited_at}"
+
 class SavedJob(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='saved_jobs')
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='saved_by')
@@ -91,9 +263,30 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_message_time = models.DateTimeField(null=True, blank=True)
+    # Канонический строковый id диалога ("<id1>_<id2>_<вакансия|none>" или "conv_<pk>"),
+    # заполняется после добавления участников (см. jobs/conversations.py)
+    conversation_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    # Участники диалога двух пользователей по возрастанию id: по ним и вакансии
+    # существующий диалог находится одним запросом по уникальному индексу
+    user_low = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    user_high = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Последнее сообщение диалога для списка диалогов, обновляется в ChatMessage.save
+    last_message = models.ForeignKey('ChatMessage', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     
     class Meta:
         ordering = ['-last_message_time', '-updated_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_low', 'user_high', 'job'],
+                condition=models.Q(job__isnull=False),
+                name='unique_job_conversation_pair',
+            ),
+            models.UniqueConstraint(
+                fields=['user_low', 'user_high'],
+                condition=models.Q(job__isnull=True),
+                name='unique_direct_conversation_pair',
+            ),
+        ]
     
     def __str__(self):
         participants_str = ", ".join([str(user) for user in self.participants.all()])
@@ -102,6 +295,8 @@ class Conversation(models.Model):
     
     @property
     def conversation_id(self):
+        if self.conversation_key:
+            return self.conversation_key
         participants = sorted(list(self.participants.values_list('id', flat=True)))
         if len(participants) != 2:
             return sanitize_id(f"conv_{self.id}")
@@ -129,10 +324,48 @@ class ChatMessage(models.Model):
         return f"Message from {self.sender} to {self.recipient}"
     
     def save(self, *args, **kwargs):
-        # Обновляем время последнего сообщения в диалоге при сохранении сообщения
+        # Обновляем последнее сообщение диалога при сохранении сообщения; счетчик
+        # непрочитанных обновляется в post_save - все в одной транзакции
         is_new = self.pk is None
-        super().save(*args, **kwargs)
-        
-        if is_new and self.conversation:
-            self.conversation.last_message_time = self.created_at
-            self.conversation.save(update_fields=['last_message_time', 'updated_at'])
\ No newline at end of file
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            
+            if is_new and self.conversation:
+                self.conversation.last_message = self
+                self.conversation.last_message_time = self.created_at
+                self.conversation.save(update_fields=['last_message', 'last_message_time', 'updated_at'])
+
+class ConversationUnread(models.Model):
+    """
+    Число непрочитанных сообщений участника в диалоге. Поддерживается сигналами
+    ChatMessage и отметкой о прочтении (см. jobs/inbox.py).
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='unread_counters')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='unread_counters')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('conversation', 'user')
+
+    def __str__(self):
+        return f"{self.conversation_id}/{self.user_id}: {self.count}"
+
+class OutboxMessage(models.Model):
+    """
+    Уведомление для WebSocket, записанное в той же транзакции, что и изменения,
+    о которых оно сообщает. В channel layer его отправляет диспетчер
+    (см. jobs/outbox.py и команду dispatch_outbox), запрос Redis не ждет.
+    """
+    group = models.CharField(max_length=100)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # До какого времени уведомление забрал диспетчер; после срока его подберет другой
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.group}: {self.payload.get('type')}"
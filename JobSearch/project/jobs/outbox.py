@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import threading
+import time
+
+from asgiref.sync import SyncToAsync, async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import OutboxMessage
+
+# Сколько уведомлений отправлять за один проход диспетчера
+OUTBOX_BATCH_SIZE = getattr(settings, 'NOTIFICATIONS_OUTBOX_BATCH_SIZE', 200)
+# Как часто диспетчер проверяет таблицу без явного сигнала, в секундах
+OUTBOX_POLL_INTERVAL = getattr(settings, 'NOTIFICATIONS_OUTBOX_POLL_INTERVAL', 1)
+# После скольких неудачных попыток уведомление удаляется
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS', 10)
+# На сколько секунд диспетчер забирает пачку: если он упадет, не успев отправить,
+# по истечении срока пачку подберет другой
+OUTBOX_CLAIM_TIMEOUT = getattr(settings, 'NOTIFICATIONS_OUTBOX_CLAIM_TIMEOUT', 60)
+# Запускать диспетчер фоновым потоком в процессе приложения. Если уведомления
+# рассылает отдельный процесс (python manage.py dispatch_outbox, только с Redis:
+# слой в памяти из другого процесса недоступен), выключите
+NOTIFICATIONS_OUTBOX_IN_PROCESS = getattr(settings, 'NOTIFICATIONS_OUTBOX_IN_PROCESS', True)
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_notification(group, message):
+    """
+    Записывает уведомление для группы channel layer в текущей транзакции.
+    Если транзакция откатится, уведомление не уйдет; после коммита
+    фоновый диспетчер процесса (если включен) будится сразу.
+    """
+    OutboxMessage.objects.create(group=group, payload=message)
+    if NOTIFICATIONS_OUTBOX_IN_PROCESS:
+        transaction.on_commit(dispatcher.wake)
+
+
+def enqueue_notifications(messages):
+    """
+    То же для нескольких уведомлений [(группа, сообщение)] одним INSERT.
+    """
+    OutboxMessage.objects.bulk_create([
+        OutboxMessage(group=group, payload=message) for group, message in messages
+    ])
+    if NOTIFICATIONS_OUTBOX_IN_PROCESS:
+        transaction.on_commit(dispatcher.wake)
+
+
+async def _send_all(channel_layer, messages):
+    sent = []
+    for message in messages:
+        try:
+            await channel_layer.group_send(message.group, message.payload)
+        except Exception as e:
+            return sent, message, e
+        sent.append(message.pk)
+    return sent, None, None
+
+
+def is_in_memory_layer(channel_layer=None):
+    return isinstance(channel_layer or get_channel_layer(), InMemoryChannelLayer)
+
+
+def _send(channel_layer, messages):
+    if is_in_memory_layer(channel_layer):
+        # Очереди слоя в памяти (режим отладки) принадлежат циклу событий сервера и
+        # не потокобезопасны: отправляем в этом цикле, ожидая результат в своем потоке.
+        # Если цикл остановится, по таймауту пачка вернется в очередь после истечения claim
+        future = asyncio.run_coroutine_threadsafe(_send_all(channel_layer, messages), dispatcher.server_loop)
+        return future.result(timeout=OUTBOX_CLAIM_TIMEOUT)
+    return async_to_sync(_send_all)(channel_layer, messages)
+
+
+def claim_batch(batch_size=None):
+    """
+    Забирает пачку неотправленных уведомлений в порядке записи одним коротким
+    UPDATE: строки помечаются claimed_until и блокируются только на время
+    этого запроса (SKIP LOCKED), поэтому несколько диспетчеров не отправляют
+    одно и то же. Возвращает забранные уведомления.
+    """
+    table = OutboxMessage._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} SET claimed_until = NOW() + make_interval(secs => %s)
+            WHERE id IN (
+                SELECT id FROM {table}
+                WHERE claimed_until IS NULL OR claimed_until < NOW()
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id
+            """,
+            [OUTBOX_CLAIM_TIMEOUT, batch_size or OUTBOX_BATCH_SIZE],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    return list(OutboxMessage.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def dispatch_batch(batch_size=None):
+    """
+    Отправляет одну пачку уведомлений и удаляет отправленные. Отправка идет вне
+    транзакции и без блокировок: пачка забрана заранее (см. claim_batch).
+    На первой ошибке отправка останавливается, неотправленный остаток
+    возвращается в очередь. Возвращает число отправленных уведомлений.
+    """
+    channel_layer = get_channel_layer()
+    if is_in_memory_layer(channel_layer) and not dispatcher.has_server_loop():
+        # Слой в памяти доступен только из цикла событий ASGI-сервера этого процесса;
+        # пока он неизвестен (не было запроса через ASGI), уведомления ждут в таблице:
+        # отправка в другой цикл "удалась" бы, но до потребителей не дошла
+        return 0
+    messages = claim_batch(batch_size)
+    if not messages:
+        return 0
+    sent, failed, error = _send(channel_layer, messages)
+    with transaction.atomic():
+        if sent:
+            OutboxMessage.objects.filter(pk__in=sent).delete()
+        if failed is not None:
+            logger.error("Ошибка отправки уведомления %s в %s: %s", failed.pk, failed.group, error)
+            if failed.attempts + 1 >= OUTBOX_MAX_ATTEMPTS:
+                failed.delete()
+            else:
+                OutboxMessage.objects.filter(pk=failed.pk).update(
+                    attempts=failed.attempts + 1, last_error=str(error)[:1000], claimed_until=None
+                )
+            OutboxMessage.objects.filter(
+                pk__in=[message.pk for message in messages if message.pk not in sent and message is not failed]
+            ).update(claimed_until=None)
+    return len(sent)
+
+
+def dispatch_pending(batch_size=None):
+    """
+    Отправляет пачками все накопившиеся уведомления. Возвращает их число.
+    """
+    batch_size = batch_size or OUTBOX_BATCH_SIZE
+    total = 0
+    while True:
+        sent = dispatch_batch(batch_size)
+        total += sent
+        # Неполная пачка: таблица пуста или отправка сорвалась - повторим в следующий проход
+        if sent < batch_size:
+            return total
+
+
+class OutboxDispatcher:
+    """
+    Фоновый поток процесса, который рассылает уведомления из таблицы.
+    Будится после коммита транзакции с новым уведомлением, а также раз в
+    OUTBOX_POLL_INTERVAL секунд подбирает записи других процессов и повторы.
+    """
+
+    def __init__(self, interval=OUTBOX_POLL_INTERVAL):
+        self.interval = interval
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.server_loop = None
+
+    def wake(self):
+        # Рассылка всегда идет в фоновом потоке: запрос не ждет channel layer.
+        # Запоминаем цикл событий ASGI-сервера, если запрос выполняется в нем (см. _send)
+        loop = getattr(SyncToAsync.threadlocal, 'main_event_loop', None)
+        if loop is not None:
+            self.server_loop = loop
+        self._ensure_thread()
+        self.event.set()
+
+    def has_server_loop(self):
+        return self.server_loop is not None and self.server_loop.is_running()
+
+    def _ensure_thread(self):
+        # Поток запускается лениво: после fork воркера, а не в мастер-процессе
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, name='outbox-dispatcher', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            self.event.wait(self.interval)
+            self.event.clear()
+            try:
+                dispatch_pending()
+            except Exception:
+                logger.exception("Ошибка диспетчера уведомлений")
+                time.sleep(self.interval)
+            finally:
+                connection.close()
+
+
+dispatcher = OutboxDispatcher()
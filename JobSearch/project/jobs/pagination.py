@@ -0,0 +1,168 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по полям сортировки queryset.
+
+    По умолчанию сортировка совпадает с Job.Meta.ordering: (-created_at, -id).
+    Вместо OFFSET курсор хранит значения полей последней строки страницы,
+    поэтому любая страница выбирается одним проходом по индексу с той же
+    стоимостью, что и первая. Если queryset отсортирован иначе (например, по
+    релевантности поиска), курсор строится по этим полям.
+    """
+    page_size = getattr(settings, 'JOB_LIST_PAGE_SIZE', 20)
+    max_page_size = getattr(settings, 'JOB_LIST_MAX_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverse = False
+        if cursor is not None:
+            values, reverse = cursor
+            queryset = queryset.filter(self.build_keyset_filter(values, reverse))
+
+        order_by = [self.flip(field) if reverse else field for field in self.ordering]
+        rows = list(queryset.order_by(*order_by)[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # При движении назад "следующая" страница есть всегда (мы с нее пришли)
+        if reverse:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        self.next_values = self.row_values(rows[-1]) if has_next and rows else None
+        self.previous_values = self.row_values(rows[0]) if has_previous and rows else None
+        return rows
+
+    def get_state(self):
+        """
+        Состояние страницы, достаточное для построения ссылок без запроса к БД
+        (используется кэшем списков, см. jobs/cache.py).
+        """
+        return {
+            'ordering': self.ordering,
+            'next': self.next_values,
+            'previous': self.previous_values,
+        }
+
+    def restore_state(self, request, state):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = state['ordering']
+        self.next_values = state['next']
+        self.previous_values = state['previous']
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Берет сортировку из queryset (или Meta.ordering модели) и гарантирует,
+        что последним полем идет первичный ключ - без него курсор неоднозначен.
+        """
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        ordering = [field for field in ordering if isinstance(field, str)]
+        names = [field.lstrip('-') for field in ordering]
+        if 'id' not in names and 'pk' not in names:
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    def build_keyset_filter(self, values, reverse):
+        """
+        Условие "строго после курсора" в лексикографическом порядке сортировки.
+        Дополнительная граница по первому полю позволяет PostgreSQL начать
+        сканирование индекса сразу с позиции курсора.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') != reverse else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{bound}': values[0]}) & condition
+
+    def row_values(self, row):
+        values = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip('-'))
+            # isoformat сохраняет микросекунды, иначе совпадающие created_at потеряются
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def flip(self, field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps(
+            {'o': self.ordering, 'v': values, 'r': reverse}, separators=(',', ':')
+        )
+        return urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = payload['v']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        # Курсор от другой сортировки (например, от другого поискового запроса) недействителен
+        if payload.get('o') != self.ordering or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_values, False))
+
+    def get_previous_link(self):
+        if self.previous_values is None:
+            return None
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.previous_values, True))
@@ -0,0 +1,247 @@
+import re
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+
+from .models import Job
+from .skill_index import normalize_skills
+
+# Вклад составляющих в итоговую оценку вакансии
+SKILLS_WEIGHT = 0.55
+TITLE_WEIGHT = 0.25
+SALARY_WEIGHT = 0.1
+EMPLOYMENT_WEIGHT = 0.1
+
+# Как часто (в секундах) подтягивать измененные вакансии и полностью перестраивать матрицу
+SYNC_INTERVAL = getattr(settings, 'JOB_RECOMMENDATIONS_SYNC_INTERVAL', 5)
+REBUILD_INTERVAL = getattr(settings, 'JOB_RECOMMENDATIONS_REBUILD_INTERVAL', 3600)
+
+# Запас по времени при выборке измененных вакансий: транзакции коммитятся не в порядке updated_at
+SYNC_LAG = timedelta(seconds=30)
+
+# Доля удаленных строк, после которой матрица уплотняется
+COMPACT_RATIO = 0.25
+
+EMPLOYMENT_CODES = {value: index for index, (value, label) in enumerate(Job.EMPLOYMENT_TYPE_CHOICES)}
+
+TOKEN_RE = re.compile(r'\w[\w+#.-]*')
+
+
+def skill_tokens(skills):
+    return normalize_skills(skills)
+
+
+def title_tokens(text):
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        if len(token) > 1 and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+class FeatureMatrix:
+    """
+    Разреженная матрица "вакансия x признак" с расширяемым словарем.
+    Строки нормированы по L2, поэтому произведение на нормированный вектор
+    резюме дает косинусную близость сразу для всего каталога.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.matrix = sp.csr_matrix((0, 0), dtype=np.float32)
+
+    def encode(self, rows):
+        indptr, indices = [0], []
+        for tokens in rows:
+            for token in tokens:
+                indices.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        lengths = np.diff(indptr)
+        # Каждая строка из n признаков получает веса 1/sqrt(n)
+        data /= np.sqrt(np.repeat(np.maximum(lengths, 1), lengths)).astype(np.float32)
+        return sp.csr_matrix(
+            (data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(rows), len(self.vocabulary)),
+        )
+
+    def append(self, rows):
+        encoded = self.encode(rows)
+        base = self.matrix
+        base.resize((base.shape[0], len(self.vocabulary)))
+        self.matrix = sp.vstack([base, encoded], format='csr')
+
+    def keep(self, mask):
+        self.matrix = self.matrix[mask]
+
+    def vector(self, tokens):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        if not tokens:
+            return vector
+        for token in tokens:
+            index = self.vocabulary.get(token)
+            if index is not None:
+                vector[index] = 1.0
+        # Нормируем по всем признакам резюме, включая неизвестные каталогу
+        return vector / np.sqrt(len(tokens))
+
+    def similarity(self, tokens):
+        return self.matrix @ self.vector(tokens)
+
+
+class JobCatalogue:
+    """
+    Каталог активных вакансий в виде матриц для пакетной оценки.
+    Обновляется инкрементально: по водяному знаку updated_at подтягиваются
+    только измененные строки (старая строка помечается удаленной и
+    добавляется новая), удаленные вакансии помечаются сигналом post_delete.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.job_ids = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.salary_max = np.zeros(0, dtype=np.float64)
+        self.employment = np.zeros(0, dtype=np.int8)
+        self.skills = FeatureMatrix()
+        self.titles = FeatureMatrix()
+        self.row_of = {}
+        self.version_of = {}
+        self.watermark = None
+        self.synced_at = 0
+        self.built_at = 0
+
+    def _apply(self, rows):
+        """
+        rows: (id, title, skills, salary_max, employment_type, is_active, updated_at)
+        """
+        added = []
+        for row in rows:
+            job_id, is_active, updated_at = row[0], row[5], row[6]
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+            # Строки из окна SYNC_LAG приходят повторно, неизмененные пропускаем
+            if self.version_of.get(job_id) == updated_at:
+                continue
+            self.version_of[job_id] = updated_at
+            previous = self.row_of.pop(job_id, None)
+            if previous is not None:
+                self.alive[previous] = False
+            if is_active:
+                added.append(row)
+        if not added:
+            return
+
+        start = len(self.job_ids)
+        for offset, row in enumerate(added):
+            self.row_of[row[0]] = start + offset
+        self.job_ids = np.concatenate([self.job_ids, np.array([row[0] for row in added], dtype=np.int64)])
+        self.alive = np.concatenate([self.alive, np.ones(len(added), dtype=bool)])
+        self.salary_max = np.concatenate([
+            self.salary_max, np.array([row[3] or 0 for row in added], dtype=np.float64)
+        ])
+        self.employment = np.concatenate([
+            self.employment, np.array([EMPLOYMENT_CODES.get(row[4], -1) for row in added], dtype=np.int8)
+        ])
+        self.skills.append([skill_tokens(row[2]) for row in added])
+        self.titles.append([title_tokens(row[1]) for row in added])
+
+    def _compact(self):
+        mask = self.alive
+        self.job_ids = self.job_ids[mask]
+        self.salary_max = self.salary_max[mask]
+        self.employment = self.employment[mask]
+        self.skills.keep(mask)
+        self.titles.keep(mask)
+        self.alive = np.ones(len(self.job_ids), dtype=bool)
+        self.row_of = {int(job_id): index for index, job_id in enumerate(self.job_ids)}
+
+    def _columns(self):
+        return 'id', 'title', 'skills', 'salary_max', 'employment_type', 'is_active', 'updated_at'
+
+    def rebuild(self):
+        with self.lock:
+            self.reset()
+            rows = Job.objects.filter(is_active=True).order_by().values_list(*self._columns())
+            self._apply(list(rows.iterator(chunk_size=2000)))
+            self.synced_at = self.built_at = time.monotonic()
+
+    def sync(self, force=False):
+        """
+        Подтягивает изменения с последней синхронизации одним запросом по индексу updated_at.
+        """
+        now = time.monotonic()
+        if not self.built_at or now - self.built_at > REBUILD_INTERVAL:
+            self.rebuild()
+            return
+        if not force and now - self.synced_at < SYNC_INTERVAL:
+            return
+        with self.lock:
+            rows = Job.objects.order_by('updated_at').values_list(*self._columns())
+            if self.watermark is not None:
+                rows = rows.filter(updated_at__gte=self.watermark - SYNC_LAG)
+            self._apply(list(rows))
+            if len(self.alive) and (~self.alive).sum() > COMPACT_RATIO * len(self.alive):
+                self._compact()
+            self.synced_at = now
+
+    def remove(self, job_id):
+        with self.lock:
+            self.version_of.pop(job_id, None)
+            row = self.row_of.pop(job_id, None)
+            if row is not None:
+                self.alive[row] = False
+
+    def score(self, resume, exclude_ids=(), limit=20):
+        """
+        Оценивает все активные вакансии каталога для резюме и возвращает
+        [(job_id, score)] лучших limit вакансий по убыванию оценки.
+        """
+        self.sync()
+        with self.lock:
+            if not len(self.job_ids):
+                return []
+            skills = self.skills.similarity(skill_tokens(resume.skills))
+            titles = self.titles.similarity(title_tokens(resume.desired_position))
+            relevant = ((skills > 0) | (titles > 0)) & self.alive
+
+            if resume.salary_expectation:
+                salary = np.clip(self.salary_max / resume.salary_expectation, 0, 1)
+            else:
+                salary = np.ones(len(self.job_ids))
+            code = EMPLOYMENT_CODES.get(resume.preferred_employment)
+            if code is not None:
+                employment = (self.employment == code).astype(np.float64)
+            else:
+                employment = np.ones(len(self.job_ids))
+
+            scores = (
+                SKILLS_WEIGHT * skills + TITLE_WEIGHT * titles
+                + SALARY_WEIGHT * salary + EMPLOYMENT_WEIGHT * employment
+            )
+            if exclude_ids:
+                relevant &= ~np.isin(self.job_ids, np.fromiter(exclude_ids, dtype=np.int64))
+
+            candidates = np.flatnonzero(relevant)
+            if len(candidates) > limit:
+                top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                candidates = candidates[top]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+            return [(int(self.job_ids[index]), float(scores[index])) for index in candidates]
+
+
+catalogue = JobCatalogue()
+
+
+def recommend_jobs(resume, exclude_ids=(), limit=20):
+    """
+    Рекомендованные вакансии для резюме: [(job_id, score)] по убыванию оценки.
+    """
+    return catalogue.score(resume, exclude_ids=exclude_ids, limit=limit)
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import transaction
+
+from .cache import shared_cache
+
+# Время жизни закэшированного множества сохраненных вакансий пользователя, в секундах
+SAVED_JOBS_CACHE_TTL = getattr(settings, 'SAVED_JOBS_CACHE_TTL', 3600)
+
+SAVED_JOBS_KEY = 'saved_jobs:{}'
+
+EMPTY = frozenset()
+
+
+def saved_job_ids(user):
+    """
+    Множество id вакансий, сохраненных пользователем. Загружается одним
+    запросом при первом обращении и при общем кэше хранится в нем до
+    изменения избранного, поэтому проверка is_saved для целой страницы -
+    это проверки по множеству. Это подсказка для отображения: сохранена ли
+    вакансия на самом деле, решает уникальный индекс SavedJob.
+    """
+    if user is None or not user.is_authenticated:
+        return EMPTY
+    return saved_job_ids_for(user.pk)
+
+
+def _load(user_id):
+    from .models import SavedJob
+    return frozenset(SavedJob.objects.filter(user_id=user_id).values_list('job_id', flat=True))
+
+
+def saved_job_ids_for(user_id):
+    cache = shared_cache()
+    if cache is None:
+        return _load(user_id)
+    key = SAVED_JOBS_KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = _load(user_id)
+        cache.set(key, ids, SAVED_JOBS_CACHE_TTL)
+    return ids
+
+
+def record_saved(user_id, job_id):
+    # Множество не правится на месте (get/изменить/set гонится с соседними
+    # запросами) - после коммита ключ удаляется и перечитается из БД
+    transaction.on_commit(lambda: forget_saved(user_id))
+
+
+def record_unsaved(user_id, job_id):
+    transaction.on_commit(lambda: forget_saved(user_id))
+
+
+def forget_saved(user_id):
+    """
+    Сбрасывает множество пользователя (после изменения избранного или если
+    оно разошлось с БД).
+    """
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(SAVED_JOBS_KEY.format(user_id))
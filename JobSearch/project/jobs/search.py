@@ -0,0 +1,235 @@
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchHeadline, TrigramWordSimilarity
+)
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When
+from django.db.models.functions import Cast
+from django.utils.html import escape
+from functools import reduce
+import operator
+
+from .locations import resolve_location
+from .skill_index import job_skill_index, skill_condition, skills_filter
+
+# Текстовые конфигурации PostgreSQL, в которых построен Job.search_vector
+SEARCH_CONFIGS = ('russian', 'english')
+
+# Ограничение на число навыков в одном фильтре
+MAX_FILTER_SKILLS = 20
+
+# Границы совпадений в сниппетах: служебные символы, которых нет в тексте вакансий.
+# ts_headline не экранирует исходный текст, поэтому разметка <mark> добавляется
+# уже после экранирования (см. render_headline)
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+HEADLINE_OPTIONS = {
+    'start_sel': HIGHLIGHT_START,
+    'stop_sel': HIGHLIGHT_STOP,
+}
+
+
+def render_headline(headline):
+    """
+    Сниппет ts_headline в безопасный HTML: текст экранируется, границы
+    совпадений заменяются на <mark>.
+    """
+    if headline is None:
+        return None
+    return escape(headline).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
+
+def build_search_query(text):
+    """
+    Собирает поисковый запрос сразу по всем конфигурациям.
+    Используется синтаксис websearch: кавычки, OR и минус работают как в поисковиках.
+    """
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(text, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return query
+
+
+def fulltext_search(queryset, text, ranked=True):
+    """
+    Фильтрует вакансии по полнотекстовому индексу и сортирует по релевантности.
+    Добавляет аннотации search_rank и сниппеты с подсветкой для названия и описания.
+    С ranked=False только фильтрует (например, для агрегатов).
+    """
+    query = build_search_query(text)
+    queryset = queryset.filter(search_vector=query)
+    if not ranked:
+        return queryset
+    # ts_rank возвращает real: без приведения к double precision значение в курсоре
+    # пагинации (см. jobs/pagination.py) не совпало бы со значением в БД
+    return queryset.annotate(
+        search_rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        title_headline=SearchHeadline(
+            'title', query, config=SEARCH_CONFIGS[0], highlight_all=True, **HEADLINE_OPTIONS
+        ),
+        description_headline=SearchHeadline(
+            'description', query, config=SEARCH_CONFIGS[0],
+            max_words=35, min_words=15, max_fragments=2, **HEADLINE_OPTIONS
+        ),
+    ).order_by('-search_rank', '-created_at')
+
+
+def fuzzy_search(queryset, title=None, location=None, ranked=True):
+    """
+    Нечеткий поиск по названию и городу через pg_trgm.
+    Использует оператор word_similarity (%>), который обслуживается триграммными
+    GIN-индексами, поэтому опечатки и части слов находятся без полного сканирования.
+    Порог задается параметром pg_trgm.word_similarity_threshold в PostgreSQL.
+    Результаты сортируются по суммарной похожести.
+    """
+    similarity = None
+    if title:
+        queryset = queryset.filter(title__trigram_word_similar=title)
+        similarity = TrigramWordSimilarity(title, 'title')
+    if location:
+        queryset = queryset.filter(location__trigram_word_similar=location)
+        location_similarity = TrigramWordSimilarity(location, 'location')
+        similarity = location_similarity if similarity is None else similarity + location_similarity
+    if similarity is None or not ranked:
+        return queryset
+    # word_similarity тоже real - приводим, как и search_rank
+    return queryset.annotate(similarity=Cast(similarity, FloatField())).order_by('-similarity', '-created_at')
+
+
+def parse_skills_param(values):
+    """
+    Разбирает параметр skills: поддерживаются повторяющиеся параметры
+    (skills=a&skills=b) и перечисление через запятую (skills=a,b).
+    """
+    skills = []
+    for value in values:
+        for skill in value.split(','):
+            skill = skill.strip()
+            if skill and skill not in skills:
+                skills.append(skill)
+    return skills[:MAX_FILTER_SKILLS]
+
+
+def filter_by_skills(queryset, skills, match_all=True, ranked=True):
+    """
+    Фильтрует вакансии по навыкам через инвертированный индекс в памяти
+    (jobs/skill_index.py): пересечение или объединение списков id без разбора
+    JSON в БД. Пока индекс строится или для слишком популярных навыков фильтр
+    идет по GIN-индексу Job.skills. Сравнение навыков не зависит от регистра.
+    В режиме any вакансии сортируются по числу совпавших навыков (аннотация
+    skills_matched).
+    """
+    if not skills:
+        return queryset
+    queryset = queryset.filter(skills_filter(job_skill_index, skills, match_all=match_all))
+    if not ranked:
+        return queryset
+
+    # Любое из встречавшихся написаний навыка считается совпадением
+    matched = [
+        Case(
+            When(skill_condition(job_skill_index, skill), then=Value(1)),
+            default=Value(0), output_field=IntegerField(),
+        )
+        for skill in skills
+    ]
+    queryset = queryset.annotate(skills_matched=reduce(operator.add, matched))
+    if not match_all:
+        queryset = queryset.order_by('-skills_matched', '-created_at')
+    return queryset
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_job_filters(params):
+    """
+    Приводит параметры запроса списка вакансий к нормализованному словарю.
+    Один и тот же словарь используется для построения queryset и как сигнатура
+    фильтра для кэшей.
+    """
+    def text(name):
+        value = (params.get(name) or '').strip()
+        return value or None
+
+    return {
+        'q': text('q'),
+        'title': text('title'),
+        'location': text('location'),
+        'location_id': _int_or_none(params.get('location_id')),
+        'experience': text('experience'),
+        'employment_type': text('employment_type'),
+        'min_salary': _int_or_none(params.get('min_salary')),
+        'salary_from': _int_or_none(params.get('salary_from')),
+        'salary_to': _int_or_none(params.get('salary_to')),
+        'fuzzy': (params.get('fuzzy') or '').lower() in ('1', 'true', 'yes'),
+        'skills': parse_skills_param(params.getlist('skills')),
+        'skills_mode': 'any' if params.get('skills_mode') == 'any' else 'all',
+    }
+
+
+def facet_conditions(filters):
+    """
+    Условия по фасетным измерениям (тип занятости, опыт, зарплата).
+    Вынесены отдельно, чтобы счетчики фасета можно было считать без его собственного фильтра.
+    """
+    conditions = {}
+    if filters['employment_type']:
+        conditions['employment_type'] = Q(employment_type=filters['employment_type'])
+    if filters['experience']:
+        conditions['experience'] = Q(experience=filters['experience'])
+    salary = Q()
+    if filters['min_salary'] is not None:
+        salary &= Q(salary_min__gte=filters['min_salary'])
+    # Пересечение вилки вакансии [salary_min, salary_max] с запрошенным диапазоном
+    if filters['salary_from'] is not None:
+        salary &= Q(salary_max__gte=filters['salary_from'])
+    if filters['salary_to'] is not None:
+        salary &= Q(salary_min__lte=filters['salary_to'])
+    if salary:
+        conditions['salary'] = salary
+    return conditions
+
+
+def apply_job_filters(queryset, filters, ranked=True, facets=True):
+    """
+    Применяет к queryset вакансий все фильтры из parse_job_filters.
+    ranked=False отключает аннотации релевантности и сортировку,
+    facets=False пропускает фасетные измерения (см. facet_conditions).
+    """
+    location = filters['location']
+    if filters['location_id'] is not None:
+        # Фильтр по городу из справочника идет по индексу внешнего ключа
+        queryset = queryset.filter(location_ref_id=filters['location_id'])
+    elif location:
+        # Старый текстовый параметр: если город есть в справочнике, тоже фильтруем по ключу,
+        # а вакансии, чей текст города не распознан ("Алматы - удаленно"), - как раньше, по тексту
+        resolved = resolve_location(location)
+        if resolved is not None:
+            queryset = queryset.filter(
+                Q(location_ref=resolved) | Q(location_ref__isnull=True, location__icontains=location)
+            )
+            location = None
+
+    if filters['fuzzy']:
+        # Режим нечеткого поиска: устойчив к опечаткам, использует триграммные индексы
+        queryset = fuzzy_search(queryset, title=filters['title'], location=location, ranked=ranked)
+    else:
+        if filters['title']:
+            queryset = queryset.filter(title__icontains=filters['title'])
+        if location:
+            queryset = queryset.filter(location__icontains=location)
+    if facets:
+        for condition in facet_conditions(filters).values():
+            queryset = queryset.filter(condition)
+    if filters['skills']:
+        queryset = filter_by_skills(
+            queryset, filters['skills'], match_all=filters['skills_mode'] == 'all', ranked=ranked
+        )
+    if filters['q']:
+        # Полнотекстовый поиск с сортировкой по релевантности
+        queryset = fulltext_search(queryset, filters['q'], ranked=ranked)
+    return queryset
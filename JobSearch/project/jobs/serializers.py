@@ -1,28 +1,55 @@
 from rest_framework import serializers
-from .models import Job, JobApplication, SavedJob, ChatMessage, Conversation
+from .models import Job, JobApplication, SavedJob, ChatMessage, Conversation, Location
 from django.contrib.auth import get_user_model
 from django.db.models import Count, Max, Q
+from .inbox import unread_count
+from .saved_jobs import saved_job_ids
+from .search import render_headline
 
 User = get_user_model()
 
 class JobSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.company_name', read_only=True)
     is_saved = serializers.SerializerMethodField()
-    applications_count = serializers.SerializerMethodField()
+    search_rank = serializers.SerializerMethodField()
+    highlight = serializers.SerializerMethodField()
+    skills_matched = serializers.SerializerMethodField()
+    recommendation_score = serializers.SerializerMethodField()
 
     class Meta:
         model = Job
-        fields = '__all__'
-        read_only_fields = ('company', 'created_at', 'updated_at')
+        # new_applications видит только работодатель в своей панели (jobs/funnel.py)
+        exclude = ('search_vector', 'new_applications')
+        read_only_fields = ('company', 'location_ref', 'created_at', 'updated_at')
 
     def get_is_saved(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return SavedJob.objects.filter(user=request.user, job=obj).exists()
-        return False
+        # Проверка по множеству id сохраненных вакансий: одно чтение кэша на весь
+        # ответ (контекст общий для всех элементов many=True)
+        if 'saved_job_ids' not in self.context:
+            request = self.context.get('request')
+            self.context['saved_job_ids'] = saved_job_ids(request.user if request else None)
+        return obj.pk in self.context['saved_job_ids']
+
+    def get_search_rank(self, obj):
+        # Заполняется только при полнотекстовом поиске (параметр q)
+        return getattr(obj, 'search_rank', None)
+
+    def get_skills_matched(self, obj):
+        # Число совпавших навыков при фильтре skills=
+        return getattr(obj, 'skills_matched', None)
 
-    def get_applications_count(self, obj):
-        return obj.applications.count()
+    def get_recommendation_score(self, obj):
+        # Заполняется только в списке рекомендованных вакансий
+        score = getattr(obj, 'recommendation_score', None)
+        return round(score, 4) if score is not None else None
+
+    def get_highlight(self, obj):
+        if not hasattr(obj, 'search_rank'):
+            return None
+        return {
+            'title': render_headline(getattr(obj, 'title_headline', None)),
+            'description': render_headline(getattr(obj, 'description_headline', None)),
+        }
 
     def validate(self, data):
         if data.get('salary_min') and data.get('salary_max'):
@@ -32,6 +59,13 @@ class JobSerializer(serializers.ModelSerializer):
                 })
         return data
 
+class LocationSerializer(serializers.ModelSerializer):
+    jobs_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Location
+        fields = ('id', 'name', 'name_en', 'country', 'jobs_count')
+
 class JobApplicationSerializer(serializers.ModelSerializer):
     applicant_name = serializers.CharField(source='applicant.get_full_name', read_only=True)
     job_title = serializers.CharField(source='job.title', read_only=True)
@@ -40,7 +74,7 @@ class JobApplicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobApplication
         fields = '__all__'
-        read_only_fields = ('applicant', 'status', 'created_at', 'updated_at')
+        read_only_fields = ('applicant', 'status', 'match_score', 'created_at', 'updated_at')
 
     def validate(self, data):
         request = self.context.get('request')
@@ -96,7 +130,8 @@ class ConversationSerializer(serializers.ModelSerializer):
         } for user in obj.participants.exclude(id=current_user.id)]
     
     def get_last_message(self, obj):
-        message = obj.messages.order_by('-created_at').first()
+        # Последнее сообщение хранится ссылкой в диалоге (см. ChatMessage.save)
+        message = obj.last_message
         if not message:
             return None
             
@@ -111,8 +146,10 @@ class ConversationSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return 0
+        if hasattr(obj, 'unread'):
+            return obj.unread
             
-        return obj.messages.filter(recipient=request.user, is_read=False).count()
+        return unread_count(obj, request.user)
     
     def get_job_title(self, obj):
         if not obj.job:
@@ -120,6 +157,27 @@ class ConversationSerializer(serializers.ModelSerializer):
             
         return obj.job.title
 
+class InboxConversationSerializer(ConversationSerializer):
+    """
+    Диалог в списке: участники и непрочитанные берутся из аннотаций
+    jobs.inbox.inbox_queryset, поэтому весь список - один запрос.
+    """
+    participants = serializers.SerializerMethodField()
+
+    def get_participants(self, obj):
+        return [user['id'] for user in obj.participants_data if user['id'] is not None]
+
+    def get_participants_info(self, obj):
+        request = self.context.get('request')
+        current_user_id = request.user.id if request else None
+        return [{
+            'id': user['id'],
+            'name': f"{user['first_name']} {user['last_name']}",
+            'username': user['username'],
+            'company_name': user['company_name'],
+            'role': user['role']
+        } for user in obj.participants_data if user['id'] is not None and user['id'] != current_user_id]
+
 class ChatMessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.CharField(source='sender.get_full_name', read_only=True)
     recipient_name = serializers.CharField(source='recipient.get_full_name', read_only=True)
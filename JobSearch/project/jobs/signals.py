@@ -0,0 +1,121 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .application_stats import (
+    record_application_deleted, record_application_saved, record_job_grouping_changed,
+)
+from .cache import JOB_CARD_TAG, JOB_LIST_TAG, invalidate_job, invalidate_tags
+from .conversations import refresh_conversation_key, release_job_conversations
+from .funnel import record_application_deleted as funnel_application_deleted
+from .funnel import record_application_saved as funnel_application_saved
+from .histogram import record_job_deleted, record_job_saved
+from .inbox import record_message_created, record_message_deleted
+from .models import ChatMessage, Conversation, Job, JobApplication, SavedJob
+from .recommendations import catalogue
+from .saved_jobs import record_saved, record_unsaved
+from .skill_index import job_skill_index, resume_skill_index
+from users.models import Resume, User
+
+
+@receiver(post_save, sender=Job)
+def job_saved(sender, instance, created, **kwargs):
+    # До record_job_saved: ему нужны значения, с которыми вакансия была загружена
+    record_job_grouping_changed(instance, created)
+    record_job_saved(instance, created)
+    invalidate_job(instance.pk)
+    # Индекс в памяти меняется только после коммита: откат не должен оставить в нем навыки
+    pk, skills = instance.pk, list(instance.skills or [])
+    transaction.on_commit(lambda: job_skill_index.update(pk, skills))
+
+
+@receiver(post_save, sender=User)
+def company_saved(sender, instance, created, update_fields=None, **kwargs):
+    # company_name выводится в карточках вакансий: изменение профиля работодателя
+    # обновляет updated_at его вакансий (ETag, Last-Modified) и сбрасывает их кэш
+    if created or instance.role != 'employer':
+        return
+    if update_fields is not None and 'company_name' not in update_fields:
+        return
+    job_ids = list(Job.objects.filter(company=instance).values_list('pk', flat=True))
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids).update(updated_at=timezone.now())
+        invalidate_tags(JOB_LIST_TAG, *(JOB_CARD_TAG.format(job_id) for job_id in job_ids))
+
+
+@receiver(pre_delete, sender=Job)
+def job_deleting(sender, instance, **kwargs):
+    release_job_conversations(instance)
+
+
+@receiver(post_delete, sender=Job)
+def job_deleted(sender, instance, **kwargs):
+    record_job_deleted(instance)
+    invalidate_job(instance.pk)
+    catalogue.remove(instance.pk)
+    pk = instance.pk
+    transaction.on_commit(lambda: job_skill_index.remove(pk))
+
+
+@receiver(post_save, sender=JobApplication)
+def job_application_saved(sender, instance, created, **kwargs):
+    # Оба счетчика читают _loaded_values; record_application_saved обновляет их последним
+    funnel_application_saved(instance, created)
+    record_application_saved(instance, created)
+    # В карточке вакансии есть applications_count, списки при этом не меняются
+    invalidate_job(instance.job_id, lists=False)
+
+
+@receiver(post_delete, sender=JobApplication)
+def job_application_deleted(sender, instance, **kwargs):
+    funnel_application_deleted(instance)
+    record_application_deleted(instance)
+    invalidate_job(instance.job_id, lists=False)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def conversation_participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Ключ диалога зависит от участников, поэтому считается после их добавления
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_conversation_key(instance)
+    elif pk_set:
+        for conversation in Conversation.objects.filter(pk__in=pk_set):
+            refresh_conversation_key(conversation)
+
+
+@receiver(post_save, sender=ChatMessage)
+def chat_message_saved(sender, instance, created, **kwargs):
+    if created:
+        record_message_created(instance)
+
+
+@receiver(post_delete, sender=ChatMessage)
+def chat_message_deleted(sender, instance, **kwargs):
+    record_message_deleted(instance)
+
+
+@receiver(post_save, sender=SavedJob)
+def saved_job_created(sender, instance, created, **kwargs):
+    if created:
+        record_saved(instance.user_id, instance.job_id)
+
+
+@receiver(post_delete, sender=SavedJob)
+def saved_job_deleted(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении вакансии или пользователя
+    record_unsaved(instance.user_id, instance.job_id)
+
+
+@receiver(post_save, sender=Resume)
+def resume_saved(sender, instance, **kwargs):
+    pk, skills = instance.pk, list(instance.skills or [])
+    transaction.on_commit(lambda: resume_skill_index.update(pk, skills))
+
+
+@receiver(post_delete, sender=Resume)
+def resume_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: resume_skill_index.remove(pk))
@@ -0,0 +1,308 @@
+import logging
+import operator
+import threading
+import time
+from datetime import timedelta
+from functools import reduce
+
+import numpy as np
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection
+from django.db.models import BigIntegerField, BooleanField, F, Func, Q, Value
+
+# Как часто (в секундах) подтягивать изменения, сделанные другими процессами
+SYNC_INTERVAL = getattr(settings, 'SKILL_INDEX_SYNC_INTERVAL', 5)
+# Как часто (в секундах) сверять множество id с таблицей, чтобы убрать строки,
+# удаленные другими процессами (по updated_at удаление не видно)
+RECONCILE_INTERVAL = getattr(settings, 'SKILL_INDEX_RECONCILE_INTERVAL', 300)
+# Сколько id индекса передавать в запрос одним массивом; при большем числе
+# фильтр строится JSONB-условием по GIN-индексу навыков
+MAX_IDS = getattr(settings, 'SKILL_INDEX_MAX_IDS', 10000)
+
+# Запас по времени при выборке измененных строк: транзакции коммитятся не в порядке updated_at
+SYNC_LAG = timedelta(seconds=30)
+
+EMPTY = np.zeros(0, dtype=np.int64)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_skill(skill):
+    """
+    Нормализованное написание навыка: нижний регистр, одиночные пробелы.
+    """
+    return ' '.join(str(skill).lower().split())
+
+
+def normalize_skills(skills):
+    tokens = []
+    for skill in skills or []:
+        token = normalize_skill(skill)
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+class InArray(Func):
+    """
+    Условие "pk = ANY(%s)" с одним параметром-массивом: для тысяч id из индекса
+    это заметно дешевле, чем IN с тысячами отдельных параметров.
+    """
+    template = '(%(expressions)s))'
+    arg_joiner = ' = ANY('
+    output_field = BooleanField()
+
+    def __init__(self, field, ids):
+        super().__init__(F(field), Value([int(pk) for pk in ids], output_field=ArrayField(BigIntegerField())))
+
+
+class SkillIndex:
+    """
+    Инвертированный индекс "навык -> отсортированный массив id" в памяти процесса.
+
+    Списки хранятся в компактных массивах NumPy; изменения (сигналы post_save/
+    post_delete) копятся в небольших множествах добавленных и удаленных id и
+    вливаются в массив при первом чтении навыка. Индекс строится и затем
+    поддерживается фоновым потоком процесса (см. start): изменения из других
+    процессов подтягиваются по водяному знаку updated_at, удаления - сверкой id.
+    Запросы к БД в потоке запроса индекс не делает; пока он не построен,
+    match_all/match_any возвращают None.
+    """
+
+    def __init__(self, get_queryset):
+        self.get_queryset = get_queryset
+        self.lock = threading.RLock()
+        self.postings = {}
+        self.added = {}
+        self.removed = {}
+        self.documents = {}
+        self.spellings = {}
+        self.watermark = None
+        self.synced_at = 0
+        self.reconciled_at = 0
+        self.built = False
+        self.thread = None
+        self.thread_lock = threading.Lock()
+
+    def rebuild(self):
+        # Проход по таблице идет без блокировки (чтение variants не ждет), под ней
+        # только подмена структур; изменения за время прохода подтянет sync по
+        # водяному знаку, удаления - reconcile
+        postings = {}
+        documents = {}
+        spellings = {}
+        watermark = None
+        rows = self.get_queryset().order_by('pk').values_list('pk', 'skills', 'updated_at')
+        for pk, skills, updated_at in rows.iterator(chunk_size=5000):
+            tokens = self._tokens(skills, spellings)
+            documents[pk] = tokens
+            for token in tokens:
+                postings.setdefault(token, []).append(pk)
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+        with self.lock:
+            # id шли по возрастанию, поэтому массивы уже отсортированы
+            self.postings = {token: np.array(ids, dtype=np.int64) for token, ids in postings.items()}
+            self.documents = documents
+            self.spellings = spellings
+            self.added = {}
+            self.removed = {}
+            self.watermark = watermark
+            self.synced_at = self.reconciled_at = time.monotonic()
+            self.built = True
+
+    def _tokens(self, skills, spellings=None):
+        spellings = self.spellings if spellings is None else spellings
+        tokens = []
+        for skill in skills or []:
+            token = normalize_skill(skill)
+            if not token:
+                continue
+            spellings.setdefault(token, set()).add(str(skill))
+            if token not in tokens:
+                tokens.append(token)
+        return tuple(tokens)
+
+    def update(self, pk, skills):
+        with self.lock:
+            if not self.built:
+                return
+            old = set(self.documents.get(pk, ()))
+            tokens = self._tokens(skills)
+            self.documents[pk] = tokens
+            for token in old - set(tokens):
+                self.added.get(token, set()).discard(pk)
+                self.removed.setdefault(token, set()).add(pk)
+            for token in set(tokens) - old:
+                self.removed.get(token, set()).discard(pk)
+                self.added.setdefault(token, set()).add(pk)
+
+    def remove(self, pk):
+        with self.lock:
+            if not self.built:
+                return
+            for token in self.documents.pop(pk, ()):
+                self.added.get(token, set()).discard(pk)
+                self.removed.setdefault(token, set()).add(pk)
+
+    def sync(self):
+        """
+        Подтягивает строки, измененные после водяного знака (одним запросом по
+        индексу updated_at), и раз в RECONCILE_INTERVAL убирает удаленные.
+        """
+        now = time.monotonic()
+        rows = self.get_queryset().values_list('pk', 'skills', 'updated_at')
+        if self.watermark is not None:
+            rows = rows.filter(updated_at__gte=self.watermark - SYNC_LAG)
+        rows = list(rows)
+        with self.lock:
+            for pk, skills, updated_at in rows:
+                self.update(pk, skills)
+                if self.watermark is None or updated_at > self.watermark:
+                    self.watermark = updated_at
+            self.synced_at = now
+        if now - self.reconciled_at >= RECONCILE_INTERVAL:
+            self.reconcile()
+
+    def reconcile(self):
+        """
+        Убирает из индекса строки, которых больше нет в таблице (один проход по
+        первичному ключу). Строки, добавленные во время прохода, не трогаются.
+        """
+        with self.lock:
+            known = set(self.documents)
+        existing = set(self.get_queryset().values_list('pk', flat=True).iterator(chunk_size=5000))
+        for pk in known - existing:
+            self.remove(pk)
+        self.reconciled_at = time.monotonic()
+
+    def start(self):
+        """
+        Запускает фоновый поток индекса (один на процесс): построение, затем
+        синхронизация раз в SYNC_INTERVAL секунд.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.thread_lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, name='skill-index', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if self.built:
+                    self.sync()
+                else:
+                    self.rebuild()
+            except Exception:
+                logger.exception("Ошибка обновления индекса навыков")
+            finally:
+                connection.close()
+            time.sleep(SYNC_INTERVAL)
+
+    def ids(self, token):
+        """
+        Отсортированный массив id для нормализованного навыка.
+        """
+        with self.lock:
+            ids = self.postings.get(token, EMPTY)
+            added = self.added.pop(token, None)
+            removed = self.removed.pop(token, None)
+            if added or removed:
+                if removed:
+                    ids = np.setdiff1d(ids, np.fromiter(removed, dtype=np.int64), assume_unique=True)
+                if added:
+                    ids = np.union1d(ids, np.fromiter(added, dtype=np.int64))
+                if len(ids):
+                    self.postings[token] = ids
+                else:
+                    self.postings.pop(token, None)
+            return ids
+
+    def match_all(self, skills):
+        """
+        id строк, содержащих все навыки (пересечение, начиная с самого короткого
+        списка), или None, если индекс еще строится.
+        """
+        if not self.built:
+            self.start()
+            return None
+        lists = sorted((self.ids(token) for token in normalize_skills(skills)), key=len)
+        if not lists:
+            return EMPTY
+        result = lists[0]
+        for ids in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def match_any(self, skills):
+        """
+        id строк, содержащих хотя бы один из навыков (объединение), или None,
+        если индекс еще строится.
+        """
+        if not self.built:
+            self.start()
+            return None
+        lists = [self.ids(token) for token in normalize_skills(skills)]
+        lists = [ids for ids in lists if len(ids)]
+        if not lists:
+            return EMPTY
+        return np.unique(np.concatenate(lists))
+
+    def variants(self, skill):
+        """
+        Все встречавшиеся написания навыка (для JSONB-условий в аннотациях).
+        """
+        with self.lock:
+            return sorted(self.spellings.get(normalize_skill(skill), ()))
+
+
+def skill_condition(index, skill, field='skills'):
+    """
+    JSONB-условие "поле содержит навык" в любом из известных индексу написаний
+    (и в написании из запроса). Обслуживается GIN-индексом по навыкам.
+    """
+    variants = set(index.variants(skill)) | {skill}
+    return reduce(operator.or_, [Q(**{f'{field}__contains': [variant]}) for variant in sorted(variants)])
+
+
+def skills_filter(index, skills, match_all=True, field='skills'):
+    """
+    Условие фильтра по навыкам: pk = ANY(id из индекса). Пока индекс строится или
+    если id больше MAX_IDS (популярные навыки), вместо огромного массива в
+    параметре запроса используется условие по GIN-индексу (skill_condition).
+    """
+    ids = index.match_all(skills) if match_all else index.match_any(skills)
+    if ids is not None and len(ids) <= MAX_IDS:
+        return InArray('pk', ids)
+    conditions = [skill_condition(index, skill, field) for skill in skills]
+    return reduce(operator.and_ if match_all else operator.or_, conditions)
+
+
+def _jobs():
+    from .models import Job
+    return Job.objects.all()
+
+
+def _resumes():
+    from users.models import Resume
+    return Resume.objects.all()
+
+
+job_skill_index = SkillIndex(_jobs)
+resume_skill_index = SkillIndex(_resumes)
+
+
+def start_skill_indexes(**kwargs):
+    """
+    Запускает построение индексов в фоне. Подключается в JobsConfig.ready к
+    первому запросу процесса: после fork воркера, в той БД, которую он
+    обслуживает, и без DB-запросов в командах manage.py.
+    """
+    job_skill_index.start()
+    resume_skill_index.start()
@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from jobs.application_stats import compute_application_stats, get_application_stats
+from jobs.funnel import get_employer_dashboard, reconcile_applications_count
+from jobs.models import ApplicationStatsCounter, Job, JobApplication, JobFunnelCounter
+
+from .test_pagination import create_job
+
+User = get_user_model()
+
+
+class ApplicationCounterTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user(
+            username='employer', email='employer@example.com', password='pass',
+            role='employer', company_name='Компания',
+        )
+        cls.seeker = User.objects.create_user(
+            username='seeker', email='seeker@example.com', password='pass', role='jobseeker',
+        )
+        cls.other_seeker = User.objects.create_user(
+            username='other', email='other@example.com', password='pass', role='jobseeker',
+        )
+
+    def setUp(self):
+        self.job = create_job(self.employer, 'python')
+        self.other_job = create_job(self.employer, 'django', employment_type='remote', experience='3-5')
+
+    def apply(self, job, applicant=None, **fields):
+        return JobApplication.objects.create(job=job, applicant=applicant or self.seeker, cover_letter='x', **fields)
+
+
+class ApplicationStatsCounterTests(ApplicationCounterTestCase):
+    """
+    Счетчики статистики соискателя меняются вместе с откликами и совпадают
+    с подсчетом по самим откликам.
+    """
+
+    def stats(self, applicant=None):
+        applicant = applicant or self.seeker
+        counters = {
+            (row.employment_type, row.experience, row.status): row.count
+            for row in ApplicationStatsCounter.objects.filter(applicant=applicant) if row.count
+        }
+        actual = {row[:3]: row[3] for row in compute_application_stats(applicant)}
+        self.assertEqual(counters, actual)
+        return counters
+
+    def test_create(self):
+        self.apply(self.job)
+        self.apply(self.other_job)
+        self.apply(self.job, applicant=self.other_seeker)
+        self.assertEqual(self.stats(), {
+            ('full_time', '1-3', 'pending'): 1,
+            ('remote', '3-5', 'pending'): 1,
+        })
+        self.assertEqual(self.stats(self.other_seeker), {('full_time', '1-3', 'pending'): 1})
+
+    def test_status_change(self):
+        application = self.apply(self.job)
+        application = JobApplication.objects.get(pk=application.pk)
+        application.status = 'interview'
+        application.save()
+        application.status = 'accepted'
+        application.save()
+        self.assertEqual(self.stats(), {('full_time', '1-3', 'accepted'): 1})
+
+    def test_job_grouping_change(self):
+        self.apply(self.job)
+        self.apply(self.job, applicant=self.other_seeker, status='rejected')
+        job = Job.objects.get(pk=self.job.pk)
+        job.employment_type = 'part_time'
+        job.save()
+        self.assertEqual(self.stats(), {('part_time', '1-3', 'pending'): 1})
+        self.assertEqual(self.stats(self.other_seeker), {('part_time', '1-3', 'rejected'): 1})
+
+    def test_delete(self):
+        application = self.apply(self.job)
+        self.apply(self.other_job)
+        JobApplication.objects.get(pk=application.pk).delete()
+        self.assertEqual(self.stats(), {('remote', '3-5', 'pending'): 1})
+
+    def test_job_delete_cascades(self):
+        self.apply(self.job)
+        self.apply(self.other_job)
+        Job.objects.get(pk=self.job.pk).delete()
+        self.assertEqual(self.stats(), {('remote', '3-5', 'pending'): 1})
+
+    def test_summary(self):
+        self.apply(self.job, status='interview')
+        self.apply(self.other_job)
+        stats = get_application_stats(self.seeker)
+        self.assertEqual(stats['total_applications'], 2)
+        self.assertEqual(stats['by_employment_type'], {'full_time': 1, 'remote': 1})
+        self.assertEqual(stats['by_status'], {'pending': 1, 'interview': 1})
+
+
+class JobFunnelCounterTests(ApplicationCounterTestCase):
+    """
+    Счетчики воронки по статусам и новые отклики работодателя.
+    """
+
+    def funnel(self, job=None):
+        return dict(
+            JobFunnelCounter.objects.filter(job=job or self.job, count__gt=0).values_list('status', 'count')
+        )
+
+    def test_create_and_status_change(self):
+        application = self.apply(self.job)
+        self.apply(self.job, applicant=self.other_seeker)
+        application = JobApplication.objects.get(pk=application.pk)
+        application.status = 'interview'
+        application.save()
+        self.assertEqual(self.funnel(), {'pending': 1, 'interview': 1})
+        self.assertEqual(self.funnel(self.other_job), {})
+
+    def test_delete(self):
+        application = self.apply(self.job, status='rejected')
+        self.apply(self.job, applicant=self.other_seeker)
+        JobApplication.objects.get(pk=application.pk).delete()
+        self.assertEqual(self.funnel(), {'pending': 1})
+
+    def test_new_applications_reset_on_visit(self):
+        self.apply(self.job)
+        self.apply(self.other_job)
+        dashboard = get_employer_dashboard(self.employer)
+        self.assertEqual(dashboard['totals']['new_applications'], 2)
+        self.assertEqual(dashboard['totals']['by_status'], {'pending': 2})
+        self.assertEqual(Job.objects.filter(company=self.employer, new_applications__gt=0).count(), 0)
+
+        # Отклик после визита - новый, отозванный до визита - перестает быть новым
+        application = self.apply(self.job, applicant=self.other_seeker)
+        self.assertEqual(Job.objects.get(pk=self.job.pk).new_applications, 1)
+        JobApplication.objects.get(pk=application.pk).delete()
+        self.assertEqual(Job.objects.get(pk=self.job.pk).new_applications, 0)
+        self.assertEqual(get_employer_dashboard(self.employer)['totals']['new_applications'], 0)
+
+
+class ApplicationsCountTests(ApplicationCounterTestCase):
+    """
+    Job.applications_count меняется вместе с откликами и не затирается save() вакансии.
+    """
+
+    def count(self, job=None):
+        return Job.objects.get(pk=(job or self.job).pk).applications_count
+
+    def test_create_and_delete(self):
+        application = self.apply(self.job)
+        self.apply(self.job, applicant=self.other_seeker)
+        self.assertEqual(self.count(), 2)
+        self.assertEqual(self.count(self.other_job), 0)
+        JobApplication.objects.get(pk=application.pk).delete()
+        self.assertEqual(self.count(), 1)
+
+    def test_status_change_keeps_count(self):
+        application = self.apply(self.job)
+        application.status = 'accepted'
+        application.save()
+        self.assertEqual(self.count(), 1)
+
+    def test_stale_job_save_keeps_count(self):
+        # Экземпляр загружен до отклика: обычный save() не перезаписывает счетчик
+        stale = Job.objects.get(pk=self.job.pk)
+        self.apply(self.job)
+        stale.title = 'python developer'
+        stale.save()
+        self.assertEqual(self.count(), 1)
+
+    def test_reconcile(self):
+        self.apply(self.job)
+        Job.objects.filter(pk=self.job.pk).update(applications_count=5)
+        Job.objects.filter(pk=self.other_job.pk).update(applications_count=3)
+        checked, fixed = reconcile_applications_count(batch_size=1)
+        self.assertEqual(fixed, 2)
+        self.assertGreaterEqual(checked, 2)
+        self.assertEqual(self.count(), 1)
+        self.assertEqual(self.count(self.other_job), 0)
@@ -0,0 +1,127 @@
+import io
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from jobs.bulk_import import import_jobs
+from jobs.models import Job, SalaryHistogramBucket
+
+User = get_user_model()
+
+HEADER = 'title,location,salary_min,salary_max,description,requirements,employment_type,experience,skills\n'
+VALID_ROW = 'Python developer,Алматы,100000,200000,python,опыт,full_time,1-3,"python; django"\n'
+
+
+def job_row(**fields):
+    row = {
+        'title': 'Python developer', 'location': 'Алматы', 'salary_min': 100000, 'salary_max': 200000,
+        'description': 'python', 'requirements': 'опыт', 'employment_type': 'full_time',
+        'experience': '1-3', 'skills': ['python'],
+    }
+    row.update(fields)
+    return json.dumps(row, ensure_ascii=False)
+
+
+class BulkImportTests(TestCase):
+    """
+    Массовая загрузка вакансий: проверка строк правилами JobSerializer,
+    отчет об ошибках и коды ответа эндпоинта.
+    """
+
+    url = '/api/jobs/bulk_import/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user(
+            username='employer', email='employer@example.com', password='pass',
+            role='employer', company_name='Компания',
+        )
+        cls.seeker = User.objects.create_user(
+            username='seeker', email='seeker@example.com', password='pass', role='jobseeker',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+
+    def upload(self, name, content, **params):
+        url = self.url
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(url, {'file': SimpleUploadedFile(name, content.encode())}, format='multipart')
+
+    def test_csv_with_invalid_rows(self):
+        content = (
+            HEADER + VALID_ROW
+            + 'Без зарплаты,Алматы,,,python,опыт,full_time,1-3,\n'
+            + 'Вилка наоборот,Алматы,300000,100000,python,опыт,full_time,1-3,\n'
+            + 'Неизвестный тип,Алматы,100000,200000,python,опыт,freelance,1-3,\n'
+            + VALID_ROW
+        )
+        response = self.upload('jobs.csv', content)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 3)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [3, 4, 5])
+        self.assertIn('salary_min', errors[3])
+        self.assertIn('salary', errors[4])
+        self.assertIn('employment_type', errors[5])
+
+        jobs = Job.objects.filter(company=self.employer)
+        self.assertEqual(jobs.count(), 2)
+        self.assertEqual(jobs.first().skills, ['python', 'django'])
+
+    def test_all_rows_invalid_returns_report(self):
+        response = self.upload('jobs.csv', HEADER + 'Без описания,Алматы,1,2,,,full_time,1-3,\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertFalse(Job.objects.exists())
+
+    def test_jsonl_parse_errors(self):
+        content = '\n'.join([
+            job_row(),
+            '{"title": ',
+            '["не объект"]',
+            '',
+            job_row(skills='python, sql'),
+        ])
+        response = self.upload('jobs.txt', content, input='jsonl')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertTrue(all('non_field_errors' in error['errors'] for error in response.data['errors']))
+        self.assertEqual(
+            sorted(Job.objects.values_list('skills', flat=True), key=len),
+            [['python'], ['python', 'sql']],
+        )
+
+    def test_request_errors(self):
+        self.assertEqual(self.client.post(self.url, {}, format='multipart').status_code, 400)
+        self.assertEqual(self.upload('jobs.xml', '<jobs/>', input='xml').status_code, 400)
+        self.client.force_authenticate(self.seeker)
+        self.assertEqual(self.upload('jobs.csv', HEADER + VALID_ROW).status_code, 403)
+        self.assertFalse(Job.objects.exists())
+
+    def test_batches_update_histogram(self):
+        before = sum(SalaryHistogramBucket.objects.values_list('count', flat=True))
+        stream = io.BytesIO('\n'.join(job_row(title=f'job {index}') for index in range(5)).encode())
+        report = import_jobs(stream, self.employer, file_format='jsonl', batch_size=2)
+        self.assertEqual(report['created'], 5)
+        self.assertEqual(Job.objects.filter(company=self.employer).count(), 5)
+        after = sum(SalaryHistogramBucket.objects.values_list('count', flat=True))
+        self.assertEqual(after - before, 5)
+
+    def test_errors_truncated(self):
+        stream = io.BytesIO('\n'.join(['{'] * 3).encode())
+        with mock.patch('jobs.bulk_import.JOB_IMPORT_MAX_ERRORS', 2):
+            report = import_jobs(stream, self.employer, file_format='jsonl')
+        self.assertEqual(report['failed'], 3)
+        self.assertEqual(len(report['errors']), 2)
+        self.assertTrue(report['errors_truncated'])
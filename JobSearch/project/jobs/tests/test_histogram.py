@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from jobs.histogram import SALARY_HISTOGRAM_STEP, salary_bucket
+from jobs.models import Job, SalaryHistogramBucket
+
+from .test_pagination import create_job
+
+User = get_user_model()
+
+
+class SalaryHistogramCounterTests(TestCase):
+    """
+    Предрассчитанная гистограмма зарплат меняется вместе с вакансиями:
+    создание, изменение группы или зарплаты, снятие с публикации и удаление.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user(
+            username='employer', email='employer@example.com', password='pass',
+            role='employer', company_name='Компания',
+        )
+
+    def setUp(self):
+        self.initial = self.counts()
+
+    def counts(self):
+        return {
+            (row.employment_type, row.experience, row.bucket): row.count
+            for row in SalaryHistogramBucket.objects.all()
+        }
+
+    def assertDeltas(self, expected):
+        current = self.counts()
+        deltas = {
+            key: current.get(key, 0) - self.initial.get(key, 0)
+            for key in set(current) | set(self.initial)
+        }
+        self.assertEqual({key: delta for key, delta in deltas.items() if delta}, expected)
+
+    def test_create(self):
+        create_job(self.employer, 'python', salary_min=2 * SALARY_HISTOGRAM_STEP)
+        self.assertDeltas({('full_time', '1-3', 2): 1})
+
+    def test_update_moves_job_between_rows(self):
+        job = create_job(self.employer, 'python', salary_min=0)
+        # Изменение экземпляра, загруженного из БД, и того же экземпляра повторно
+        job = Job.objects.get(pk=job.pk)
+        job.salary_min = 3 * SALARY_HISTOGRAM_STEP
+        job.save()
+        job.experience = '3-5'
+        job.save()
+        self.assertDeltas({('full_time', '3-5', 3): 1})
+
+    def test_unrelated_update_keeps_counts(self):
+        job = create_job(self.employer, 'python')
+        job.title = 'django'
+        job.save()
+        Job.objects.get(pk=job.pk).save(update_fields=['description'])
+        self.assertDeltas({('full_time', '1-3', salary_bucket(job.salary_min)): 1})
+
+    def test_deactivate_and_reactivate(self):
+        job = create_job(self.employer, 'python', salary_min=0)
+        job.is_active = False
+        job.save()
+        self.assertDeltas({})
+        job.is_active = True
+        job.save()
+        self.assertDeltas({('full_time', '1-3', 0): 1})
+
+    def test_delete(self):
+        job = create_job(self.employer, 'python', salary_min=SALARY_HISTOGRAM_STEP)
+        # Удаление после изменения в памяти без сохранения: вычитается сохраненная строка
+        job = Job.objects.get(pk=job.pk)
+        job.salary_min = 5 * SALARY_HISTOGRAM_STEP
+        job.delete()
+        self.assertDeltas({})
+
+    def test_delete_inactive(self):
+        job = create_job(self.employer, 'python', is_active=False)
+        Job.objects.get(pk=job.pk).delete()
+        self.assertDeltas({})
+
+    def test_last_bucket_is_open(self):
+        create_job(self.employer, 'python', salary_min=10 ** 9)
+        self.assertDeltas({('full_time', '1-3', salary_bucket(10 ** 9)): 1})
+        self.assertEqual(salary_bucket(10 ** 9), salary_bucket(10 ** 10))
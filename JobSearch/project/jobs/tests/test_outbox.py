@@ -0,0 +1,148 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from jobs import outbox
+from jobs.models import OutboxMessage
+
+
+class RecordingLayer:
+    """
+    Channel layer, который запоминает отправленное и отказывает группам из failing.
+    """
+
+    def __init__(self, failing=()):
+        self.sent = []
+        self.failing = set(failing)
+
+    async def group_send(self, group, message):
+        if group in self.failing:
+            raise ConnectionError(f'группа {group} недоступна')
+        self.sent.append((group, message))
+
+
+class OutboxTestCase(TestCase):
+
+    def setUp(self):
+        self.layer = RecordingLayer()
+        patches = [
+            mock.patch('jobs.outbox.get_channel_layer', side_effect=lambda: self.layer),
+            # Фоновый поток диспетчера в тестах не запускается
+            mock.patch('jobs.outbox.NOTIFICATIONS_OUTBOX_IN_PROCESS', False),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def enqueue(self, *groups):
+        for index, group in enumerate(groups):
+            outbox.enqueue_notification(group, {'type': 'notification', 'index': index})
+        return list(OutboxMessage.objects.order_by('pk'))
+
+
+class OutboxDispatchTests(OutboxTestCase):
+    """
+    Отправка пачек: порядок, повторы после ошибки и отказ от безнадежных уведомлений.
+    """
+
+    def test_rollback_discards_message(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                outbox.enqueue_notification('notifications_1', {'type': 'notification'})
+                raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_dispatch_sends_in_order_and_deletes(self):
+        self.enqueue('notifications_1', 'notifications_2', 'notifications_1')
+        self.assertEqual(outbox.dispatch_pending(batch_size=2), 3)
+        self.assertEqual(
+            [(group, message['index']) for group, message in self.layer.sent],
+            [('notifications_1', 0), ('notifications_2', 1), ('notifications_1', 2)],
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_failure_stops_batch_and_retries(self):
+        first, failed, last = self.enqueue('notifications_1', 'broken', 'notifications_2')
+        self.layer.failing.add('broken')
+
+        with self.assertLogs('jobs.outbox', 'ERROR'):
+            self.assertEqual(outbox.dispatch_batch(), 1)
+        self.assertFalse(OutboxMessage.objects.filter(pk=first.pk).exists())
+        failed.refresh_from_db()
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('broken', failed.last_error)
+        self.assertIsNone(failed.claimed_until)
+        # Остаток пачки после ошибки возвращается в очередь без попытки
+        last.refresh_from_db()
+        self.assertEqual(last.attempts, 0)
+        self.assertIsNone(last.claimed_until)
+
+        with self.assertLogs('jobs.outbox', 'ERROR'):
+            self.assertEqual(outbox.dispatch_pending(), 0)
+        failed.refresh_from_db()
+        self.assertEqual(failed.attempts, 2)
+
+        self.layer.failing.clear()
+        self.assertEqual(outbox.dispatch_pending(), 2)
+        self.assertEqual([group for group, message in self.layer.sent], ['notifications_1', 'broken', 'notifications_2'])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_message_dropped_after_max_attempts(self):
+        failed, last = self.enqueue('broken', 'notifications_1')
+        OutboxMessage.objects.filter(pk=failed.pk).update(attempts=outbox.OUTBOX_MAX_ATTEMPTS - 1)
+        self.layer.failing.add('broken')
+
+        with self.assertLogs('jobs.outbox', 'ERROR'):
+            self.assertEqual(outbox.dispatch_batch(), 0)
+        self.assertFalse(OutboxMessage.objects.filter(pk=failed.pk).exists())
+        self.assertEqual(outbox.dispatch_batch(), 1)
+        self.assertEqual(self.layer.sent, [('notifications_1', last.payload)])
+
+
+class OutboxClaimTests(OutboxTestCase):
+    """
+    Пачки, забранные разными диспетчерами, не пересекаются, а брошенные
+    после истечения срока подбираются снова.
+    """
+
+    def test_claims_are_disjoint(self):
+        messages = self.enqueue(*(f'notifications_{index}' for index in range(5)))
+        first = outbox.claim_batch(2)
+        second = outbox.claim_batch(2)
+        third = outbox.claim_batch(2)
+        self.assertEqual([message.pk for message in first], [message.pk for message in messages[:2]])
+        self.assertEqual([message.pk for message in second], [message.pk for message in messages[2:4]])
+        self.assertEqual([message.pk for message in third], [messages[4].pk])
+        self.assertEqual(outbox.claim_batch(2), [])
+        self.assertEqual(outbox.dispatch_batch(), 0)
+        self.assertEqual(self.layer.sent, [])
+
+    def test_expired_claim_is_reclaimed(self):
+        messages = self.enqueue('notifications_1', 'notifications_2')
+        outbox.claim_batch()
+        # NOW() в тесте - время начала транзакции, поэтому срок сдвигается с запасом
+        OutboxMessage.objects.filter(pk=messages[0].pk).update(claimed_until=timezone.now() - timedelta(hours=1))
+        self.assertEqual([message.pk for message in outbox.claim_batch()], [messages[0].pk])
+
+    def test_in_memory_layer_without_server_loop(self):
+        # Слой в памяти без цикла ASGI-сервера: уведомления остаются в таблице незабранными
+        self.layer = InMemoryChannelLayer()
+        message, = self.enqueue('notifications_1')
+        self.assertEqual(outbox.dispatch_pending(), 0)
+        message.refresh_from_db()
+        self.assertIsNone(message.claimed_until)
+        with self.assertRaises(CommandError):
+            call_command('dispatch_outbox', once=True, stdout=StringIO())
+
+    def test_command_dispatches_once(self):
+        self.enqueue('notifications_1', 'notifications_2')
+        out = StringIO()
+        call_command('dispatch_outbox', once=True, stdout=out)
+        self.assertIn('2', out.getvalue())
+        self.assertEqual(len(self.layer.sent), 2)
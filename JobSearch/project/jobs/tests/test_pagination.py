@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from jobs.search import fulltext_search
+
+User = get_user_model()
+
+
+def create_job(company, title, **fields):
+    defaults = {
+        'location': 'Алматы', 'salary_min': 100000, 'salary_max': 200000,
+        'description': 'python django', 'requirements': 'опыт',
+        'employment_type': 'full_time', 'experience': '1-3', 'skills': [],
+    }
+    defaults.update(fields)
+    return Job.objects.create(company=company, title=title, **defaults)
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Курсорная пагинация списка вакансий: каждая строка выдается ровно один раз,
+    в том числе при совпадающих значениях полей сортировки.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user(
+            username='employer', email='employer@example.com', password='pass',
+            role='employer', company_name='Компания',
+        )
+        titles = ['python developer', 'python developer python', 'senior python developer', 'python']
+        cls.jobs = [create_job(cls.employer, titles[i % len(titles)]) for i in range(12)]
+        # Одинаковое время создания: порядок внутри групп решает только id
+        now = timezone.now()
+        Job.objects.update(created_at=now, updated_at=now)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url, link='next'):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = [job['id'] for job in response.data['results']]
+            ids += page
+            pages.append((url, page))
+            url = response.data[link]
+            self.assertLessEqual(len(pages), len(self.jobs), 'курсор не продвигается')
+        return ids, pages
+
+    def test_default_ordering_with_tied_created_at(self):
+        ids, _ = self.walk('/api/jobs/?page_size=5')
+        self.assertEqual(ids, sorted((job.pk for job in self.jobs), reverse=True))
+
+    def test_tied_search_ranks(self):
+        expected = list(
+            fulltext_search(Job.objects.all(), 'python').order_by('-search_rank', '-created_at', '-id')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(len(expected), len(self.jobs))
+        for page_size in (1, 2, 5):
+            with self.subTest(page_size=page_size):
+                ids, _ = self.walk(f'/api/jobs/?q=python&page_size={page_size}')
+                self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_same_page(self):
+        _, pages = self.walk('/api/jobs/?q=python&page_size=5')
+        last_url, last_page = pages[-1]
+        response = self.client.get(last_url)
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([job['id'] for job in previous.data['results']], pages[-2][1])
+
+    def test_cursor_survives_new_jobs(self):
+        response = self.client.get('/api/jobs/?page_size=5')
+        first_page = [job['id'] for job in response.data['results']]
+        later = create_job(self.employer, 'new', created_at=timezone.now() + timedelta(days=1))
+        ids, _ = self.walk(response.data['next'])
+        self.assertNotIn(later.pk, ids)
+        self.assertEqual(first_page + ids, sorted((job.pk for job in self.jobs), reverse=True))
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/jobs/?cursor=bad').status_code, 404)
+        response = self.client.get('/api/jobs/?page_size=5')
+        cursor = response.data['next'].split('cursor=')[1].split('&')[0]
+        # Курсор другой сортировки недействителен
+        self.assertEqual(self.client.get(f'/api/jobs/?q=python&cursor={cursor}').status_code, 404)
@@ -0,0 +1,167 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+# Период сброса накопленных просмотров в БД, в секундах
+JOB_VIEWS_FLUSH_INTERVAL = getattr(settings, 'JOB_VIEWS_FLUSH_INTERVAL', 5)
+# Общий буфер в Redis (необязательно): процессы сливают туда свои счетчики,
+# а в БД их переносит тот процесс, который первым взял блокировку
+JOB_VIEWS_REDIS_URL = getattr(settings, 'JOB_VIEWS_REDIS_URL', None)
+
+# Сколько вакансий обновлять одним UPDATE
+FLUSH_BATCH_SIZE = 1000
+
+REDIS_PENDING_KEY = 'job_views:pending'
+REDIS_LOCK_KEY = 'job_views:flush_lock'
+
+logger = logging.getLogger(__name__)
+
+
+def apply_view_counts(counts):
+    """
+    Прибавляет просмотры пачками UPDATE ... FROM (VALUES ...). Строки идут по
+    возрастанию id, чтобы параллельные сбросы блокировали их в одном порядке.
+    updated_at не меняется: просмотр не является изменением вакансии, но
+    закэшированные карточки (в них есть views_count) сбрасываются.
+    """
+    from .cache import JOB_CARD_TAG, invalidate_tags
+    from .models import Job
+
+    table = Job._meta.db_table
+    items = sorted((int(job_id), int(delta)) for job_id, delta in counts.items() if int(delta))
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        batch = items[start:start + FLUSH_BATCH_SIZE]
+        placeholders = ', '.join(['(%s, %s)'] * len(batch))
+        params = [value for item in batch for value in item]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} AS job
+                SET views_count = job.views_count + counts.delta
+                FROM (VALUES {placeholders}) AS counts (id, delta)
+                WHERE job.id = counts.id
+                """,
+                params,
+            )
+        invalidate_tags(*(JOB_CARD_TAG.format(job_id) for job_id, _ in batch))
+
+
+class ViewCounter:
+    """
+    Буфер просмотров вакансий в памяти процесса. hit() только увеличивает
+    счетчик в словаре; фоновый поток раз в JOB_VIEWS_FLUSH_INTERVAL секунд
+    записывает накопленное одним пакетным UPDATE (или сливает в Redis).
+    """
+
+    def __init__(self, interval=JOB_VIEWS_FLUSH_INTERVAL, redis_url=JOB_VIEWS_REDIS_URL):
+        self.interval = interval
+        self.redis_url = redis_url
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+        self._redis = None
+
+    def hit(self, job_id):
+        with self.lock:
+            self.pending[job_id] += 1
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        # Поток запускается лениво: после fork воркера, а не в мастер-процессе
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, name='job-view-counter', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Ошибка при сбросе просмотров")
+            finally:
+                connection.close()
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        return pending
+
+    def put_back(self, pending):
+        with self.lock:
+            self.pending.update(pending)
+
+    def flush(self):
+        """
+        Записывает накопленные просмотры. При ошибке записи (в БД или в Redis)
+        они возвращаются в буфер.
+        """
+        pending = self.take()
+        if self.redis_url:
+            self._flush_redis(pending)
+            return
+        if not pending:
+            return
+        try:
+            apply_view_counts(pending)
+        except Exception:
+            self.put_back(pending)
+            raise
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    def _flush_redis(self, pending):
+        if pending:
+            try:
+                pipe = self.redis.pipeline()
+                for job_id, delta in pending.items():
+                    pipe.hincrby(REDIS_PENDING_KEY, job_id, delta)
+                pipe.execute()
+            except Exception:
+                self.put_back(pending)
+                raise
+        # В БД пишет один процесс за интервал
+        if not self.redis.set(REDIS_LOCK_KEY, 1, nx=True, ex=self.interval):
+            return
+        processing = f"{REDIS_PENDING_KEY}:{time.time_ns()}"
+        try:
+            self.redis.rename(REDIS_PENDING_KEY, processing)
+        except Exception:
+            # Ключа нет - новых просмотров не было
+            return
+        counts = {int(job_id): int(delta) for job_id, delta in self.redis.hgetall(processing).items()}
+        try:
+            apply_view_counts(counts)
+        except Exception:
+            pipe = self.redis.pipeline()
+            for job_id, delta in counts.items():
+                pipe.hincrby(REDIS_PENDING_KEY, job_id, delta)
+            pipe.execute()
+            raise
+        finally:
+            self.redis.delete(processing)
+
+
+view_counter = ViewCounter()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception("Не удалось сохранить просмотры при завершении")
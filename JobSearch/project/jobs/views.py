@@ -3,23 +3,48 @@ from rest_framework import viewsets, status, serializers, permissions
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Q, Count, Max
-from django.db import transaction
-from .models import Job, JobApplication, SavedJob, ChatMessage, Conversation
+from django.db.models import Q, Count, Max, Prefetch
+from django.db import IntegrityError, transaction
+from .models import Job, JobApplication, SavedJob, ChatMessage, Conversation, Location
 from .serializers import (
-    JobSerializer, JobApplicationSerializer,
-    SavedJobSerializer, ChatMessageSerializer, ConversationSerializer
+    JobSerializer, JobApplicationSerializer, LocationSerializer,
+    SavedJobSerializer, ChatMessageSerializer, ConversationSerializer, InboxConversationSerializer
+)
+from .search import apply_job_filters, parse_job_filters
+from .facets import get_job_facets
+from .histogram import get_salary_histogram
+from .locations import normalize_location
+from .matching import refresh_match_scores
+from .application_stats import get_application_stats
+from .funnel import get_employer_dashboard
+from .outbox import enqueue_notification
+from .conversations import find_conversation, get_or_create_conversation
+from .inbox import inbox_queryset, mark_conversation_read, unread_conversations_count
+from .bulk_status import APPLICATION_STATUSES, BULK_STATUS_MAX_IDS, bulk_update_status
+from .bulk_import import IMPORT_FORMATS, detect_format, import_jobs
+from .export import APPLICATION_EXPORT_FIELDS, EXPORT_FORMATS, JOB_EXPORT_FIELDS, export_response
+from .recommendations import recommend_jobs
+from .view_counter import view_counter
+from .saved_jobs import forget_saved, saved_job_ids
+from .pagination import KeysetPagination
+from .conditional import (
+    make_etag, not_modified, queryset_validator, saved_jobs_fingerprint, set_validators
+)
+from .cache import (
+    card_versions, get_job_cards, is_list_cacheable, job_cards_fingerprint, job_list_key, result_cache,
+    store_job_cards,
 )
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from users.models import Resume
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 import redis
 from django.http import Http404
 import json
+import logging
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 class IsEmployerOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -35,31 +60,250 @@ class IsEmployerOrReadOnly(permissions.BasePermission):
 class JobViewSet(viewsets.ModelViewSet):
     serializer_class = JobSerializer
     permission_classes = [IsEmployerOrReadOnly]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        queryset = Job.objects.all().select_related('company')
+        # search_vector нужен только в WHERE, в выборку его не тянем
+        queryset = Job.objects.all().select_related('company').defer('search_vector')
         
         if not self.request.user.is_staff:
             queryset = queryset.filter(is_active=True)
-            
-        title = self.request.query_params.get('title', None)
-        location = self.request.query_params.get('location', None)
-        experience = self.request.query_params.get('experience', None)
-        employment_type = self.request.query_params.get('employment_type', None)
-        min_salary = self.request.query_params.get('min_salary', None)
-        
-        if title:
-            queryset = queryset.filter(title__icontains=title)
-        if location:
-            queryset = queryset.filter(location__icontains=location)
-        if experience:
-            queryset = queryset.filter(experience=experience)
-        if employment_type:
-            queryset = queryset.filter(employment_type=employment_type)
-        if min_salary:
-            queryset = queryset.filter(salary_min__gte=min_salary)
-            
-        return queryset
+
+        return apply_job_filters(queryset, parse_job_filters(self.request.query_params))
+    
+    def get_list_validator(self, filters):
+        """
+        Часть ETag по отфильтрованному списку без аннотаций и сортировки.
+        Отклики и просмотры не меняют updated_at, поэтому их суммы входят в валидатор.
+        """
+        queryset = Job.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(is_active=True)
+        return queryset_validator(
+            apply_job_filters(queryset, filters, ranked=False),
+            counters=('applications_count', 'views_count'),
+        )
+    
+    def list(self, request, *args, **kwargs):
+        filters = parse_job_filters(request.query_params)
+        cacheable = not request.user.is_staff and is_list_cacheable(filters)
+
+        # Популярные списки (первая страница, город, тип занятости) берем из кэша:
+        # там лежат id вакансий страницы, состояние курсора и валидатор списка,
+        # карточки кэшируются отдельно
+        entry = None
+        if cacheable:
+            paginator = self.paginator
+            key = job_list_key(
+                filters,
+                page_size=paginator.get_page_size(request),
+                cursor=request.query_params.get(paginator.cursor_query_param) or '',
+            )
+            entry = result_cache.get(key)
+
+        # Валидатор закэшированной страницы не видит изменений счетчиков после записи
+        # в кэш, поэтому к нему добавляются версии карточек: их сбрасывают отклики
+        # и сброс просмотров
+        if entry is not None:
+            validator = make_etag(entry['validator'], job_cards_fingerprint(entry['ids']))
+        else:
+            validator = self.get_list_validator(filters)
+        saved_fingerprint = saved_jobs_fingerprint(request.user)
+        etag = make_etag(validator, saved_fingerprint)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        if not cacheable:
+            response = super().list(request, *args, **kwargs)
+        elif entry is None:
+            # Страница определяет только id и курсор; карточки собираются так же,
+            # как при попадании в кэш, с версиями, прочитанными до запроса к БД
+            page = paginator.paginate_queryset(self.get_queryset(), request, view=self)
+            ids = [job.pk for job in page]
+            cards = self.get_cached_cards(ids)
+            result_cache.set(key, {
+                'ids': ids,
+                'pagination': paginator.get_state(),
+                'validator': validator,
+            })
+            # ETag такой же, какой посчитает следующий запрос из кэша
+            etag = make_etag(make_etag(validator, job_cards_fingerprint(ids)), saved_fingerprint)
+            response = paginator.get_paginated_response(cards)
+        else:
+            paginator.restore_state(request, entry['pagination'])
+            response = paginator.get_paginated_response(self.get_cached_cards(entry['ids']))
+        return set_validators(response, etag)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Returns a job or, if pk contains '_', a conversation lookup by conversation_id.
+        """
+        pk = kwargs.get('pk')
+        if pk and '_' in str(pk):
+            conv = find_conversation(pk, Conversation.objects.filter(participants=request.user))
+            if conv is None:
+                raise Http404
+            serializer = ConversationSerializer(conv, context={'request': request})
+            return Response(serializer.data)
+
+        # Валидаторы считаются по уже загруженной строке (applications_count хранится в ней),
+        # при совпадении отвечаем 304 без сериализации
+        job = self.get_object()
+        # Просмотр только копится в буфере процесса, в БД уходит пакетом
+        if job.company_id != request.user.pk:
+            view_counter.hit(job.pk)
+        etag = make_etag(
+            job.pk, job.updated_at.isoformat(), job.applications_count,
+            job.pk in saved_job_ids(request.user), job.views_count
+        )
+        response = not_modified(request, etag, job.updated_at)
+        if response is not None:
+            return response
+        response = Response(self.get_serializer(job).data)
+        return set_validators(response, etag, job.updated_at)
+    
+    def get_cached_cards(self, job_ids):
+        """
+        Карточки по списку id: из кэша, недостающие - одним запросом к БД.
+        """
+        versions = card_versions(job_ids)
+        cards = get_job_cards(versions)
+        missing = [job_id for job_id in job_ids if job_id not in cards]
+        if missing:
+            queryset = Job.objects.filter(pk__in=missing).select_related('company')\
+                .defer('search_vector')
+            loaded = self.get_serializer(queryset, many=True).data
+            store_job_cards(loaded, versions)
+            cards.update({card['id']: card for card in loaded})
+
+        saved = saved_job_ids(self.request.user)
+        return [
+            {**cards[job_id], 'is_saved': job_id in saved}
+            for job_id in job_ids if job_id in cards
+        ]
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Счетчики по типу занятости, опыту и зарплатным диапазонам для текущих фильтров.
+        """
+        filters = parse_job_filters(request.query_params)
+        return Response(get_job_facets(filters, active_only=not request.user.is_staff))
+    
+    @action(detail=False, methods=['get'])
+    def salary_histogram(self, request):
+        """
+        Распределение вакансий по зарплатным интервалам для слайдера диапазона.
+        """
+        filters = parse_job_filters(request.query_params)
+        return Response(get_salary_histogram(filters, active_only=not request.user.is_staff))
+    
+    @action(detail=False, methods=['get'])
+    def locations(self, request):
+        """
+        Города справочника с числом активных вакансий (для фильтра location_id).
+        Параметр q ищет по началу любого варианта написания.
+        """
+        queryset = Location.objects.annotate(
+            jobs_count=Count('jobs', filter=Q(jobs__is_active=True))
+        )
+        text = normalize_location(request.query_params.get('q'))
+        if text:
+            queryset = queryset.filter(aliases__alias__startswith=text).distinct()
+        return Response(LocationSerializer(queryset, many=True).data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def recommended(self, request):
+        """
+        Рекомендованные активные вакансии для резюме соискателя (по умолчанию -
+        последнего активного). Вакансии, на которые уже есть отклик, не предлагаются.
+        """
+        resumes = Resume.objects.filter(user=request.user)
+        resume_id = request.query_params.get('resume_id')
+        if resume_id:
+            resume = resumes.filter(pk=resume_id).first()
+        else:
+            resume = resumes.filter(is_active=True).order_by('-updated_at').first()
+        if resume is None:
+            return Response({"error": "Резюме не найдено"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+
+        applied = set(JobApplication.objects.filter(applicant=request.user).values_list('job_id', flat=True))
+        scored = recommend_jobs(resume, exclude_ids=applied, limit=limit)
+        scores = dict(scored)
+
+        jobs = Job.objects.filter(pk__in=scores, is_active=True).select_related('company')\
+            .defer('search_vector')
+        jobs = sorted(jobs, key=lambda job: -scores[job.pk])
+        for job in jobs:
+            job.recommendation_score = scores[job.pk]
+
+        serializer = self.get_serializer(jobs, many=True)
+        return Response({'resume_id': resume.pk, 'results': serializer.data})
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def export(self, request):
+        """
+        Потоковая выгрузка вакансий работодателя: output=csv (по умолчанию) или ndjson.
+        """
+        if request.user.role != 'employer':
+            return Response(
+                {"error": "Только работодатели могут выгружать свои вакансии"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        file_format = request.query_params.get('output', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": "Поддерживаются форматы csv и ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = Job.objects.filter(company=request.user)
+        return export_response(queryset, JOB_EXPORT_FIELDS, file_format, 'jobs')
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def export_applications(self, request):
+        """
+        Потоковая выгрузка откликов на вакансии работодателя (job=<id> - по одной вакансии).
+        """
+        if request.user.role != 'employer':
+            return Response(
+                {"error": "Только работодатели могут выгружать отклики"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        file_format = request.query_params.get('output', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": "Поддерживаются форматы csv и ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = JobApplication.objects.filter(job__company=request.user)
+        job_id = request.query_params.get('job')
+        if job_id:
+            queryset = queryset.filter(job_id=job_id)
+        return export_response(queryset, APPLICATION_EXPORT_FIELDS, file_format, 'applications')
+    
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def bulk_import(self, request):
+        """
+        Массовая загрузка вакансий из файла CSV или JSON Lines (поле file).
+        Формат определяется по расширению или параметру input=csv|jsonl.
+        Возвращает отчет: число созданных вакансий и ошибки по строкам (201, если
+        что-то создано, иначе 200 - ошибки строк описаны в самом отчете).
+        """
+        if request.user.role != 'employer':
+            return Response(
+                {"error": "Только работодатели могут загружать вакансии"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Не передан файл"}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = detect_format(upload.name, request.query_params.get('input') or request.data.get('input'))
+        if file_format not in IMPORT_FORMATS:
+            return Response({"error": "Поддерживаются форматы csv и jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = import_jobs(upload, request.user, file_format=file_format)
+        logger.info("bulk_import %s: создано %s, ошибок %s", request.user.username, report['created'], report['failed'])
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK)
     
     def perform_create(self, serializer):
         serializer.save(company=self.request.user)
@@ -72,12 +316,35 @@ class JobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
             
+        # В списке работодателя важны счетчики откликов, поэтому они входят в валидатор
+        jobs_validator = queryset_validator(Job.objects.filter(company=request.user))
+        applications_validator = queryset_validator(JobApplication.objects.filter(job__company=request.user))
+        etag = make_etag(jobs_validator, applications_validator, saved_jobs_fingerprint(request.user))
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
         queryset = Job.objects.filter(company=request.user)\
             .select_related('company')\
-            .annotate(applications_count=Count('applications'))
+            .defer('search_vector')
         
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), etag)
+    
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """
+        Панель работодателя: отклики по статусам, новые отклики с прошлого
+        просмотра и непрочитанные сообщения по каждой вакансии.
+        mark_seen=false - посмотреть, не сбрасывая счетчики новых откликов.
+        """
+        if request.user.role != 'employer':
+            return Response(
+                {"error": "Панель доступна только работодателям"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        mark_seen = request.query_params.get('mark_seen', 'true').lower() not in ('0', 'false', 'no')
+        return Response(get_employer_dashboard(request.user, mark_seen=mark_seen))
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def toggle_active(self, request, pk=None):
@@ -104,7 +371,15 @@ class JobViewSet(viewsets.ModelViewSet):
         if request.user.role == 'employer':
             if job.company != request.user:
                 return Response({"error": "Вы не можете просматривать отклики на эту вакансию"}, status=status.HTTP_403_FORBIDDEN)
-            queryset = JobApplication.objects.filter(job=job).select_related('resume', 'applicant')
+            queryset = JobApplication.objects.filter(job=job).select_related('resume', 'applicant', 'job__company')
+            # ordering=match: лучшие кандидаты первыми; оценки пересчитываются пакетом
+            # только для откликов, у которых изменились вакансия или резюме
+            if request.query_params.get('ordering') == 'match':
+                applications = list(queryset)
+                refresh_match_scores(job, applications)
+                applications.sort(key=lambda application: (-(application.match_score or 0), -application.pk))
+                serializer = JobApplicationSerializer(applications, many=True)
+                return Response(serializer.data)
         elif request.user.role == 'jobseeker':
             queryset = JobApplication.objects.filter(job=job, applicant=request.user).select_related('resume', 'applicant')
         else:
@@ -149,45 +424,29 @@ class JobViewSet(viewsets.ModelViewSet):
             except Resume.DoesNotExist:
                 return Response({"error": "Резюме не найдено"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Создаем отклик
-        application = JobApplication.objects.create(
-            job=job,
-            applicant=user,
-            cover_letter=request.data.get('cover_letter', ''),
-            resume=resume,
-            status='pending'
-        )
-        
         # Проверяем флаг создания чата из разных параметров
         conversation_id = None
         create_flag = request.data.get('create_conversation', True) or request.data.get('create_chat', True) or request.data.get('start_chat', True)
         if True:
             from django.db import transaction
             try:
+                # Отклик, диалог, сообщения и уведомление в outbox фиксируются одной транзакцией
                 with transaction.atomic():
+                    application = JobApplication.objects.create(
+                        job=job,
+                        applicant=user,
+                        cover_letter=request.data.get('cover_letter', ''),
+                        resume=resume,
+                        status='pending'
+                    )
+                    
                     employer = job.company
                     print(f"CHAT DEBUG: Начинаем создание чата для отклика на вакансию {job.id}")
                     print(f"CHAT DEBUG: Соискатель: {user.id}, Работодатель: {employer.id}")
                     
-                    # Ищем существующий диалог
-                    conv_qs = Conversation.objects.filter(participants=user).filter(participants=employer).filter(job=job)
-                    
-                    if conv_qs.exists():
-                        conv = conv_qs.first()
-                        print(f"CHAT DEBUG: Найден существующий диалог с ID {conv.id}")
-                    else:
-                        # Создаем новый диалог в транзакции
-                        print(f"CHAT DEBUG: Создаем новый диалог")
-                        conv = Conversation.objects.create(job=job)
-                        print(f"CHAT DEBUG: Диалог создан с ID {conv.id}")
-                        
-                        # Добавляем участников
-                        conv.participants.add(user, employer)
-                        print(f"CHAT DEBUG: Добавлены участники: соискатель {user.id} и работодатель {employer.id}")
-                        
-                        # Сохраняем явно для уверенности
-                        conv.save()
-                        print(f"CHAT DEBUG: Диалог сохранен в базе данных")
+                    # Находим или создаем диалог одним запросом по уникальной паре
+                    conv, conv_created = get_or_create_conversation(user, employer, job)
+                    print(f"CHAT DEBUG: Диалог {conv.id} ({'создан' if conv_created else 'найден'})")
                     
                     # Отправляем начальное сообщение, если задано
                     initial_msg = request.data.get('message', '')
@@ -257,41 +516,33 @@ class JobViewSet(viewsets.ModelViewSet):
                     check_conv = Conversation.objects.get(id=conv.id)
                     print(f"CHAT DEBUG: Верификация диалога успешна, найден в БД: {check_conv.id}")
                     
-                    # Отправляем уведомление о новом диалоге через WebSocket
-                    try:
-                        from channels.layers import get_channel_layer
-                        from asgiref.sync import async_to_sync
-                        
-                        channel_layer = get_channel_layer()
-                        
-                        # Формируем данные уведомления
-                        notification_data = {
-                            "type": "new_application",
-                            "conversation_id": conv.conversation_id,
-                            "job_id": job.id,
-                            "job_title": job.title,
-                            "applicant": {
-                                    "id": user.id,
-                                "name": f"{user.first_name} {user.last_name}".strip() or user.username,
-                                "has_resume": resume is not None
-                            }
-                            }
-                        
-                        # Отправляем работодателю
-                        employer_group = f"notifications_{employer.id}"
-                        print(f"CHAT DEBUG: Отправляем уведомление работодателю через {employer_group}")
-                        
-                        async_to_sync(channel_layer.group_send)(
-                            employer_group,
-                            {
-                                "type": "chat_message",
-                                "message": notification_data
-                            }
-                        )
-                        
-                        print(f"CHAT DEBUG: Уведомление работодателю отправлено")
-                    except Exception as e:
-                        print(f"CHAT DEBUG: Ошибка отправки уведомления через WebSocket: {str(e)}")
+                    # Отправляем уведомление о новом диалоге (через outbox, в той же транзакции)
+                    # Формируем данные уведомления
+                    notification_data = {
+                        "type": "new_application",
+                        "conversation_id": conv.conversation_id,
+                        "job_id": job.id,
+                        "job_title": job.title,
+                        "applicant": {
+                                "id": user.id,
+                            "name": f"{user.first_name} {user.last_name}".strip() or user.username,
+                            "has_resume": resume is not None
+                        }
+                        }
+                    
+                    # Отправляем работодателю
+                    employer_group = f"notifications_{employer.id}"
+                    print(f"CHAT DEBUG: Отправляем уведомление работодателю через {employer_group}")
+                    
+                    enqueue_notification(
+                        employer_group,
+                        {
+                            "type": "chat_message",
+                            "message": notification_data
+                        }
+                    )
+                    
+                    print(f"CHAT DEBUG: Уведомление работодателю отправлено")
             
                     # Возвращаем успешный ответ с данными о созданном отклике и чате
                     response_data = {
@@ -304,27 +555,12 @@ class JobViewSet(viewsets.ModelViewSet):
                     return Response(response_data, status=status.HTTP_201_CREATED)
                 
             except Exception as e:
-                print(f"CHAT ERROR: Ошибка при создании чата: {str(e)}")
-                # В случае ошибки чата все равно возвращаем успешный статус для отклика
-                return Response({
-                    "status": "success",
-                    "message": "Отклик успешно отправлен, но возникла проблема с созданием чата",
-                    "application_id": application.id
-                }, status=status.HTTP_201_CREATED)
-
-    def retrieve(self, request, *args, **kwargs):
-        """
-        Returns a job or, if pk contains '_', a conversation lookup by conversation_id.
-        """
-        pk = kwargs.get('pk')
-        if pk and '_' in str(pk):
-            qs = Conversation.objects.filter(participants=request.user)
-            for conv in qs:
-                if conv.conversation_id == str(pk):
-                    serializer = ConversationSerializer(conv, context={'request': request})
-                    return Response(serializer.data)
-            raise Http404
-        return super().retrieve(request, *args, **kwargs)
+                print(f"CHAT ERROR: Ошибка при создании отклика и чата: {str(e)}")
+                # Транзакция откачена целиком: отклика, диалога и уведомления нет
+                return Response(
+                    {"error": "Не удалось отправить отклик, попробуйте еще раз"},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
 
 class JobApplicationViewSet(viewsets.ModelViewSet):
     serializer_class = JobApplicationSerializer
@@ -403,7 +639,7 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             )
             
         status_value = request.data.get('status')
-        if status_value not in ['pending', 'reviewed', 'interviewing', 'accepted', 'rejected']:
+        if status_value not in APPLICATION_STATUSES:
             return Response(
                 {"error": "Неверный статус"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -415,6 +651,52 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(application)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        """
+        Выставляет статус сразу нескольким откликам: {"ids": [...], "status": "..."}.
+        Отклики чужих вакансий и отклики, уже имеющие этот статус, пропускаются.
+        """
+        if request.user.role != 'employer':
+            return Response(
+                {"error": "У вас нет прав для выполнения этого действия"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        status_value = request.data.get('status')
+        if status_value not in APPLICATION_STATUSES:
+            return Response(
+                {"error": "Неверный статус"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ids = request.data.get('ids')
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "ids должен быть списком id откликов"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ids:
+            return Response(
+                {"error": "Не указаны отклики"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > BULK_STATUS_MAX_IDS:
+            return Response(
+                {"error": f"Не больше {BULK_STATUS_MAX_IDS} откликов за один запрос"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        changed = bulk_update_status(request.user, ids, status_value)
+        updated = {application['id'] for application in changed}
+        return Response({
+            "status": status_value,
+            "updated": sorted(updated),
+            "skipped": [pk for pk in ids if pk not in updated],
+        })
+    
     @action(detail=False, methods=['post'])
     def start_chat(self, request, job_id=None):
         # Получаем job_id из запроса или URL параметра 
@@ -449,24 +731,8 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
                 initial_message = request.data.get('initial_message', f"Здравствуйте! Я заинтересован(а) в вакансии \"{job.title}\".")
                 
                 # Создаём или получаем диалог между соискателем и работодателем
-                conversation_qs = Conversation.objects.filter(participants=request.user).filter(participants=employer).filter(job=job)
-                
-                if conversation_qs.exists():
-                    conversation = conversation_qs.first()
-                    print(f"START_CHAT DEBUG: Найден существующий диалог с ID {conversation.id}")
-                else:
-                    # Создаем новый диалог
-                    print(f"START_CHAT DEBUG: Создаем новый диалог")
-                    conversation = Conversation.objects.create(job=job)
-                    print(f"START_CHAT DEBUG: Диалог создан с ID {conversation.id}")
-                    
-                    # Добавляем участников
-                    conversation.participants.add(request.user, employer)
-                    print(f"START_CHAT DEBUG: Добавлены участники в диалог")
-                    
-                    # Сохраняем диалог (для уверенности)
-                    conversation.save()
-                    print(f"START_CHAT DEBUG: Диалог сохранен в БД")
+                conversation, created = get_or_create_conversation(request.user, employer, job)
+                print(f"START_CHAT DEBUG: Диалог {conversation.id} ({'создан' if created else 'найден'})")
                 
                 conversation_id = conversation.conversation_id
                 group_name = f"chat_{conversation_id}"
@@ -488,69 +754,60 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
                 print(f"START_CHAT DEBUG: Проверка успешна - диалог: {check_conv.id}, сообщение: {check_msg}")
                 
                 # Broadcast initial message via WebSocket using sorted participant IDs and job ID
-                try:
-                    from channels.layers import get_channel_layer
-                    from asgiref.sync import async_to_sync
-                    
-                    channel_layer = get_channel_layer()
-                    
-                    # Отправляем сообщение в группу чата
-                    print(f"START_CHAT DEBUG: Отправка сообщения в WebSocket группу: {group_name}")
-                    async_to_sync(channel_layer.group_send)(
-                        group_name,
-                        {
-                            "type": "chat_message",
-                            "message": message.content,
-                            "sender_id": message.sender.id,
-                            "sender_name": message.sender.get_full_name(),
-                            "message_id": message.id,
-                            "created_at": message.created_at.isoformat(),
-                        }
-                    )
-                    print(f"START_CHAT DEBUG: Сообщение отправлено в WebSocket")
+                # (уведомления пишутся в outbox в этой же транзакции, ошибка откатывает весь запрос)
+                # Отправляем сообщение в группу чата
+                print(f"START_CHAT DEBUG: Отправка сообщения в WebSocket группу: {group_name}")
+                enqueue_notification(
+                    group_name,
+                    {
+                        "type": "chat_message",
+                        "message": message.content,
+                        "sender_id": message.sender.id,
+                        "sender_name": message.sender.get_full_name(),
+                        "message_id": message.id,
+                        "created_at": message.created_at.isoformat(),
+                    }
+                )
+                print(f"START_CHAT DEBUG: Сообщение отправлено в WebSocket")
                     
-                    # Отправляем уведомление работодателю о новом чате
-                    print(f"START_CHAT DEBUG: Отправка уведомления работодателю")
-                    notification_layer = get_channel_layer()
-                    notification_group = f"notifications_{employer.id}"
+                # Отправляем уведомление работодателю о новом чате
+                print(f"START_CHAT DEBUG: Отправка уведомления работодателю")
+                notification_group = f"notifications_{employer.id}"
                     
-                    async_to_sync(notification_layer.group_send)(
-                        notification_group,
-                        {
-                            "type": "new_conversation",
-                            "conversation_id": conversation_id,
-                            "other_user": {
-                                "id": request.user.id, 
-                                "first_name": request.user.first_name, 
-                                "last_name": request.user.last_name
-                            },
-                            "job": {"id": job.id, "title": job.title}
-                        }
-                    )
-                    print(f"START_CHAT DEBUG: Уведомление отправлено работодателю")
+                enqueue_notification(
+                    notification_group,
+                    {
+                        "type": "new_conversation",
+                        "conversation_id": conversation_id,
+                        "other_user": {
+                            "id": request.user.id, 
+                            "first_name": request.user.first_name, 
+                            "last_name": request.user.last_name
+                        },
+                        "job": {"id": job.id, "title": job.title}
+                    }
+                )
+                print(f"START_CHAT DEBUG: Уведомление отправлено работодателю")
                     
-                    # Также отправляем уведомление соискателю
-                    seeker_notification_group = f"notifications_{request.user.id}"
-                    print(f"START_CHAT DEBUG: Отправка уведомления соискателю: {seeker_notification_group}")
+                # Также отправляем уведомление соискателю
+                seeker_notification_group = f"notifications_{request.user.id}"
+                print(f"START_CHAT DEBUG: Отправка уведомления соискателю: {seeker_notification_group}")
                     
-                    async_to_sync(notification_layer.group_send)(
-                        seeker_notification_group,
-                        {
-                            "type": "new_conversation",
-                            "conversation_id": conversation_id,
-                            "other_user": {
-                                "id": employer.id,
-                                "first_name": employer.first_name,
-                                "last_name": employer.last_name
-                            },
-                            "job": {"id": job.id, "title": job.title}
-                        }
-                    )
-                    print(f"START_CHAT DEBUG: Уведомление отправлено соискателю")
+                enqueue_notification(
+                    seeker_notification_group,
+                    {
+                        "type": "new_conversation",
+                        "conversation_id": conversation_id,
+                        "other_user": {
+                            "id": employer.id,
+                            "first_name": employer.first_name,
+                            "last_name": employer.last_name
+                        },
+                        "job": {"id": job.id, "title": job.title}
+                    }
+                )
+                print(f"START_CHAT DEBUG: Уведомление отправлено соискателю")
                     
-                except Exception as e:
-                    print(f"START_CHAT DEBUG: Ошибка отправки WebSocket: {e}")
-                    # Continue execution even if WebSocket notification fails
                 
                 # Получаем resume_id из запроса
                 resume_id = request.data.get('resume')
@@ -558,42 +815,42 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
                 # Если resume_id предоставлен, отправляем второе сообщение с информацией о резюме
                 if resume_id:
                     try:
-                        resume = Resume.objects.filter(id=resume_id, user=request.user).first()
+                        # Сообщение о резюме необязательно: его ошибка откатывает только эту точку сохранения
+                        with transaction.atomic():
+                            resume = Resume.objects.filter(id=resume_id, user=request.user).first()
                         
-                        if resume:
-                            # Форматируем сообщение с информацией о резюме
-                            resume_text = f"📄 Моё резюме: {resume.title}\n"
+                            if resume:
+                                # Форматируем сообщение с информацией о резюме
+                                resume_text = f"📄 Моё резюме: {resume.title}\n"
                             
-                            # Добавляем навыки, если они доступны
-                            if resume.skills:
-                                skills_text = ", ".join(resume.skills) if isinstance(resume.skills, list) else str(resume.skills)
-                                resume_text += f"Навыки: {skills_text}\n"
+                                # Добавляем навыки, если они доступны
+                                if resume.skills:
+                                    skills_text = ", ".join(resume.skills) if isinstance(resume.skills, list) else str(resume.skills)
+                                    resume_text += f"Навыки: {skills_text}\n"
                                 
-                            # Добавляем предпочитаемый тип занятости
-                            if resume.preferred_employment:
-                                resume_text += f"Занятость: {resume.get_preferred_employment_display()}\n"
+                                # Добавляем предпочитаемый тип занятости
+                                if resume.preferred_employment:
+                                    resume_text += f"Занятость: {resume.get_preferred_employment_display()}\n"
                                 
-                            # Добавляем ожидаемую зарплату, если она указана
-                            if resume.salary_expectation:
-                                resume_text += f"Ожидаемая зарплата: {resume.salary_expectation} руб.\n"
+                                # Добавляем ожидаемую зарплату, если она указана
+                                if resume.salary_expectation:
+                                    resume_text += f"Ожидаемая зарплата: {resume.salary_expectation} руб.\n"
                                 
-                            # Добавляем ссылку на полное резюме
-                            resume_text += f"\n👉 Открыть полное резюме: /resumes/{resume_id}"
+                                # Добавляем ссылку на полное резюме
+                                resume_text += f"\n👉 Открыть полное резюме: /resumes/{resume_id}"
                             
-                            # Отправляем сообщение с резюме
-                            resume_message = ChatMessage.objects.create(
-                                conversation=conversation,
-                                sender=request.user,
-                                recipient=employer,
-                                job=job,
-                                content=resume_text
-                            )
-                            print(f"START_CHAT DEBUG: Создано сообщение с резюме: {resume_message.id}")
+                                # Отправляем сообщение с резюме
+                                resume_message = ChatMessage.objects.create(
+                                    conversation=conversation,
+                                    sender=request.user,
+                                    recipient=employer,
+                                    job=job,
+                                    content=resume_text
+                                )
+                                print(f"START_CHAT DEBUG: Создано сообщение с резюме: {resume_message.id}")
                             
-                            # Отправляем уведомление через WebSocket о сообщении с резюме
-                            try:
-                                channel_layer = get_channel_layer()
-                                async_to_sync(channel_layer.group_send)(
+                                # Отправляем уведомление через WebSocket о сообщении с резюме
+                                enqueue_notification(
                                     group_name,
                                     {
                                         "type": "chat_message",
@@ -605,10 +862,8 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
                                     }
                                 )
                                 print(f"START_CHAT DEBUG: Сообщение с резюме отправлено в WebSocket")
-                            except Exception as e:
-                                print(f"START_CHAT DEBUG: Ошибка отправки сообщения с резюме: {e}")
-                        else:
-                            print(f"START_CHAT DEBUG: Резюме не найдено: id={resume_id}, user={request.user.id}")
+                            else:
+                                print(f"START_CHAT DEBUG: Резюме не найдено: id={resume_id}, user={request.user.id}")
                     except Exception as resume_error:
                         # Записываем ошибку в лог, но не прерываем основной процесс
                         print(f"START_CHAT DEBUG: Ошибка при отправке резюме: {str(resume_error)}")
@@ -645,26 +900,11 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        applications = JobApplication.objects.filter(applicant=request.user)
-        total_applications = applications.count()
-        
-        employment_counts = {}
-        for job_type in ['full_time', 'part_time', 'remote', 'contract', 'internship']:
-            count = applications.filter(job__employment_type=job_type).count()
-            if count > 0:
-                employment_counts[job_type] = count
-        
-        experience_counts = {}
-        for exp_level in ['no_experience', 'junior', 'middle', 'senior', 'lead']:
-            count = applications.filter(job__experience=exp_level).count()
-            if count > 0:
-                experience_counts[exp_level] = count
-        
-        return Response({
-            'total_applications': total_applications,
-            'by_employment_type': employment_counts,
-            'by_experience': experience_counts
-        })
+        """
+        Статистика откликов соискателя по типу занятости, опыту и статусу
+        (одно чтение счетчиков или один GROUP BY, см. jobs/application_stats.py).
+        """
+        return Response(get_application_stats(request.user))
 
     @action(detail=True, methods=['delete', 'post'])
     def withdraw(self, request, pk=None):
@@ -711,7 +951,9 @@ class SavedJobViewSet(viewsets.ModelViewSet):
         # Строгая фильтрация по аутентифицированному пользователю, чтобы обеспечить правильную изоляцию данных
         user_id = self.request.user.id
         print(f"DEBUG SavedJobViewSet.get_queryset: Filtering saved jobs for user_id={user_id}")
-        queryset = SavedJob.objects.filter(user_id=user_id).select_related('job', 'job__company')
+        # Вакансии подгружаются одним запросом; applications_count хранится в строке вакансии
+        jobs = Job.objects.select_related('company').defer('search_vector')
+        queryset = SavedJob.objects.filter(user_id=user_id).prefetch_related(Prefetch('job', queryset=jobs))
         count = queryset.count()
         print(f"DEBUG SavedJobViewSet.get_queryset: Found {count} saved jobs for user_id={user_id}")
         return queryset
@@ -733,13 +975,17 @@ class SavedJobViewSet(viewsets.ModelViewSet):
         
         # Используем явный user_id для проверки, чтобы предотвратить проблемы с авторизацией
         user_id = self.request.user.id
-        if SavedJob.objects.filter(user_id=user_id, job=job).exists():
+        # Сохранена ли уже вакансия, решает уникальный индекс (user, job), а не
+        # закэшированное множество: оно может отставать от БД
+        try:
+            with transaction.atomic():
+                serializer.save(user_id=user_id)
+        except IntegrityError:
+            if job.pk not in saved_job_ids(self.request.user):
+                forget_saved(user_id)
             raise serializers.ValidationError(
                 {"job": "Эта вакансия уже сохранена"}
             )
-            
-        # Явно устанавливаем пользователя, чтобы избежать любых потенциальных проблем
-        serializer.save(user_id=user_id)
         return Response({"status": "Вакансия успешно сохранена"}, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -769,33 +1015,46 @@ class SavedJobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
             
-        # Получаем сохраненную вакансию только для текущего аутентифицированного пользователя с явным user_id (строго изолированный)
-        saved_job = SavedJob.objects.filter(user_id=user_id, job=job).first()
-        
-        if saved_job:
-            saved_job.delete()
+        # Закэшированное множество id - только подсказка, какую ветку пробовать первой;
+        # решает результат запроса к БД
+        if job.pk in saved_job_ids(request.user):
+            deleted, _ = SavedJob.objects.filter(user_id=user_id, job=job).delete()
+            if deleted:
+                return Response({
+                    "status": "Вакансия удалена из сохраненных",
+                    "is_saved": False,
+                    "job_id": job_id
+                })
+            # Множество разошлось с БД (вакансия не сохранена) - сбрасываем его и сохраняем
+            forget_saved(user_id)
+
+        # Проверяем, активна ли вакансия перед сохранением
+        if not job.is_active:
+            return Response(
+                {"error": "Нельзя сохранить неактивную вакансию"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+            
+        # Явно создаем с user_id для правильной изоляции
+        try:
+            with transaction.atomic():
+                saved_job = SavedJob.objects.create(user_id=user_id, job=job)
+        except IntegrityError:
+            # Вакансия уже была сохранена, но множество об этом не знало
+            forget_saved(user_id)
+            SavedJob.objects.filter(user_id=user_id, job=job).delete()
             return Response({
                 "status": "Вакансия удалена из сохраненных",
                 "is_saved": False,
                 "job_id": job_id
             })
-        else:
-            # Проверяем, активна ли вакансия перед сохранением
-            if not job.is_active:
-                return Response(
-                    {"error": "Нельзя сохранить неактивную вакансию"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-                
-            # Явно создаем с user_id для правильной изоляции
-            saved_job = SavedJob.objects.create(user_id=user_id, job=job)
-            serializer = self.get_serializer(saved_job)
-            return Response({
-                "status": "Вакансия добавлена в сохраненных",
-                "is_saved": True,
-                "job_id": job_id,
-                "saved_job": serializer.data
-            }, status=status.HTTP_201_CREATED)
+        serializer = self.get_serializer(saved_job)
+        return Response({
+            "status": "Вакансия добавлена в сохраненных",
+            "is_saved": True,
+            "job_id": job_id,
+            "saved_job": serializer.data
+        }, status=status.HTTP_201_CREATED)
 
 class ConversationViewSet(viewsets.ModelViewSet):
     """
@@ -813,7 +1072,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
         print(f"DEBUG ConversationViewSet.get_queryset: запрос для пользователя {self.request.user.id}")
         queryset = Conversation.objects.filter(
             participants=self.request.user
-        ).prefetch_related('participants').order_by('-last_message_time', '-updated_at')
+        ).select_related('job', 'last_message').prefetch_related('participants').order_by('-last_message_time', '-updated_at')
         
         # Добавляем логи для диагностики
         conversation_count = queryset.count()
@@ -824,6 +1083,14 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        """
+        Список диалогов пользователя одним запросом (см. jobs/inbox.py).
+        """
+        queryset = inbox_queryset(request.user)
+        serializer = InboxConversationSerializer(queryset, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+    
     def perform_create(self, serializer):
         """
         Создаёт новый диалог и добавляет текущего пользователя как участника.
@@ -838,23 +1105,11 @@ class ConversationViewSet(viewsets.ModelViewSet):
         lookup = self.kwargs.get('pk')
         print(f"DEBUG ConversationViewSet.get_object: получение диалога по ключу: {lookup}")
 
-        # Сначала пробуем найти по числовому PK, если lookup - число
-        if lookup.isdigit():
-            try:
-                print(f"DEBUG ConversationViewSet.get_object: попытка получить по numeric pk: {lookup}")
-                obj = self.get_queryset().get(pk=int(lookup))
-                print(f"DEBUG ConversationViewSet.get_object: диалог найден по pk: {obj.id} в диалогах пользователя")
-                return obj
-            except (ValueError, Conversation.DoesNotExist, TypeError):
-                print(f"DEBUG ConversationViewSet.get_object: диалог с pk={lookup} не найден в диалогах пользователя или lookup не число.")
-        
-        # Далее пробуем найти по conversation_id
-        print(f"DEBUG ConversationViewSet.get_object: попытка найти по строковому conversation_id '{lookup}' в диалогах пользователя")
-        queryset = self.get_queryset() # Диалоги, где пользователь участник
-        for conv in queryset:
-            if conv.conversation_id == lookup:
-                print(f"DEBUG ConversationViewSet.get_object: диалог найден по conversation_id: {conv.id} (строковый id: {lookup})")
-                return conv
+        # Числовой pk или conversation_key - один запрос по индексу среди диалогов пользователя
+        obj = find_conversation(lookup, self.get_queryset())
+        if obj is not None:
+            print(f"DEBUG ConversationViewSet.get_object: диалог найден: {obj.id} (ключ: {lookup})")
+            return obj
 
         print(f"DEBUG ConversationViewSet.get_object: диалог не найден ни по pk, ни по conversation_id: {lookup}")
         raise Http404
@@ -892,33 +1147,9 @@ class ConversationViewSet(viewsets.ModelViewSet):
                     job = Job.objects.get(id=job_id)
                     print(f"CREATE_OR_GET DEBUG: Найдена вакансия с ID {job.id}")
                 
-                # Поиск существующего диалога
-                print(f"CREATE_OR_GET DEBUG: Поиск существующего диалога")
-                conversations = Conversation.objects.filter(participants=request.user)
-                conversations = conversations.filter(participants=other_user)
-                
-                if job:
-                    conversations = conversations.filter(job=job)
-                    print(f"CREATE_OR_GET DEBUG: Применен фильтр по вакансии {job.id}")
-                else:
-                    conversations = conversations.filter(job__isnull=True)
-                    print(f"CREATE_OR_GET DEBUG: Применен фильтр по отсутствию вакансии")
-                
-                # Проверяем существование диалога
-                if conversations.exists():
-                    # Берём первый найденный диалог
-                    conversation = conversations.first()
-                    created = False
-                    print(f"CREATE_OR_GET DEBUG: Найден существующий диалог с ID {conversation.id}")
-                else:
-                    # Создаём новый диалог
-                    print(f"CREATE_OR_GET DEBUG: Создание нового диалога")
-                    conversation = Conversation.objects.create(job=None)
-                    conversation.participants.add(request.user, other_user)
-                    # Нет необходимости вызывать conversation.save() сразу после create, если участники добавляются сразу
-                    # и last_message_time будет обновлено методом save() нового сообщения.
-                    created_new_conversation = True
-                    print(f"DEBUG [create_or_get]: Created new direct conversation with ID: {conversation.id}.")
+                # Находим или создаем диалог одним запросом по уникальной паре
+                conversation, created = get_or_create_conversation(request.user, other_user, job)
+                print(f"CREATE_OR_GET DEBUG: Диалог {conversation.id} ({'создан' if created else 'найден'})")
                 
                 # Проверяем, что все создалось корректно
                 check_conv = Conversation.objects.get(id=conversation.id)
@@ -936,54 +1167,46 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 response_data = serializer.data
                 response_data['created'] = created
                 
-                # Отправляем уведомления через WebSocket
+                # Уведомления пишутся в outbox в этой же транзакции
                 if created:
-                    try:
-                        from channels.layers import get_channel_layer
-                        from asgiref.sync import async_to_sync
+                    # Уведомление для другого пользователя
+                    other_user_group = f"notifications_{other_user.id}"
+                    print(f"CREATE_OR_GET DEBUG: Отправка уведомления другому пользователю через {other_user_group}")
                         
-                        channel_layer = get_channel_layer()
-                        
-                        # Уведомление для другого пользователя
-                        other_user_group = f"notifications_{other_user.id}"
-                        print(f"CREATE_OR_GET DEBUG: Отправка уведомления другому пользователю через {other_user_group}")
-                        
-                        async_to_sync(channel_layer.group_send)(
-                            other_user_group,
-                            {
-                                "type": "new_conversation",
-                                "conversation_id": conversation.conversation_id,
-                                "other_user": {
-                                    "id": request.user.id,
-                                    "first_name": request.user.first_name,
-                                    "last_name": request.user.last_name
-                                },
-                                "job": {"id": job.id, "title": job.title} if job else None
-                            }
-                        )
-                        print(f"CREATE_OR_GET DEBUG: Уведомление отправлено")
+                    enqueue_notification(
+                        other_user_group,
+                        {
+                            "type": "new_conversation",
+                            "conversation_id": conversation.conversation_id,
+                            "other_user": {
+                                "id": request.user.id,
+                                "first_name": request.user.first_name,
+                                "last_name": request.user.last_name
+                            },
+                            "job": {"id": job.id, "title": job.title} if job else None
+                        }
+                    )
+                    print(f"CREATE_OR_GET DEBUG: Уведомление отправлено")
                         
-                        # Уведомление для текущего пользователя
-                        current_user_group = f"notifications_{request.user.id}"
-                        print(f"CREATE_OR_GET DEBUG: Отправка уведомления текущему пользователю через {current_user_group}")
+                    # Уведомление для текущего пользователя
+                    current_user_group = f"notifications_{request.user.id}"
+                    print(f"CREATE_OR_GET DEBUG: Отправка уведомления текущему пользователю через {current_user_group}")
                         
-                        async_to_sync(channel_layer.group_send)(
-                            current_user_group,
-                            {
-                                "type": "new_conversation",
-                                "conversation_id": conversation.conversation_id,
-                                "other_user": {
-                                    "id": other_user.id,
-                                    "first_name": other_user.first_name,
-                                    "last_name": other_user.last_name
-                                },
-                                "job": {"id": job.id, "title": job.title} if job else None
-                            }
-                        )
-                        print(f"CREATE_OR_GET DEBUG: Уведомление отправлено")
+                    enqueue_notification(
+                        current_user_group,
+                        {
+                            "type": "new_conversation",
+                            "conversation_id": conversation.conversation_id,
+                            "other_user": {
+                                "id": other_user.id,
+                                "first_name": other_user.first_name,
+                                "last_name": other_user.last_name
+                            },
+                            "job": {"id": job.id, "title": job.title} if job else None
+                        }
+                    )
+                    print(f"CREATE_OR_GET DEBUG: Уведомление отправлено")
                         
-                    except Exception as ws_error:
-                        print(f"CREATE_OR_GET DEBUG: Ошибка отправки WebSocket-уведомления: {str(ws_error)}")
                 
                 print(f"CREATE_OR_GET DEBUG: Возвращаем ответ: created={created}, conversation_id={conversation.id}")
                 return Response(response_data)
@@ -1034,10 +1257,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
             print(f"DEBUG ConversationViewSet.messages: найдено {msg_count} сообщений в диалоге")
             
             # Отмечаем непрочитанные сообщения как прочитанные
-            unread_messages = messages.filter(recipient=request.user, is_read=False)
-            unread_count = unread_messages.count()
-            print(f"DEBUG ConversationViewSet.messages: отмечаем {unread_count} непрочитанных сообщений")
-            unread_messages.update(is_read=True)
+            unread_count = mark_conversation_read(conversation.id, request.user.id)
+            print(f"DEBUG ConversationViewSet.messages: отмечено {unread_count} непрочитанных сообщений")
                 
             serializer = ChatMessageSerializer(messages, many=True)
             print(f"DEBUG ConversationViewSet.messages: возвращаем {len(serializer.data)} сериализованных сообщений")
@@ -1052,7 +1273,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         user = request.user
-        count = Conversation.objects.filter(participants=user, messages__is_read=False, messages__recipient=user).distinct().count()
+        count = unread_conversations_count(user)
         return Response({'unread_count': count})
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -1093,30 +1314,9 @@ class ConversationViewSet(viewsets.ModelViewSet):
 
         try:
             with transaction.atomic():
-                # Ищем существующий "прямой" диалог (job=None) между этими двумя участниками
-                # Участники могут быть в любом порядке в M2M
-                existing_conversations = Conversation.objects.annotate(
-                    num_participants=Count('participants')
-                ).filter(
-                    participants=employer
-                ).filter(
-                    participants=recipient
-                ).filter(
-                    job__isnull=True,
-                    num_participants=2 # Убедимся, что в диалоге только эти два участника
-                )
-
-                if existing_conversations.exists():
-                    conversation = existing_conversations.first()
-                    print(f"DEBUG [initiate_chat]: Найден существующий прямой диалог ID: {conversation.id} между Работодателем {employer.id} и Получателем {recipient_id}.")
-                else:
-                    print(f"DEBUG [initiate_chat]: Не найден существующий прямой диалог. Создаем новый между Работодателем {employer.id} и Получателем {recipient_id}.")
-                    conversation = Conversation.objects.create(job=None) # вакансия явно указана как None
-                    conversation.participants.add(employer, recipient)
-                    # Нет необходимости вызывать conversation.save() сразу после create, если участники добавляются сразу
-                    # и last_message_time будет обновлено методом save() нового сообщения.
-                    created_new_conversation = True
-                    print(f"DEBUG [initiate_chat]: Создан новый прямой диалог с ID: {conversation.id}.")
+                # "Прямой" диалог (job=None) между этими двумя участниками - один запрос по уникальной паре
+                conversation, created_new_conversation = get_or_create_conversation(employer, recipient)
+                print(f"DEBUG [initiate_chat]: Диалог {conversation.id} между Работодателем {employer.id} и Получателем {recipient_id} ({'создан' if created_new_conversation else 'найден'}).")
 
                 if not conversation or not conversation.id: # Дополнительная проверка
                     print(f"CRITICAL ERROR [initiate_chat]: Объект диалога None или не имеет ID после попытки создания/получения. Работодатель: {employer.id}, Получатель: {recipient.id}")
@@ -1138,49 +1338,42 @@ class ConversationViewSet(viewsets.ModelViewSet):
                     # Можно создать дефолтное, если это требуется:
                     # ChatMessage.objects.create(conversation=conversation, sender=employer, recipient=recipient, job=None, content="Здравствуйте!")
 
+                # WebSocket уведомления (через outbox, в этой же транзакции)
+                conversation_id_ws = conversation.conversation_id # Используем conversation_id для WS
 
-        except Exception as e:
-            print(f"ERROR [initiate_chat]: Ошибка при создании диалога/сообщения: {str(e)}. Работодатель: {employer.id}, Получатель: {recipient.id}")
-            # Здесь можно добавить более детальное логирование ошибки `e` при необходимости
-            return Response({"error": f"Ошибка на сервере при попытке создать диалог: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # WebSocket уведомления
-        try:
-            channel_layer = get_channel_layer()
-            conversation_id_ws = conversation.conversation_id # Используем conversation_id для WS
-
-            # Уведомление для соискателя о новом диалоге/сообщении
-            recipient_group = f"notifications_{recipient.id}"
-            async_to_sync(channel_layer.group_send)(
-                recipient_group,
-                {
-                    "type": "new_conversation", # или "new_message" если диалог мог существовать
-                    "conversation_id": conversation_id_ws,
-                    "other_user": {"id": employer.id, "first_name": employer.first_name, "last_name": employer.last_name, "company_name": getattr(employer, 'company_name', None)},
-                    "job": None, # Прямой чат, нет привязки к вакансии
-                    "initial_message": initial_message_content if initial_message_content else "Вам новое сообщение от работодателя."
-                }
-            )
-            print(f"DEBUG [initiate_chat]: Отправлено WebSocket уведомление в группу {recipient_group}.")
-
-            # Уведомление для самого работодателя, чтобы чат появился/обновился в списке
-            if created_new_conversation: # Только если это новый диалог
-                employer_group = f"notifications_{employer.id}"
-                async_to_sync(channel_layer.group_send)(
-                    employer_group,
+                # Уведомление для соискателя о новом диалоге/сообщении
+                recipient_group = f"notifications_{recipient.id}"
+                enqueue_notification(
+                    recipient_group,
                     {
-                        "type": "new_conversation",
+                        "type": "new_conversation", # или "new_message" если диалог мог существовать
                         "conversation_id": conversation_id_ws,
-                        "other_user": {"id": recipient.id, "first_name": recipient.first_name, "last_name": recipient.last_name},
-                        "job": None,
+                        "other_user": {"id": employer.id, "first_name": employer.first_name, "last_name": employer.last_name, "company_name": getattr(employer, 'company_name', None)},
+                        "job": None, # Прямой чат, нет привязки к вакансии
+                        "initial_message": initial_message_content if initial_message_content else "Вам новое сообщение от работодателя."
                     }
                 )
-                print(f"DEBUG [initiate_chat]: Отправлено WebSocket уведомление в группу {employer_group} для нового диалога.")
+                print(f"DEBUG [initiate_chat]: Отправлено WebSocket уведомление в группу {recipient_group}.")
 
-        except Exception as ws_error:
-            print(f"WARNING [initiate_chat]: Не удалось отправить WebSocket уведомление: {str(ws_error)}. Диалог {conversation.id} все равно создан.")
-            # Не прерываем выполнение, если WebSocket уведомление не удалось
+                # Уведомление для самого работодателя, чтобы чат появился/обновился в списке
+                if created_new_conversation: # Только если это новый диалог
+                    employer_group = f"notifications_{employer.id}"
+                    enqueue_notification(
+                        employer_group,
+                        {
+                            "type": "new_conversation",
+                            "conversation_id": conversation_id_ws,
+                            "other_user": {"id": recipient.id, "first_name": recipient.first_name, "last_name": recipient.last_name},
+                            "job": None,
+                        }
+                    )
+                    print(f"DEBUG [initiate_chat]: Отправлено WebSocket уведомление в группу {employer_group} для нового диалога.")
 
+        except Exception as e:
+            print(f"ERROR [initiate_chat]: Ошибка при создании диалога/сообщения: {str(e)}. Работодатель: {employer.id}, Получатель: {recipient.id}")
+            # Здесь можно добавить более детальное логирование ошибки `e` при необходимости
+            return Response({"error": f"Ошибка на сервере при попытке создать диалог: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
         try:
             serializer = ConversationSerializer(conversation, context={'request': request})
             serialized_data = serializer.data
@@ -1228,31 +1421,11 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
                     {"conversation_id": "ID диалога не предоставлен."}
                 )
                 
-            conversation = None
-            try:
-                print(f"[CHAT_MSG_CREATE] Попытка преобразовать '{conversation_id_from_request}' в int для поиска по PK.")
-                conv_pk = int(conversation_id_from_request)
-                print(f"[CHAT_MSG_CREATE] Попытка Conversation.objects.get(id={conv_pk})")
-                conversation = Conversation.objects.get(id=conv_pk)
-                print(f"[CHAT_MSG_CREATE] Найден диалог по числовому PK: {conversation.id}")
-            except ValueError:
-                print(f"[CHAT_MSG_CREATE] ValueError: Не удалось преобразовать '{conversation_id_from_request}' в int. Будет попытка поиска по строковому ID.")
-            except Conversation.DoesNotExist:
-                print(f"[CHAT_MSG_CREATE] Conversation.DoesNotExist для PK '{conversation_id_from_request}'. Будет попытка поиска по строковому ID.")
+            # Числовой pk или conversation_key - один запрос по индексу
+            conversation = find_conversation(conversation_id_from_request)
+            if conversation:
+                print(f"[CHAT_MSG_CREATE] Найден диалог {conversation.id} по идентификатору '{conversation_id_from_request}'")
 
-            if not conversation and isinstance(conversation_id_from_request, str):
-                print(f"[CHAT_MSG_CREATE] Попытка Conversation.find_by_conversation_id('{conversation_id_from_request}')")
-                found_by_string_id = None
-                for c in Conversation.objects.all(): 
-                    if c.conversation_id == conversation_id_from_request:
-                        found_by_string_id = c
-                        break
-                conversation = found_by_string_id
-                if conversation:
-                    print(f"[CHAT_MSG_CREATE] Найден диалог по строковому conversation_id: {conversation.id} (string_id: '{conversation.conversation_id}')")
-                else:
-                    print(f"[CHAT_MSG_CREATE] Диалог не найден по строковому conversation_id '{conversation_id_from_request}'.")
-            
             if not conversation:
                 print(f"[CHAT_MSG_CREATE] Ошибка: Диалог не найден ни одним методом для идентификатора '{conversation_id_from_request}'.")
                 raise serializers.ValidationError(
@@ -1295,11 +1468,7 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
                 
-            count = ChatMessage.objects.filter(
-                conversation=conversation,
-                recipient=request.user,
-                is_read=False
-            ).update(is_read=True)
+            count = mark_conversation_read(conversation.id, request.user.id)
             
             return Response({"marked_read": count})
             
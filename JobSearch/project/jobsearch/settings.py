@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -143,6 +144,69 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Размер страницы списка вакансий (курсорная пагинация)
+JOB_LIST_PAGE_SIZE = int(os.getenv('JOB_LIST_PAGE_SIZE', '20'))
+JOB_LIST_MAX_PAGE_SIZE = int(os.getenv('JOB_LIST_MAX_PAGE_SIZE', '100'))
+
+# Время жизни кэша фасетов поиска вакансий, в секундах
+JOB_FACETS_CACHE_TTL = int(os.getenv('JOB_FACETS_CACHE_TTL', '60'))
+
+# Зарплатная гистограмма: ширина интервала и число интервалов
+JOB_SALARY_HISTOGRAM_STEP = int(os.getenv('JOB_SALARY_HISTOGRAM_STEP', '25000'))
+JOB_SALARY_HISTOGRAM_BUCKETS = int(os.getenv('JOB_SALARY_HISTOGRAM_BUCKETS', '20'))
+
+# Кэш результатов списка вакансий: время жизни и размер локального LRU процесса
+JOB_LIST_CACHE_TTL = int(os.getenv('JOB_LIST_CACHE_TTL', '60'))
+JOB_LIST_CACHE_LOCAL_SIZE = int(os.getenv('JOB_LIST_CACHE_LOCAL_SIZE', '512'))
+
+# Массовый импорт вакансий: размер пачки (транзакции) и число ошибок в отчете
+JOB_IMPORT_BATCH_SIZE = int(os.getenv('JOB_IMPORT_BATCH_SIZE', '500'))
+JOB_IMPORT_MAX_ERRORS = int(os.getenv('JOB_IMPORT_MAX_ERRORS', '1000'))
+
+# Выгрузка вакансий и откликов: число строк, читаемых из серверного курсора за раз
+JOB_EXPORT_CHUNK_SIZE = int(os.getenv('JOB_EXPORT_CHUNK_SIZE', '2000'))
+
+# Счетчики статистики откликов соискателей. После повторного включения
+# выполните python manage.py rebuild_application_stats
+JOB_APPLICATION_STATS_COUNTERS = os.getenv('JOB_APPLICATION_STATS_COUNTERS', 'True') == 'True'
+
+# Счетчик просмотров вакансий: период сброса в БД (сек) и необязательный общий буфер в Redis
+JOB_VIEWS_FLUSH_INTERVAL = int(os.getenv('JOB_VIEWS_FLUSH_INTERVAL', '5'))
+JOB_VIEWS_REDIS_URL = os.getenv('JOB_VIEWS_REDIS_URL') or None
+
+# Время жизни закэшированного множества сохраненных вакансий пользователя, в секундах
+SAVED_JOBS_CACHE_TTL = int(os.getenv('SAVED_JOBS_CACHE_TTL', '3600'))
+
+# Outbox WebSocket-уведомлений: размер пачки, период опроса (сек), число попыток, срок, на который
+# диспетчер забирает пачку (сек), и фоновый диспетчер в процессе приложения (выключите, если
+# запущен manage.py dispatch_outbox)
+NOTIFICATIONS_OUTBOX_BATCH_SIZE = int(os.getenv('NOTIFICATIONS_OUTBOX_BATCH_SIZE', '200'))
+NOTIFICATIONS_OUTBOX_POLL_INTERVAL = int(os.getenv('NOTIFICATIONS_OUTBOX_POLL_INTERVAL', '1'))
+NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS = int(os.getenv('NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS', '10'))
+NOTIFICATIONS_OUTBOX_CLAIM_TIMEOUT = int(os.getenv('NOTIFICATIONS_OUTBOX_CLAIM_TIMEOUT', '60'))
+NOTIFICATIONS_OUTBOX_IN_PROCESS = os.getenv('NOTIFICATIONS_OUTBOX_IN_PROCESS', 'True') == 'True'
+
+# Индекс навыков в памяти: период синхронизации и сверки удалений, в секундах, и
+# сколько id передавать в запрос массивом (больше - фильтр по GIN-индексу навыков)
+SKILL_INDEX_SYNC_INTERVAL = int(os.getenv('SKILL_INDEX_SYNC_INTERVAL', '5'))
+SKILL_INDEX_RECONCILE_INTERVAL = int(os.getenv('SKILL_INDEX_RECONCILE_INTERVAL', '300'))
+SKILL_INDEX_MAX_IDS = int(os.getenv('SKILL_INDEX_MAX_IDS', '10000'))
+
+# Рекомендации вакансий: период подтягивания изменений и полной перестройки матрицы, в секундах
+JOB_RECOMMENDATIONS_SYNC_INTERVAL = int(os.getenv('JOB_RECOMMENDATIONS_SYNC_INTERVAL', '5'))
+JOB_RECOMMENDATIONS_REBUILD_INTERVAL = int(os.getenv('JOB_RECOMMENDATIONS_REBUILD_INTERVAL', '3600'))
+
+# Общий кэш: Redis, если задан REDIS_CACHE_URL (например, redis://127.0.0.1:6379/1),
+# иначе кэш в памяти процесса (тогда кэширование списков вакансий, карточек и
+# избранного отключается: сбросы в одном воркере не видны другим, см. jobs/cache.py)
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        }
+    }
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
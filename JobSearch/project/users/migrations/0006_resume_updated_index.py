@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_alter_resume_created_at_alter_resume_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resume',
+            index=models.Index(fields=['updated_at'], name='resume_updated_idx'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 import os
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils import timezone
 from django.dispatch import receiver
 from django.conf import settings
 
@@ -90,6 +91,10 @@ class Resume(models.Model):
         verbose_name = 'Резюме'
         verbose_name_plural = 'Резюме'
         ordering = ['-updated_at']
+        indexes = [
+            # Индекс под сортировку и синхронизацию индекса навыков по updated_at
+            models.Index(fields=['updated_at'], name='resume_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -145,4 +150,31 @@ class Portfolio(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
     url = models.URLField(blank=True)
-    image = models.ImageField(upload_to='portfolio/', blank=True)
\ No newline at end of file
+    image = models.ImageField(upload_to='portfolio/', blank=True)
+
+@receiver(post_save, sender=Experience)
+@receiver(post_save, sender=Education)
+@receiver(post_save, sender=Portfolio)
+@receiver(post_delete, sender=Experience)
+@receiver(post_delete, sender=Education)
+@receiver(post_delete, sender=Portfolio)
+def touch_resume(sender, instance, **kwargs):
+    # Изменение вложенных разделов меняет представление резюме: обновляем
+    # updated_at, по которому считаются ETag и Last-Modified
+    Resume.objects.filter(pk=instance.resume_id).update(updated_at=timezone.now())
+
+
+# Поля пользователя, которые выводятся внутри резюме (UserSerializer)
+PROFILE_FIELDS = {
+    'username', 'email', 'first_name', 'last_name', 'role',
+    'company_name', 'position', 'phone', 'bio', 'avatar',
+}
+
+
+@receiver(post_save, sender=User)
+def touch_user_resumes(sender, instance, created, update_fields=None, **kwargs):
+    # Профиль выводится внутри резюме, поэтому его изменение тоже обновляет
+    # updated_at резюме (сохранение только last_login и т.п. пропускаем)
+    if created or (update_fields is not None and not PROFILE_FIELDS & set(update_fields)):
+        return
+    Resume.objects.filter(user=instance).update(updated_at=timezone.now())
@@ -7,8 +7,12 @@ from django.contrib.auth import get_user_model, authenticate
 from .serializers import UserSerializer, RegisterSerializer, ResumeSerializer, ExperienceSerializer, EducationSerializer, PortfolioSerializer
 from .models import Resume, Experience, Education, Portfolio
 from jobs.models import ChatMessage
+from jobs.search import parse_skills_param
+from jobs.skill_index import resume_skill_index, skills_filter
+from jobs.conditional import make_etag, not_modified, queryset_validator, set_validators
 from rest_framework.decorators import action
-from django.db.models import Q
+from django.db.models import Q, prefetch_related_objects
+from django.http import Http404
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from django.contrib.auth.hashers import make_password
@@ -258,6 +262,28 @@ class ResumeViewSet(viewsets.ModelViewSet):
         context = super().get_serializer_context()
         return context
         
+    def list(self, request, *args, **kwargs):
+        etag = make_etag(queryset_validator(Resume.objects.filter(user=request.user)))
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        return set_validators(super().list(request, *args, **kwargs), etag)
+
+    def resume_response(self, request, resume):
+        """
+        Отдает резюме с ETag/Last-Modified. Вложенные опыт, образование и портфолио
+        подгружаются только если клиенту действительно нужно тело ответа
+        (их изменения, как и правки профиля владельца, обновляют Resume.updated_at,
+        см. users/models.py).
+        """
+        etag = make_etag(resume.pk, resume.updated_at.isoformat())
+        response = not_modified(request, etag, resume.updated_at)
+        if response is not None:
+            return response
+        prefetch_related_objects([resume], 'experiences', 'education', 'portfolio')
+        serializer = self.get_serializer(resume)
+        return set_validators(Response(serializer.data), etag, resume.updated_at)
+        
     def retrieve(self, request, *args, **kwargs):
         """
         Кастомный метод для получения резюме работодателем
@@ -279,14 +305,11 @@ class ResumeViewSet(viewsets.ModelViewSet):
                         id=resume_id, 
                         is_active=True,
                         user__role='jobseeker'
-                    ).select_related('user').prefetch_related(
-                        'experiences', 'education', 'portfolio'
-                    ).first()
+                    ).select_related('user').first()
                     
                     if resume:
                         print(f"[ResumeViewSet.retrieve] Найдено резюме для работодателя: {resume.title}")
-                        serializer = self.get_serializer(resume)
-                        return Response(serializer.data)
+                        return self.resume_response(request, resume)
                     else:
                         print(f"[ResumeViewSet.retrieve] Резюме не найдено или недоступно для работодателя")
                         return Response({"error": "Резюме не найдено или недоступно"}, status=status.HTTP_404_NOT_FOUND)
@@ -294,9 +317,12 @@ class ResumeViewSet(viewsets.ModelViewSet):
                     print(f"[ResumeViewSet.retrieve] Ошибка при получении резюме для работодателя: {str(e)}")
                     return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Для соискателей, используем стандартное поведение - только доступ к своим резюме
-            return super().retrieve(request, *args, **kwargs)
+            # Для соискателей - только доступ к своим резюме
+            resume = get_object_or_404(Resume.objects.select_related('user'), pk=resume_id, user=user)
+            return self.resume_response(request, resume)
             
+        except Http404:
+            raise
         except Exception as e:
             print(f"[ResumeViewSet.retrieve] Непредвиденная ошибка: {str(e)}")
             return Response({"error": "Произошла ошибка при получении резюме"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -499,11 +525,22 @@ class ResumeViewSet(viewsets.ModelViewSet):
 
         if employment_type:
             queryset = queryset.filter(preferred_employment__icontains=employment_type)
+
+        # Навыки кандидата: skills=a,b (все) или skills_mode=any (хотя бы один), по индексу навыков
+        skills = parse_skills_param(request.query_params.getlist('skills'))
+        if skills:
+            match_all = request.query_params.get('skills_mode') != 'any'
+            queryset = queryset.filter(skills_filter(resume_skill_index, skills, match_all=match_all))
         
+        etag = make_etag(queryset_validator(queryset))
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
         context = self.get_serializer_context()
         serializer = self.get_serializer(queryset, many=True, context=context)
         
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), etag)
 
 class ExperienceViewSet(viewsets.ModelViewSet):
     serializer_class = ExperienceSerializer